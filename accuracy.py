@@ -0,0 +1,69 @@
+import argparse
+import csv
+from engine.utils.io import *
+from engine.utils.network import batch_adaptive_accuracy
+from engine.utils.manifest import load_manifest
+from engine.utils.executor import backends, start_executor, stop_executor
+from engine.config.config import *
+
+# run_accuracy_report(batch_fractions) compares the batch-adaptive targeted
+# attack under each of the batch fractions in 'batch_fractions' to the exact
+# adaptive targeted attack on every preprocessed network of the collection (see
+# batch_adaptive_accuracy in engine/utils/network.py). The result for each
+# network and batch fraction is written to "batch_adaptive_accuracy.csv" in the
+# log directory, and a summary per batch fraction is printed, holding the
+# median and the smallest speedup over the exact attack, and the median and
+# the largest of the largest absolute score differences over all networks.
+def run_accuracy_report(batch_fractions):
+    import numpy as np
+    from concurrent.futures import as_completed
+    from tqdm import tqdm
+    manifest = load_manifest(get_data_dir())
+    args = [(get_data_dir(), category, network, subnetwork, batch_fractions, get_seed()) for
+            (category, network, subnetwork) in zip(manifest["category"], manifest["network"], manifest["subnetwork"])]
+    engines = start_executor(get_backend(), get_num_engines())
+    futures = [engines.submit(batch_adaptive_accuracy, arg) for arg in args]
+    rows = []
+    for future in tqdm(as_completed(futures), total=len(futures), desc="batch_adaptive_accuracy"):
+        status, category, network, subnetwork, n, m, results = future.result()
+        if status == 1:
+            print("Failed to compare the attacks on: " + str((category, network, subnetwork)))
+            continue
+        for (batch_fraction, exact_time, batch_time, max_error, mean_error) in results:
+            rows.append((category, network, subnetwork, n, m, batch_fraction, exact_time, batch_time,
+                         exact_time / batch_time, max_error, mean_error))
+    stop_executor(engines)
+    os.makedirs(get_log_dir(), exist_ok=True)
+    with open(get_log_dir() + "batch_adaptive_accuracy.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["category", "network", "subnetwork", "n", "m", "batch_fraction", "exact_time",
+                         "batch_time", "speedup", "max_error", "mean_error"])
+        writer.writerows(sorted(rows))
+    print("batch fraction".ljust(16) + "median speedup".rjust(16) + "min speedup".rjust(14) +
+          "median max error".rjust(18) + "max error".rjust(12))
+    for batch_fraction in batch_fractions:
+        speedups = np.array([row[8] for row in rows if row[5] == batch_fraction])
+        errors = np.array([row[9] for row in rows if row[5] == batch_fraction])
+        if len(speedups) == 0:
+            continue
+        print(str(batch_fraction).ljust(16) + ("%.1fx" % np.median(speedups)).rjust(16) +
+              ("%.1fx" % speedups.min()).rjust(14) + ("%.2e" % np.median(errors)).rjust(18) +
+              ("%.2e" % errors.max()).rjust(12))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cores', type=int, required=True)
+    # --backend sets where the comparisons run (see engine/utils/executor.py).
+    parser.add_argument('--backend', choices=backends, default="processes")
+    # --batch-fractions sets the batch fractions of the batch-adaptive attack
+    # to compare to the exact adaptive attack.
+    parser.add_argument('--batch-fractions', type=float, nargs="+", default=[0.001, 0.005, 0.01, 0.05, 0.1])
+    cli_input = parser.parse_args()
+    set_num_engines(cli_input.cores)
+    set_backend(cli_input.backend)
+    set_seed(0)
+    # The collection is read from the datasets folder of the working directory,
+    # as collected by collect.py and preprocessed by analysis.py.
+    set_working_dir(os.getcwd() + "/")
+    run_accuracy_report(cli_input.batch_fractions)
@@ -1,44 +1,67 @@
 import argparse
 import shutil
 import warnings
+from collections import Counter
 import numpy as np
-import pickle
-import ipyparallel as ipp
 from engine.utils.io import *
 from engine.utils.network import *
+from engine.utils.cache import *
+from engine.utils.checkpoint import *
+from engine.utils.store import *
+from engine.utils.manifest import *
+from engine.utils.scheduling import estimate_cost, estimate_memory, split_seeds
+from engine.utils.executor import backends, start_executor, stop_executor
+from engine.utils.shared import register_shared_graphs, clear_shared_graphs
 from engine.config.config import *
 
 # run_analysis() first preprocesses graphs stored in the datasets folder and
 # generates random size-matching graphs. Then, the function generates scores
 # using the latter two, and finally postprocesses these scores before storing
-# them in the same locations as the analyzed networks. 
+# them in the same locations as the analyzed networks. Each stage is
+# checkpointed (see engine/utils/checkpoint.py), such that a run that was
+# interrupted resumes where it stopped when started again.
 def run_analysis():
+    # The random graphs are only sampled adaptively when they are generated and
+    # scored in memory, in rounds (see run_fused_scoring).
+    if get_baseline_half_width() is not None and not get_fused_baselines():
+        raise ValueError("adaptive baseline sampling requires fused baselines (see set_fused_baselines)")
+    # Remove stale entries from the result cache, and start with an empty score
+    # store, unless an interrupted run is resumed.
+    evict_cache()
+    if not is_checkpointed(load_checkpoint("score_store"), ("reset",)):
+        reset_score_store()
+        record_checkpoint("score_store", ("reset",), (0,))
     # --------------------------------------------------------------------------
     # preprocessing
     # --------------------------------------------------------------------------
     # The array 'nets' is created and filled with tuples indicating the
-    # network's: directory, category, network and subnetwork. 
-    nets = []
-    for category in get_categories(get_data_dir()):
-        for network in get_networks(get_data_dir(), category):
-            for subnetwork in get_subnetworks(get_data_dir(), category, network):
-                nets.append((get_data_dir(), category, network, subnetwork))
-    # We preprocess the networks in parallel, and log if any preprocessing step
-    # failed. 
-    n_engines = get_num_engines()
-    cluster = ipp.Cluster(
-        n=n_engines,
-        controller_ip="*",
-        engine_launcher_class="MPI",
-        location="server.local",
-    )
-    cluster.start_cluster_sync()
-    client = cluster.connect_client_sync()
-    client.wait_for_engines(n=n_engines)
-    engines = client.load_balanced_view()
-    engines.block = True
-    result = engines.map_async(pre_process, nets)
-    result.wait_interactive()
+    # network's: directory, category, network and subnetwork, as listed in the
+    # manifest of the dataset (see engine/utils/manifest.py).
+    nets = list_networks(get_data_dir())
+    all_nets = nets
+    # Networks that were preprocessed by the same code in a previous run are
+    # skipped, unless the original or the preprocessed graph changed since.
+    # Networks ingested by collect.py come preprocessed, without an original.
+    pre_process_keys = {}
+    for net in nets:
+        if not os.path.isfile(get_graph_file(net)):
+            continue
+        key = cache_key("pre_process", file_digest(get_graph_file(net)))
+        if not (os.path.isfile(get_pre_processed_file(net)) and
+                cache_load(key) == file_digest(get_pre_processed_file(net))):
+            pre_process_keys[net] = key
+    # We preprocess the networks in parallel on the backend set by set_backend
+    # (see engine/utils/executor.py), and log if any preprocessing step failed.
+    # The engines are given the batch fraction of the batch-adaptive attack,
+    # and whether the edge removal strategies are scored.
+    engines = start_executor(get_backend(), get_num_engines(), initializer=set_scoring_options,
+                             initargs=(get_batch_adaptive_fraction(), get_score_edges()))
+    # The preprocessing tasks are scheduled largest first, by the size of the
+    # original graph files, and admitted under the memory budget, estimating
+    # the number of edges from the file size (see engine/utils/scheduling.py).
+    sizes = [os.path.getsize(get_graph_file(net)) for net in pre_process_keys]
+    result = run_stage(engines, "preprocessing", pre_process, list(pre_process_keys), costs=sizes,
+                       memory=[estimate_memory("preprocessing", 0, size / 8) for size in sizes])
     set_logger("preprocessing.log")
     logging.info(
         "The format is: "
@@ -46,40 +69,110 @@ def run_analysis():
     for args in result:
         if args[0] == 0:
             logging.info("Finished the preprocessing of: %s", args[2:])
+            cache_store(pre_process_keys[args[1:]], file_digest(get_pre_processed_file(args[1:])))
         elif args[0] == 1:
             logging.error("Failed in the preprocessing of: %s", args[2:])
+    logging.info("Reused the preprocessing of %s networks from the cache", len(nets) - len(pre_process_keys))
     reset_logger()
-    # If after preprocessing, the number of vertices and edges are below the
-    # pre-defined cut-off values, we exclude them from the analysis.
-    updated_nets = []
-    for net in nets:
-        g = load_graph(net)
-        n, m = g.num_vertices(), g.num_edges()
-        if n >= get_vertex_cut_off() and m >= get_edge_cut_off():
-            updated_nets.append(net + (n, m))
-    nets = updated_nets
+    # The preprocessed networks are recorded in the manifest. If after
+    # preprocessing, the number of vertices and edges are below the pre-defined
+    # cut-off values, we exclude them from the analysis.
+    update_manifest(get_data_dir(), nets)
+    manifest = load_manifest(get_data_dir())
+    nets = [(get_data_dir(), category, network, subnetwork, int(n), int(m)) for (category, network, subnetwork, n, m) in
+            zip(manifest["category"], manifest["network"], manifest["subnetwork"], manifest["n"], manifest["m"])
+            if n >= get_vertex_cut_off() and m >= get_edge_cut_off()]
+
+    # --------------------------------------------------------------------------
+    # random graph generation and score generation
+    # --------------------------------------------------------------------------
+    # Either generate and score the size-matching random graphs in memory, or
+    # write them to disk first (see set_fused_baselines).
+    if get_fused_baselines():
+        nets = run_fused_scoring(engines, nets)
+    else:
+        nets = run_on_disk_scoring(engines, nets)
+
+    # --------------------------------------------------------------------------------
+    # postprocessing
+    # --------------------------------------------------------------------------------
+    # We turn off logging.
+    logging.shutdown()
+    stop_executor(engines)
+    # This function recursively deletes empty directories, in a bottom-up fashion.
+    def remove_empty_folders(path):
+        # Function to remove empty folders.
+        if not os.path.isdir(path):
+            return
+        # Remove empty sub-folders.
+        files = os.listdir(path)
+        if len(files):
+            for f in files:
+                fullpath = os.path.join(path, f)
+                if os.path.isdir(fullpath):
+                    remove_empty_folders(fullpath)
+        # If the folder is empty, then we delete it.
+        files = os.listdir(path)
+        if len(files) == 0:
+            os.rmdir(path)
 
+    # If any empirical network is discarded during analysis we remove the
+    # corresponding directory, and then remove empty parent directories
+    # recursively. After the above step, the datasets folder contains only the
+    # empirical networks for which the robustness and scale-freeness analysis is
+    # complete and their scores.
+    nets = set([(x[0], x[1], x[2], x[3]) for x in nets])
+    discarded = [net for net in all_nets if net not in nets]
+    for (data_dir, category, network, subnetwork) in discarded:
+        if os.path.isdir(os.path.join(data_dir, category, network, subnetwork)):
+            shutil.rmtree(os.path.join(data_dir, category, network, subnetwork) + "/")
+    remove_from_manifest(get_data_dir(), discarded)
+    remove_empty_folders(get_data_dir())
+    # The analysis is complete, hence the checkpoints are no longer needed.
+    clear_checkpoints()
+    shutil.move(get_data_dir(), get_permanent_dir() + "datasets/")
+    shutil.move(get_score_store_dir(), get_permanent_dir() + "scores/")
+    shutil.move(get_log_dir(), get_permanent_dir() + "logs/")
+
+
+# run_on_disk_scoring(engines, nets) generates the size-matching random graphs
+# of the networks in 'nets' and stores them on disk, and then computes the
+# robustness scores of the empirical networks and the random graphs using the
+# engines 'engines'. The scores of each empirical network are appended to the
+# score store (see engine/utils/store.py), and the networks for which all steps succeeded are
+# returned. This path is slower than run_fused_scoring(engines, nets), but keeps
+# every intermediate file, which is useful for debugging.
+def run_on_disk_scoring(engines, nets):
+    strategies = get_strategies()
+    # Networks whose scores were already combined before the job was
+    # interrupted are set aside, as their intermediate files were removed.
+    aggregated = load_checkpoint("aggregation")
+    aggregated_nets = [net for net in nets if is_checkpointed(aggregated, net)]
+    nets = [net for net in nets if not is_checkpointed(aggregated, net)]
     # --------------------------------------------------------------------------
     # random graph generation
     # --------------------------------------------------------------------------
-    # Setup the random number generator.
-    rs = np.random.default_rng(get_seed())
     # We create the array 'args', and for each random network to be generated we
     # add an entry to 'args' containing: the directory to read the corresponding
     # empirical network, the directory to write the generated size-matching
     # random graph, the number of vertices (n) in the random graph, the number
-    # of edges (m) in the random graph, and the random seed. 
+    # of edges (m) in the random graph, and the random seed. The seeds are
+    # derived from the network and the index of the random graph (see
+    # derive_seed), such that they do not depend on which networks were set
+    # aside above when the job is resumed.
     args = []
     for (data_dir, category, network, subnetwork, n, m) in nets:
         random_net_dir = os.path.join(data_dir + category, network, subnetwork, "Graph-Data", "random-nets/")
-        os.mkdir(random_net_dir)
+        os.makedirs(random_net_dir, exist_ok=True)
         args.extend(
-            [(data_dir, random_net_dir, n, m, rs.integers(low=0, high=np.iinfo(np.int64).max)) for _ in
-             range(get_num_sampled_random_graphs())])
-    # We generate the random networks in parallel, and log if any random network
-    # generation step failed. 
-    result = engines.map_async(fast_gnm, args)
-    result.wait_interactive()
+            [(data_dir, random_net_dir, n, m, derive_seed(category, network, subnetwork, "generation", i)) for i in
+             range(1, get_num_sampled_random_graphs() + 1)])
+    # We generate the random networks in parallel, largest first, and log if any
+    # random network generation step failed. 
+    result = run_stage(engines, "random_network_generation", fast_gnm, args,
+                       costs=[estimate_cost(arg[2], arg[3], [], generate=True) for arg in args],
+                       memory=[estimate_memory("random_network_generation", arg[2], arg[3]) for arg in args],
+                       failure=fast_gnm_failure)
     set_logger("random_network_generation.log")
     logging.info(
         "The format is: "
@@ -97,41 +190,48 @@ def run_analysis():
     for net in nets:
         data_dir, category, network, subnetwork, n, m = net
         random_net_dir = os.path.join(get_data_dir() + category, network, subnetwork, "Graph-Data", "random-nets/")
-        if len(os.listdir(random_net_dir)) == get_num_sampled_random_graphs():
+        if len([f for f in os.listdir(random_net_dir) if f.endswith(".gt")]) == get_num_sampled_random_graphs():
             updated_nets.append(net)
     nets = updated_nets
 
     # --------------------------------------------------------------------------
     # score generation
     # --------------------------------------------------------------------------
-    # Setup the random number generator.
-    rs = np.random.default_rng(get_seed())
     # We create an array 'args' which contains for each empirical and randomly
     # generated network: the directory to read it from (the preprocessed
     # version), the directories to write the robustness scores against different
     # vertex removal strategies to, the random seed, the file name used for saving
-    # the robustness score, and the directory where all the datasets are saved. 
+    # the robustness score, and the directory where all the datasets are saved.
+    # The seeds are derived as in run_fused_scoring.
     args = []
+    costs = []
+    memory = []
     for (data_dir, category, network, subnetwork, n, m) in nets:
         base = os.path.join(data_dir + category, network, subnetwork) + "/"
-        robustness_score_dirs = [base + "Robustness-Score-Data/" + "static-targeted-attack/",
-                                 base + "Robustness-Score-Data/" + "adaptive-targeted-attack/",
-                                 base + "Robustness-Score-Data/" + "random-failure/"]
+        robustness_score_dirs = [base + "Robustness-Score-Data/" + strategy + "/" for strategy in strategies]
         for robustness_score_dir in robustness_score_dirs:
-            os.mkdir(robustness_score_dir)
+            os.makedirs(robustness_score_dir, exist_ok=True)
         random_net_dir = base + "Graph-Data/" + "random-nets/"
         args.extend([(os.path.join(random_net_dir, path), robustness_score_dirs,
-                      rs.integers(low=0, high=np.iinfo(np.int64).max), i + 1, data_dir)
+                      derive_seed(category, network, subnetwork, "scoring", i + 1), i + 1, data_dir)
                      for i, path in
-                     enumerate(os.listdir(random_net_dir))])
+                     enumerate(sorted(f for f in os.listdir(random_net_dir) if f.endswith(".gt")))])
+        # The empirical network is scored once for each tie-breaking seed, in a
+        # single task.
         pre_processed_file = base + "Graph-Data/preprocessed/" + subnetwork + ".gt"
-        args.append((pre_processed_file, robustness_score_dirs, rs.integers(low=0, high=np.iinfo(np.int64).max), 0,
-                     data_dir))
+        args.append((pre_processed_file, robustness_score_dirs,
+                     (derive_seed(category, network, subnetwork, "scoring", 0),) + tuple(
+                         derive_seed(category, network, subnetwork, "tie-breaking", s) for s in
+                         range(1, get_num_tie_breaking_seeds())), 0, data_dir))
+        memory.extend([estimate_memory("compute_robustness_score", n, m)] * (len(args) - len(costs)))
+        costs.extend([estimate_cost(n, m, strategies)] * (len(args) - len(costs) - 1))
+        costs.append(estimate_cost(n, m, strategies, num_seeds=get_num_tie_breaking_seeds()))
     # We compute the robustness score for all the empirical networks and
     # randomly generated networks, in parallel. If at any point the computation
-    # of the robustness score produces and error we log it. 
-    result = engines.map_async(compute_robustness_score, args)
-    result.wait_interactive()
+    # of the robustness score produces and error we log it. The tasks are
+    # scheduled largest first, under the memory budget.
+    result = run_stage(engines, "compute_robustness_score", compute_robustness_score, args, costs=costs,
+                       memory=memory, failure=compute_robustness_score_failure)
     set_logger("compute_robustness_score.log")
     logging.info(
         "The format is: "
@@ -149,77 +249,202 @@ def run_analysis():
     # network the corresponding directories where the robustness scores against
     # different vertex removal strategies are saved. However, we combine all the
     # information regarding robustness of the empirical networks and the
-    # size-matching random graphs in a "scores.pkl" pickle file. 
-    for (data_dir, category, network, subnetwork, n, m) in nets:
+    # size-matching random graphs in the score store. 
+    for net in nets:
+        data_dir, category, network, subnetwork, n, m = net
         base = os.path.join(data_dir + category, network, subnetwork) + "/"
 
-        shutil.rmtree(base + "Graph-Data/" + "random-nets/")
-
-        robustness_score_dirs = [base + "Robustness-Score-Data/" + "static-targeted-attack/",
-                                 base + "Robustness-Score-Data/" + "adaptive-targeted-attack/",
-                                 base + "Robustness-Score-Data/" + "random-failure/"]
+        robustness_score_dirs = [base + "Robustness-Score-Data/" + strategy + "/" for strategy in strategies]
 
-        res = {"main": {},
-               "baseline": {"static-targeted-attack": np.empty(shape=(get_num_sampled_random_graphs(), 100),
-                                                               dtype=float),
-                            "adaptive-targeted-attack": np.empty(shape=(get_num_sampled_random_graphs(), 100),
-                                                                 dtype=float),
-                            "random-failure": np.empty(shape=(get_num_sampled_random_graphs(), 100),
-                                                       dtype=float)}}
-        res["main"]["static-targeted-attack"] = np.load(robustness_score_dirs[0] + "0.npy")
-        res["main"]["adaptive-targeted-attack"] = np.load(robustness_score_dirs[1] + "0.npy")
-        res["main"]["random-failure"] = np.load(robustness_score_dirs[2] + "0.npy")
-        for i in range(1, get_num_sampled_random_graphs() + 1):
-            res["baseline"]["static-targeted-attack"][i - 1] = np.load(
-                robustness_score_dirs[0] + str(i) + ".npy")
-            res["baseline"]["adaptive-targeted-attack"][i - 1] = np.load(
-                robustness_score_dirs[1] + str(i) + ".npy")
-            res["baseline"]["random-failure"][i - 1] = np.load(robustness_score_dirs[2] + str(i) + ".npy")
-        shutil.rmtree(robustness_score_dirs[0])
-        shutil.rmtree(robustness_score_dirs[1])
-        shutil.rmtree(robustness_score_dirs[2])
-        with open(base + "Robustness-Score-Data/" + "scores.pkl", "wb") as scores_file:
-            pickle.dump(res, scores_file)
-
-    # --------------------------------------------------------------------------------
-    # postprocessing
-    # --------------------------------------------------------------------------------
-    # We turn off logging.
-    logging.shutdown()
-    cluster.stop_cluster_sync()
-    # This function recursively deletes empty directories, in a bottom-up fashion.
-    def remove_empty_folders(path):
-        # Function to remove empty folders.
-        if not os.path.isdir(path):
-            return
-        # Remove empty sub-folders.
-        files = os.listdir(path)
-        if len(files):
-            for f in files:
-                fullpath = os.path.join(path, f)
-                if os.path.isdir(fullpath):
-                    remove_empty_folders(fullpath)
-        # If the folder is empty, then we delete it.
-        files = os.listdir(path)
-        if len(files) == 0:
-            os.rmdir(path)
+        # The scores of the empirical network hold one curve per tie-breaking
+        # seed.
+        res = {"main": {}, "baseline": {}}
+        for strategy, robustness_score_dir in zip(strategies, robustness_score_dirs):
+            res["main"][strategy] = np.load(robustness_score_dir + "0.npy")
+            res["baseline"][strategy] = np.array(
+                [np.load(robustness_score_dir + str(i) + ".npy") for i in
+                 range(1, get_num_sampled_random_graphs() + 1)], dtype=float)
+        append_scores(category, network, subnetwork, n, m, res)
+        record_checkpoint("aggregation", net, (0,))
+        shutil.rmtree(base + "Graph-Data/" + "random-nets/")
+        for robustness_score_dir in robustness_score_dirs:
+            shutil.rmtree(robustness_score_dir)
+    return aggregated_nets + nets
 
-    # If any empirical network is discarded during analysis we remove the
-    # corresponding directory, and then remove empty parent directories
-    # recursively. After the above step, the datasets folder contains only the
-    # empirical networks for which the robustness and scale-freeness analysis is
-    # complete and their scores.
-    nets = set([(x[0], x[1], x[2], x[3]) for x in nets])
-    for category in get_categories(get_data_dir()):
-        for network in get_networks(get_data_dir(), category):
-            for subnetwork in get_subnetworks(get_data_dir(), category, network):
-                if not (get_data_dir(), category, network, subnetwork) in nets:
-                    shutil.rmtree(
-                        os.path.join(get_data_dir(), category, network, subnetwork) + "/")
-    remove_empty_folders(get_data_dir())
-    shutil.move(get_data_dir(), get_permanent_dir() + "datasets/")
-    shutil.move(get_log_dir(), get_permanent_dir() + "logs/")
 
+# run_fused_scoring(engines, nets) computes the robustness scores of the
+# networks in 'nets' and of their size-matching random graphs using the engines
+# 'engines'. The random graphs are generated and scored within the same task,
+# and only their scores are returned, such that nothing but the scores of each
+# empirical network in the score store is written to disk. The
+# seeds of each task are derived from the meta-seed and the task itself (see
+# derive_seed), and the scores are cached under the content of the scored
+# graph (the preprocessed file for the empirical network, and the parameters of
+# the generator for the random graphs), the strategies (see get_strategies in
+# engine/utils/store.py) with the batch fraction of the batch-adaptive attack,
+# and the seed, one entry per tie-breaking seed of an empirical network. Hence,
+# only tasks for new networks, changed networks, or additional random graphs
+# or seeds are computed. The tie-breaking seeds of an empirical network are
+# scored in one task on its loaded graph, unless that task would take longer
+# than the average work per engine of the stage, which would bound the
+# makespan. Its seeds are then split among several tasks (see split_seeds),
+# which share the graph in the memory of each node (see
+# engine/utils/shared.py). Each network is compared to
+# get_num_sampled_random_graphs() random graphs, or, if they are sampled
+# adaptively (see set_adaptive_baselines), the random graphs are generated and
+# scored in rounds, each adding the random graphs that get_num_baselines asks
+# for to the networks that need more. As the seeds of the i-th random graph of a
+# network only depend on the network and i, the number of random graphs of each
+# network, which is recorded in the score store and in the log, suffices to
+# reproduce its scores. The networks for which all steps succeeded are
+# returned.
+def run_fused_scoring(engines, nets):
+    strategies = get_strategies()
+    manifest = load_manifest(get_data_dir())
+    digests = dict(zip(zip(manifest["category"], manifest["network"], manifest["subnetwork"]), manifest["sha256"]))
+    adaptive = get_baseline_half_width() is not None
+    # The index of the last graph scored so far of each network (0 corresponds
+    # to the original network, >0 to the index in the size-matching random
+    # graph baseline), and the index up to which it is to be scored.
+    scored = {net: -1 for net in nets}
+    targets = {net: get_num_baselines([]) if adaptive else get_num_sampled_random_graphs() for net in nets}
+    # The tie-breaking seeds of each empirical network, whose first seed is
+    # the one it had before there were several, and its scores under each seed.
+    seeds = {net: (derive_seed(net[1], net[2], net[3], "scoring", 0),) + tuple(
+        derive_seed(net[1], net[2], net[3], "tie-breaking", s) for s in range(1, get_num_tie_breaking_seeds()))
+             for net in nets}
+    main = {net[1:4]: {} for net in nets}
+    scores = {}
+    failed = set()
+    results = []
+    num_cached = 0
+    num_rounds = 0
+    while any(targets[net] > scored[net] for net in nets if net[1:4] not in failed):
+        # We create an array 'args' which contains for each random graph of
+        # this round whose scores are not cached: the dataset's directory, the
+        # network's category, network, and subnetwork, the number of vertices
+        # (n), the number of edges (m), the seed for generating the graph, the
+        # seed for computing the scores, and the index. The tie-breaking seeds
+        # of the empirical networks whose scores are not cached are collected
+        # in 'pending'.
+        args = []
+        keys = {}
+        pending = {}
+        for net in nets:
+            data_dir, category, network, subnetwork, n, m = net
+            if (category, network, subnetwork) in failed:
+                continue
+            digest = digests[(category, network, subnetwork)]
+            for i in range(scored[net] + 1, targets[net] + 1):
+                if i == 0:
+                    for seed in seeds[net]:
+                        key = cache_key("robustness_scores", digest, strategies, get_batch_adaptive_fraction(), seed)
+                        cached = cache_load(key)
+                        if cached is not None:
+                            main[(category, network, subnetwork)][seed] = cached
+                            num_cached += 1
+                        else:
+                            keys[(category, network, subnetwork, 0, seed)] = key
+                            pending[net] = pending.get(net, ()) + (seed,)
+                    continue
+                generation_seed = derive_seed(category, network, subnetwork, "generation", i)
+                scoring_seed = derive_seed(category, network, subnetwork, "scoring", i)
+                key = cache_key("robustness_scores", ("gnm", n, m, generation_seed), strategies,
+                                get_batch_adaptive_fraction(), scoring_seed)
+                cached = cache_load(key)
+                if cached is not None:
+                    scores[(category, network, subnetwork, i)] = cached
+                    num_cached += 1
+                else:
+                    keys[(category, network, subnetwork, i)] = key
+                    args.append((data_dir, category, network, subnetwork, n, m, generation_seed, scoring_seed, i))
+            scored[net] = targets[net]
+        # The empirical networks are scored by one task per group of their
+        # pending tie-breaking seeds, whose seed is the tuple of the seeds of
+        # the group and whose generation seed is None.
+        costs = [estimate_cost(arg[4], arg[5], strategies, generate=True) for arg in args]
+        limit = (sum(costs) + sum(estimate_cost(net[4], net[5], strategies, num_seeds=len(group))
+                                  for net, group in pending.items())) / get_num_engines()
+        for net, group in pending.items():
+            cost = estimate_cost(net[4], net[5], strategies, num_seeds=len(group))
+            for scoring_seed in split_seeds(group, cost, limit):
+                args.append(net + (None, scoring_seed, 0))
+                costs.append(estimate_cost(net[4], net[5], strategies, num_seeds=len(scoring_seed)))
+        # We compute the robustness scores in parallel. Empirical networks
+        # scored by several of the tasks that are not checkpointed yet are kept
+        # in the shared memory of each node.
+        records = load_checkpoint("compute_robustness_score")
+        register_shared_graphs(get_data_dir(), Counter(
+            os.path.join(arg[0] + arg[1], arg[2], arg[3], "Graph-Data", "preprocessed", arg[3] + ".gt")
+            for arg in args if arg[8] == 0 and not is_checkpointed(records, arg)))
+        result = run_stage(engines, "compute_robustness_score", fused_robustness_score, args, costs=costs,
+                           memory=[estimate_memory("compute_robustness_score", arg[4], arg[5]) for arg in args],
+                           failure=fused_robustness_score_failure)
+        clear_shared_graphs(engines, get_data_dir())
+        num_rounds += 1
+        for args in result:
+            if args[0] == 0 and args[6] == 0:
+                for seed, curves in zip(args[5], args[-1]):
+                    main[args[1:4]][seed] = curves
+                    cache_store(keys[args[1:4] + (0, seed)], curves)
+            elif args[0] == 0:
+                scores[args[1:4] + (args[6],)] = args[-1]
+                cache_store(keys[args[1:4] + (args[6],)], args[-1])
+            elif args[0] == 1:
+                failed.add(args[1:4])
+        results.extend(result)
+        # The scores of an empirical network under all of its tie-breaking
+        # seeds are gathered in one S x strategies x 100 array. A network missing any of
+        # its scores so far, e.g. because a task was lost without reporting a
+        # failure, is discarded as well.
+        for net in nets:
+            if scored[net] >= 0 and all(seed in main[net[1:4]] for seed in seeds[net]):
+                scores[net[1:4] + (0,)] = np.stack([main[net[1:4]][seed] for seed in seeds[net]])
+            if any(net[1:4] + (i,) not in scores for i in range(scored[net] + 1)):
+                failed.add(net[1:4])
+        # The networks whose random graphs are sampled adaptively are given
+        # the number of random graphs that their scores so far call for.
+        if adaptive:
+            for net in nets:
+                if net[1:4] not in failed:
+                    targets[net] = get_num_baselines(
+                        [scores[net[1:4] + (i,)] for i in range(1, scored[net] + 1)])
+    # We log the computed scores and the failed tasks, and the number of random
+    # graphs to which each network is compared.
+    set_logger("compute_robustness_score.log")
+    logging.info(
+        "The format is: "
+        """Category, Network Dataset, Network, Seed (for generation), Seed (for
+        randomization/tie-breaking), Index (0 corresponds to the original
+        network, >0 corresponds to the index in the size-matching random graph baseline)""")
+    for args in results:
+        if args[0] == 0:
+            logging.info("Computed the score with the following parameters: %s", args[1:-1])
+        elif args[0] == 1:
+            logging.error("Failed to compute the score with the following parameters: %s", args[1:-1])
+    logging.info("Reused %s scores from the cache", num_cached)
+    for net in nets:
+        if net[1:4] not in failed:
+            logging.info("Compared %s to %s size-matching random graphs", net[1:4], scored[net])
+    logging.info("Scored the random graphs in %s rounds", num_rounds)
+    reset_logger()
+    # If for an empirical network any of the scores could not be computed, we
+    # discard it from analysis. For the remaining networks, we combine all the
+    # information regarding robustness of the empirical networks (under each
+    # tie-breaking seed) and the size-matching random graphs in the score store.
+    updated_nets = []
+    for net in nets:
+        data_dir, category, network, subnetwork, n, m = net
+        if (category, network, subnetwork) in failed:
+            continue
+        res = {"main": {}, "baseline": {}}
+        for j, strategy in enumerate(strategies):
+            res["main"][strategy] = scores[(category, network, subnetwork, 0)][:, j]
+            res["baseline"][strategy] = np.array(
+                [scores[(category, network, subnetwork, i)][j] for i in range(1, scored[net] + 1)], dtype=float)
+        append_scores(category, network, subnetwork, n, m, res)
+        updated_nets.append(net)
+    return updated_nets
 
 # argument_checker(x) verifies that the user input specifying the amount of
 # cores to use for this script is valid and raises an error if it is not.
@@ -235,8 +460,19 @@ def argument_checker(x):
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--cores', type=argument_checker, required=True)
+    # --backend sets where the tasks run (see engine/utils/executor.py): on an
+    # ipyparallel cluster launched with MPI by default, or e.g. on a local
+    # process pool for small runs.
+    parser.add_argument('--backend', choices=backends, default="ipyparallel")
+    # --memory-budget sets the memory in GiB per node that the tasks in flight
+    # may use according to their estimates, by default 80% of the physical
+    # memory of the node (see engine/utils/scheduling.py).
+    parser.add_argument('--memory-budget', type=float, default=None)
     cli_input = parser.parse_args()
     set_num_engines(cli_input.cores)
+    set_backend(cli_input.backend)
+    if cli_input.memory_budget is not None:
+        set_memory_budget(cli_input.memory_budget * 2 ** 30)
     # set_seed(init_seed) sets the meta-seed for the randomness in the analysis.
     set_seed(0)
     # set_cut_off(min_num_vertices, min_num_edges) sets the minimum number of
@@ -247,6 +483,35 @@ if __name__ == '__main__':
     # number of size-matching random networks compared to each empirical network
     # to evaluate its relative robustness.
     set_num_sampled_random_graphs(10)
+    # set_adaptive_baselines(half_width, min_num, max_num) sets the number of
+    # size-matching random networks to be chosen per network instead: they are
+    # sampled in rounds, starting with 'min_num', until the 95% confidence
+    # interval of their mean score is at most 'half_width' wide on each side
+    # (e.g. 0.001), or 'max_num' were sampled. None keeps the number above.
+    set_adaptive_baselines(None, 4, 100)
+    # set_num_tie_breaking_seeds(number_of_tie_breaking_seeds) sets the number
+    # of seeds under which each empirical network is scored, to measure how
+    # much its scores depend on how ties between vertices are broken. The store
+    # holds the scores of the first seed, and their mean and standard deviation
+    # over all seeds.
+    set_num_tie_breaking_seeds(5)
+    # set_batch_adaptive_fraction(batch_fraction) sets the fraction of the
+    # remaining vertices removed per round by the batch-adaptive targeted
+    # attack, an approximation of the adaptive targeted attack. See accuracy.py
+    # for its speed and accuracy on the collection under several fractions.
+    set_batch_adaptive_fraction(0.01)
+    # set_score_edges(score) sets whether the networks are also scored under
+    # random edge failures and edge attacks by degree product and betweenness,
+    # which about doubles the cost of scoring.
+    set_score_edges(False)
+    # set_fused_baselines(fused) sets whether the size-matching random graphs
+    # are generated and scored in memory (True), or written to disk first for
+    # debugging (False).
+    set_fused_baselines(True)
+    # set_cache_limits(max_age, max_size) sets how long (in seconds) an unused
+    # entry is kept in the result cache, and how large (in bytes) the cache may
+    # grow, before entries are evicted.
+    set_cache_limits(30 * 24 * 60 * 60, 50 * 2 ** 30)
     # set_working_dir(working_dir_path) sets the working directory where the
     # analysis is performed, and the corresponding results are temporarily
     # saved. For example:
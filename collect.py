@@ -1,39 +1,22 @@
 import argparse
-import gzip
+import io
 import os
-import re
 import shutil
-import tarfile
 import time
-import warnings
-import zipfile
 import graph_tool.all as gt
 import numpy as np
 import pandas as pd
-import rarfile
-import requests
 import scipy
-from engine.config.config import set_num_engines
-
-global num_engines
-
-# process_map(func, args, desc) is a wrapper function that imports and calls
-# the tqdm.contrib.concurrent process_map function on the arguments 'func',
-# 'args', and 'desc'.
-def process_map(func, args, desc):
-    from tqdm.contrib.concurrent import process_map
-    return process_map(func, args, desc=desc, max_workers=num_engines)
-
-# listdir(addr) returns the contents of the directory on at the path of the
-# argument 'addr'. In case this is run on MacOS the ".DS_Store" file is
-# automatically removed.
-def listdir(addr):
-    res = os.listdir(addr)
-    try:
-        res.remove(".DS_Store")
-    except (Exception,):
-        pass
-    return res
+from engine.config.config import set_num_engines, get_num_engines, set_download_options, get_download_max_workers, \
+    set_netzschleuder_mirror, set_keep_original_graphs, get_keep_original_graphs, set_backend, get_backend
+from engine.utils.executor import backends, start_executor, stop_executor
+from engine.utils.io import ingest
+from engine.utils.manifest import update_manifest
+from engine.utils.download import download_file
+from engine.utils.archive import iter_members, open_member
+from engine.utils.parsing import read_edges, read_pajek_edges
+from engine.utils.pipeline import run_pipeline
+from engine.utils.mirror import fetch_netzschleuder, load_netzschleuder
 
 # mkdir(addr, wipe=True) creates a new directory and takes two arguments. 'addr'
 # specifies the path to where the new directory should be added and its name.
@@ -53,314 +36,247 @@ def mkdir(addr, wipe=True):
     except Exception as exc:
         print(exc)
 
-# decompress((read_addr, write_addr)) decompresses the file located at
-# 'read_addr' and stores the result in 'write_addr'. The function is capable of
-# decompressing files of type .tar.gz, .tar.bz2, .zip, .gz, and .rar.
-def decompress(args):
-    read_addr, write_addr = args
-    if read_addr.endswith(".tar.gz") or read_addr.endswith(".tar.bz2"):
-        tar_f = tarfile.open(read_addr)
-        tar_f.extractall(write_addr)
-        tar_f.close()
-
-    elif read_addr.endswith(".zip"):
-        with zipfile.ZipFile(read_addr, "r") as zip_f:
-            zip_f.extractall(write_addr)
-
-    elif read_addr.endswith(".gz"):
-        with gzip.open(read_addr, 'r') as gz_f:
-            with open(write_addr + read_addr.split("/")[-1][:-len(".gz")], 'wb') as f_out:
-                shutil.copyfileobj(gz_f, f_out)
-
-    elif read_addr.endswith(".rar"):
-        with rarfile.RarFile(read_addr, 'r') as archive:
-            archive.extractall(path=write_addr)
-
-# konect_to_gt((saving_name, konect_name)) loads the KONECT network located in
-# the folder by the name 'konect_name', adapts it to the graph-tool format and
-# saves it using the 'saving_name'.
+# save_collected(g, source, network, subnetwork, category) ingests the
+# collected graph 'g' into the dataset in a single pass (see ingest() in
+# engine/utils/io.py). The function returns a tuple containing the name of the
+# network along with the path to the location where it is stored.
+def save_collected(g, source, network, subnetwork, category):
+    return (source, network, subnetwork, category,
+            ingest(g, (os.getcwd() + "/datasets/", category, network, subnetwork), source))
+
+# konect_to_gt((saving_name, category, archive_addr)) loads the KONECT network
+# stored in the archive at 'archive_addr' by reading its "out.*" edge list
+# straight out of the archive, in a single pass over it, adapts it to the graph-tool format and saves it
+# using the 'saving_name'. The archive is removed once it has been converted.
+# The function returns a tuple containing the name of the network along with
+# the path to the location where it is stored.
 def konect_to_gt(args):
-    saving_name, konect_name = args
+    saving_name, category, archive_addr = args
     g = gt.Graph(directed=False)
-    prefix = "konect_decompressed/" + konect_name
 
-    for postfix in listdir(prefix):
-        if not postfix.startswith("out."):
-            continue
-        else:
-            edges = np.loadtxt("konect_decompressed/" + konect_name + "/" + postfix, dtype=int, comments="%")
-            edges[:, :2] -= 1
-            g.add_edge_list(edges)
-            g.save("konect/" + saving_name + ".gt", fmt="gt")
+    for _, f in iter_members(archive_addr, lambda member: member.split("/")[-1].startswith("out."), text=True):
+        edges = read_edges(f, comments="%")
+        edges -= 1
+        g.add_edge_list(edges)
+    os.remove(archive_addr)
+    return save_collected(g, "KONECT", saving_name, saving_name, category)
 
 # transfer_edges(edges_list) takes an edge list 'edge_list' and in which
 # vertices have arbitrary names and translates these names to indices starting
-# at 0. The resulting edgelist with the renamed vertices is returned.
+# at 0, in the order in which the vertices first appear in the edge list. The
+# edge list is an array with two columns or a list of pairs, and the resulting
+# edgelist with the renamed vertices is returned as an int64 array with two
+# columns. Vertex names are factorised in one vectorised pass by pandas, which
+# hashes integer names natively and string names as objects.
 def transfer_edges(edges_list):
-    index_map = {}
-    index = 0
-    edges = []
-
-    for i in range(len(edges_list)):
-        u, v = edges_list[i]
-        if u not in index_map:
-            index_map[u] = index
-            index += 1
-        if v not in index_map:
-            index_map[v] = index
-            index += 1
-        edges.append((index_map[u], index_map[v]))
-
-    return edges
-
-# snap_to_gt((snap_name, cat, f_read_addr)) reads the snap network stored at
-# 'f_read_addr', adapts it to the graph-tool format and saves it using the
-# 'snap_name'. The function returns a tuple containing the name of the network
-# along with the path to the location where it is stored.
+    edges = edges_list if isinstance(edges_list, np.ndarray) else np.array(edges_list, dtype=object)
+    if len(edges) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    codes, _ = pd.factorize(edges.reshape(-1), use_na_sentinel=False)
+    return codes.astype(np.int64, copy=False).reshape(-1, 2)
+
+# snap_to_gt((snap_name, cat, edges)) adapts the snap network with the edge
+# list 'edges' (see snap_members) to the graph-tool format and saves it using
+# the 'snap_name'. The function returns a tuple containing the name of the
+# network along with the path to the location where it is stored.
 def snap_to_gt(args):
-    snap_name, cat, f_read_addr = args
+    snap_name, cat, edges = args
     g = gt.Graph(directed=False)
-    g.add_edge_list(transfer_edges(np.loadtxt(f_read_addr, dtype=int, delimiter=",", skiprows=1)))
+    g.add_edge_list(edges)
 
     network, subnetwork = snap_name.split("/") if len(snap_name.split("/")) == 2 else [snap_name.split("/")[0]] * 2
-    mkdir(os.getcwd() + "/snap/" + network, wipe=False)
-    g.save(os.getcwd() + "/snap/" + network + "/" + subnetwork + ".gt", fmt="gt")
-
-    return ("SNAP", network, subnetwork, cat, os.getcwd() + "/snap/" + network + "/" + subnetwork + ".gt")
+    return save_collected(g, "SNAP", network, subnetwork, cat)
 
 # download((url, f_name)) downloads the 'url' and stores the content in a file
-# named by 'f_name'. If the download is successful, 
+# named by 'f_name'. The function returns whether the download is successful
+# (see engine/utils/download.py for retries, resuming, and mirrors).
 def download(args):
     url, f_name = args
-    try:
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            with requests.get(url, stream=True, verify=False) as r:
-                r.raise_for_status()
-                with open(f_name, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=1 << 20):
-                        f.write(chunk)
-        return True
-    except:
-        print("couldn't download file: " + f_name)
-        return False
-
-# collect_konect(df_konect) takes a dataframe containing the names of all KONECT
-# networks to be collected in 'df_konect' and then respectively downloads,
-# decompresses, and formats them in parallel. The function returns a list of
-# tuples containing the names of the networks along with the paths to the
-# locations where they are stored.
-def collect_konect(df_konect):
+    return download_file(url, f_name)
+
+# download_stage((url, f_name, outputs)) is the pipeline stage (see
+# engine/utils/pipeline.py) that downloads the 'url' to a file named by
+# 'f_name'. It returns the list 'outputs' of arguments of the next stage if the
+# download is successful, and None otherwise.
+def download_stage(args):
+    url, f_name, outputs = args
+    return outputs if download((url, f_name)) else None
+
+# konect_jobs(df_konect) takes a dataframe containing the names of all KONECT
+# networks to be collected in 'df_konect' and returns the pipeline jobs that
+# download each network and format it, reading the edge list straight out of
+# the archive. The directory of the archives is kept if it already exists,
+# such that the downloads of an interrupted run resume from their ".part" files
+# (see engine/utils/download.py).
+def konect_jobs(df_konect):
     addr_raw = os.getcwd() + "/konect_raw/"
-    addr_decompressed = os.getcwd() + "/konect_decompressed/"
-    addr_processed = os.getcwd() + "/konect/"
-
-    mkdir(addr_raw)
-    mkdir(addr_decompressed)
-    mkdir(addr_processed)
-
-    net_list = [(x.split("[")[-1].split("]")[0], x.split(" [")[0]) for x in df_konect["Name"].values]
-    name_map = dict(net_list)
-    url_list = ["http://konect.cc/files/download.tsv." + internal_name + ".tar.bz2" for (internal_name, _) in net_list]
-
-    process_map(download, [(url, addr_raw + url.split("/")[-1][len("download.tsv."):]) for url in url_list],
-                desc="collect_konect")
-    process_map(decompress, [(addr_raw + f_name, addr_decompressed) for f_name in listdir(addr_raw)],
-                desc="decompress_konect")
-    process_map(konect_to_gt, [(name_map[f_name], f_name) for f_name in listdir(addr_decompressed)],
-                desc="konect_to_gt")
-
-    shutil.rmtree(addr_raw)
-    shutil.rmtree(addr_decompressed)
-
-    return [("KONECT", x.split(" [")[0], x.split(" [")[0], y, os.getcwd() + "/konect/" + x.split(" [")[0] + ".gt") for
-            (x, y) in
-            list(zip(df_konect["Name"], df_konect["Category"]))]
+    mkdir(addr_raw, wipe=False)
+
+    stages = [("konect_download", "io", download_stage), ("konect_to_gt", "cpu", konect_to_gt)]
+    jobs = []
+    for (x, y) in list(zip(df_konect["Name"], df_konect["Category"])):
+        internal_name, saving_name = x.split("[")[-1].split("]")[0], x.split(" [")[0]
+        f_name = addr_raw + internal_name + ".tar.bz2"
+        jobs.append((stages, ("http://konect.cc/files/download.tsv." + internal_name + ".tar.bz2", f_name,
+                              [(saving_name, y, f_name)])))
+    return jobs
+
+# netzschleuder_fetch(arg) is the pipeline stage that fetches the
+# Netzschleuder network specified by 'arg' into the local mirror (see
+# engine/utils/mirror.py), and returns 'arg' along with the path of the network
+# in the mirror.
+def netzschleuder_fetch(arg):
+    return arg + (fetch_netzschleuder(arg[1], arg[2]),)
 
 # netzschleuder_helper(arg) is a helper function that uses the graph-tool
-# library to collect the network specified by 'arg' and stores it in the
-# location also specified by 'arg'.
+# library to load the network specified by 'arg' from the local mirror, whose
+# path is also specified by 'arg', and stores it in the dataset. The function
+# returns a tuple containing the name of the network along with the path to the
+# location where it is stored.
 def netzschleuder_helper(arg):
-    gt.collection.ns[arg[1] + "/" + arg[2] if arg[1] != arg[2] else arg[1]].save(arg[-1], fmt="gt")
-
-# collect_netzschleuder(df_netzschleuder) takes a dataframe containing the names
-# of all Netzschleuder networks to be collected in 'df_netzschleuder' and then
-# collects them in parallel using the netzschleuder_helper(arg) function. The
-# function returns a list of tuples containing the names of the networks along
-# with the paths to the locations where they are stored.
-def collect_netzschleuder(df_netzschleuder):
-    addr_netzschleuder = os.getcwd() + "/netzschleuder/"
-    mkdir(addr_netzschleuder)
-    
-    args = []
+    return save_collected(load_netzschleuder(arg[-1]), arg[0], arg[1], arg[2], arg[3])
+
+# netzschleuder_jobs(df_netzschleuder) takes a dataframe containing the names
+# of all Netzschleuder networks to be collected in 'df_netzschleuder' and
+# returns the pipeline jobs that fetch each network into the local mirror and
+# store it using the netzschleuder_helper(arg) function.
+def netzschleuder_jobs(df_netzschleuder):
+    stages = [("netzschleuder_fetch", "io", netzschleuder_fetch), ("netzschleuder", "cpu", netzschleuder_helper)]
+    jobs = []
     for (x, y) in list(zip(df_netzschleuder["Name"], df_netzschleuder["Category"])):
         network, subnetwork = x.split("/") if len(x.split("/")) == 2 else [x.split("/")[0]] * 2
-        net_addr = addr_netzschleuder + network + "/"
-        mkdir(net_addr, wipe=False)
-        args.append(("Netzschleuder", network, subnetwork, y, net_addr + subnetwork + ".gt"))
-
-    process_map(netzschleuder_helper, args, desc="collect_netzschleuder")
-
-    return args
+        jobs.append((stages, ("Netzschleuder", network, subnetwork, y)))
+    return jobs
+
+# snap_members((archive_addr, name_cat_map)) reads the edge lists stored in the
+# SNAP archive at 'archive_addr', in a single pass over it, and formats and
+# saves each of them with snap_to_gt() as soon as it is read, with the vertices
+# renamed to indices (see transfer_edges), such that the edge lists are never
+# sent between processes. The networks are named after the directory (twitch)
+# or the file (deezer) they are stored in, and their categories are looked up
+# in 'name_cat_map'. The function returns the list of the results of
+# snap_to_gt().
+def snap_members(args):
+    archive_addr, name_cat_map = args
+    res = []
+    for member, f in iter_members(archive_addr, lambda member: member.endswith("edges.csv"), text=True):
+        name, f_name = os.path.dirname(member), os.path.basename(member)
+        if name.startswith("twitch"):
+            snap_name = "musae-twitch/" + name.split("/")[-1]
+        elif name.startswith("deezer"):
+            snap_name = "gemsec-Deezer/" + f_name.split("_")[0]
+        else:
+            snap_name = "musae-github"
+        res.append(snap_to_gt((snap_name, name_cat_map[snap_name],
+                               transfer_edges(read_edges(f, delimiter=",", skip_header=1)))))
+    return res
 
-# collect_snap(df_snap) takes a dataframe containing the names of all SNAP
-# networks to be collected in 'df_snap' and then respectively downloads,
-# decompresses, and formats them in parallel. The function returns a list of
-# tuples containing the names of the networks along with the paths to the
-# locations where they are stored.
-def collect_snap(df_snap):
+# snap_jobs(df_snap) takes a dataframe containing the names of all SNAP
+# networks to be collected in 'df_snap' and returns the pipeline jobs that
+# download each archive, and read and format the networks in it, reading the
+# edge lists straight out of the archive. As in konect_jobs(), the directory of
+# the archives is kept if it already exists.
+def snap_jobs(df_snap):
     name_cat_map = dict(zip(df_snap["Name"], df_snap["Category"]))
     addr_snap_raw = os.getcwd() + "/snap_raw/"
-    addr_snap_decompressed = os.getcwd() + "/snap_decompressed/"
-    addr_snap_processed = os.getcwd() + "/snap/"
-    mkdir(addr_snap_raw)
-    mkdir(addr_snap_decompressed)
-    mkdir(addr_snap_processed)
+    mkdir(addr_snap_raw, wipe=False)
 
     urls = ["https://snap.stanford.edu/data/git_web_ml.zip",
             "https://snap.stanford.edu/data/twitch.zip",
             "https://snap.stanford.edu/data/gemsec_deezer_dataset.tar.gz",
             ]
 
-    process_map(download, [(url, addr_snap_raw + url.split("/")[-1]) for url in urls], desc="collect_snap")
-    process_map(decompress, [(addr_snap_raw + url.split("/")[-1], addr_snap_decompressed) for url in urls],
-                desc="decompress_snap")
-
-    args = []
-    for x in os.walk(os.getcwd() + "/snap_decompressed/"):
-        if len(x[1]) == 0:
-            name = x[0].removeprefix(os.getcwd() + "/snap_decompressed/")
-            if name.startswith("twitch"):
+    stages = [("snap_download", "io", download_stage), ("snap_members", "cpu", snap_members)]
+    return [(stages, (url, addr_snap_raw + url.split("/")[-1], [(addr_snap_raw + url.split("/")[-1], name_cat_map)]))
+            for url in urls]
 
-                args.extend([("musae-twitch/" + name.split("/")[-1], x[0] + "/" + f_name) for f_name in x[2] if
-                             f_name.endswith("edges.csv")])
-
-            elif name.startswith("deezer"):
-                args.extend([("gemsec-Deezer/" + f_name.split("_")[0], x[0] + "/" + f_name) for f_name in x[2] if
-                             f_name.endswith("edges.csv")])
-            else:
-                args.extend([("musae-github", x[0] + "/" + f_name) for f_name in x[2] if f_name.endswith("edges.csv")])
-    args = process_map(snap_to_gt, [(snap_name, name_cat_map[snap_name], addr_read) for (snap_name, addr_read) in args],
-                       desc="snap_to_gt")
-    shutil.rmtree(addr_snap_raw)
-    shutil.rmtree(addr_snap_decompressed)
-    return args
-
-# icon_fb_to_gt((icon_name, addr_write, add_read)) loads the Facebook100 network
-# located in 'add_read', adapts it to the graph-tool format and saves it using
-# the 'saving_name'. The function returns a tuple containing the name of the
-# network along with the path to the location where it is stored.
+# icon_fb_to_gt((icon_name, archive_addr, member)) loads the Facebook100
+# network stored as 'member' in the zip archive at 'archive_addr', adapts it to
+# the graph-tool format and saves it using the 'icon_name'. The
+# adjacency matrix is symmetric, so only the index arrays of its upper triangle
+# are passed to graph-tool, which adds every undirected edge once. The function
+# returns a tuple containing the name of the network along with the path to the
+# location where it is stored.
 def icon_fb_to_gt(args):
-    icon_name, addr_write, add_read = args
-    A = scipy.io.loadmat(os.path.join(add_read))["A"].tocsr().astype(bool)
-    sources, targets, _ = scipy.sparse.find(A)
+    icon_name, archive_addr, member = args
+    with open_member(archive_addr, member) as f:
+        A = scipy.io.loadmat(io.BytesIO(f.read()))["A"]
+    A = scipy.sparse.triu(A, format="coo")
 
     g = gt.Graph(directed=False)
     g.add_vertex(A.shape[0])
-    g.add_edge_list([(sources[j], targets[j]) for j in range(len(sources))])
-    g.save(addr_write)
-
-    return ("ICON", "Facebook100", icon_name, "Social", addr_write)
-
-# collect_fb(addr_icon, args_fb) collects all the Facebook100 networks listed in
-# 'args_fb' in parallel using the icon_fb_to_gt() function and returns a list of
-# tuples containing the names of the networks along with the paths to the
-# locations where they are stored.
-def collect_fb(addr_icon, args_fb):
-    raw_dir = addr_icon + "fb_raw/"
-    decompressed_dir = addr_icon + "fb_decompressed/"
-    write_dir = addr_icon + "Facebook100/"
-    mkdir(raw_dir)
-    mkdir(decompressed_dir)
-    mkdir(write_dir)
-    if not download(("https://archive.org/download/oxford-2005-facebook-matrix/facebook100.zip", raw_dir + "facebook.zip")):
-        print("Unable to download Facebook100 networks")
-        shutil.rmtree(raw_dir)
-        shutil.rmtree(decompressed_dir)
-        return None
-    decompress((raw_dir + "facebook.zip", decompressed_dir))
-    args = [(arg, addr_icon + "Facebook100/" + arg + ".gt",
-             decompressed_dir + "facebook100/" + (arg if arg != "Wash U32" else "WashU32") + ".mat") for arg in args_fb]
-    args = process_map(icon_fb_to_gt, args, desc="icon_Facebook100")
-
-    shutil.rmtree(raw_dir)
-    shutil.rmtree(decompressed_dir)
-    return args
-
-# find_skip(file_path) reads the file containing an edgelist at 'file_path' and
-# finds the line numbers where the edgelist begins and ends and returns these in
-# a list.
-def find_skip(file_path):
-    file = open(file_path)
-    skip = 0
-    footer = 0
-    edges = True
-    triangles = False
-
-    for line in file.read().splitlines():
-        if edges:
-            skip = skip + 1
-        if line[:len("*Edges")] == "*Edges":
-            edges = False
-        if line[:len("*Triangles")] == "*Triangles":
-            triangles = True
-        if triangles:
-            footer = footer + 1
-
-    return [skip, footer]
-
-# icon_rest_to_gt((addr_icon, icon_name, read_path, category, network, subnetwork)) 
-# loads the ICON networks with assorted sources located in 'add_read', adapts it
-# to the graph-tool format and saves it using the 'saving_name'. The function
-# returns a tuple containing the name of the network along with the path to the
-# location where it is stored. 
+    g.add_edge_list(np.stack([A.row, A.col], axis=1).astype(np.int64, copy=False))
+    return save_collected(g, "ICON", "Facebook100", icon_name, "Social")
+
+# fb_jobs(addr_icon, args_fb) returns the pipeline jobs that download the
+# Facebook100 zip archive and format all the networks listed in 'args_fb' using
+# the icon_fb_to_gt() function, reading them one at a time straight out of the
+# archive.
+def fb_jobs(addr_icon, args_fb):
+    if len(args_fb) == 0:
+        return []
+    f_name = addr_icon + "raw/facebook.zip"
+    args = [(arg, f_name,
+             "facebook100/" + (arg if arg != "Wash U32" else "WashU32") + ".mat") for arg in args_fb]
+    stages = [("fb_download", "io", download_stage), ("icon_Facebook100", "cpu", icon_fb_to_gt)]
+    return [(stages, ("https://archive.org/download/oxford-2005-facebook-matrix/facebook100.zip", f_name, args))]
+
+# icon_rest_to_gt((icon_name, archive_addr, member, category, network, subnetwork))
+# loads the ICON networks with assorted sources stored as 'member' in the
+# archive at 'archive_addr' (or in the plain file 'archive_addr' if 'member' is
+# None), adapts it to the graph-tool format and saves it using the 'network' and
+# 'subnetwork'. The function returns a tuple containing the name of the
+# network along with the path to the location where it is stored. 
 def icon_rest_to_gt(args):
-    saving_name, icon_name, add_read, category, network, subnetwork = args
+    icon_name, archive_addr, member, category, network, subnetwork = args
     g = gt.Graph(directed=False)
 
+    # open_read() opens the edge list straight out of the archive.
+    def open_read():
+        return open_member(archive_addr, member, text=True)
+
+    # read(**kwargs) and read_pajek(**kwargs) call read_edges() and
+    # read_pajek_edges() on the edge list.
+    def read(**kwargs):
+        with open_read() as f:
+            return read_edges(f, **kwargs)
+
+    def read_pajek(**kwargs):
+        with open_read() as f:
+            return read_pajek_edges(f, **kwargs)
+
     if icon_name.startswith("AMiner"):
-        skip_header, skip_footer = find_skip(add_read)
-        g.add_edge_list(transfer_edges(
-            np.genfromtxt(add_read, usecols=[0, 1], skip_header=skip_header, skip_footer=skip_footer, dtype=int)))
+        g.add_edge_list(transfer_edges(read_pajek()))
     elif icon_name.startswith("India"):
-        skip_header, skip_footer = find_skip(add_read)
-        g.add_edge_list(
-            transfer_edges(np.genfromtxt(add_read, usecols=[0, 1], skip_header=1, skip_footer=skip_footer, dtype=str)))
+        g.add_edge_list(transfer_edges(read(comments="#", skip_header=1, dtype=str)))
     elif icon_name.startswith("PGP"):
-        skip_header, skip_footer = find_skip(add_read)
-        g.add_edge_list(
-            transfer_edges(np.genfromtxt(add_read, usecols=[0, 1], skip_header=skip_header, skip_footer=0, dtype=int)))
+        g.add_edge_list(transfer_edges(read_pajek()))
     elif icon_name.startswith("S. cerevisiae"):
-        g.add_edge_list(transfer_edges(np.genfromtxt(add_read, usecols=[0, 1], dtype=str)))
+        g.add_edge_list(transfer_edges(read(comments="#", dtype=str)))
     elif icon_name.startswith("WHOIS"):
-        g.add_edge_list(transfer_edges(np.genfromtxt(add_read, usecols=[0, 1], dtype=int)))
+        g.add_edge_list(transfer_edges(read(comments="#")))
     elif icon_name.startswith("Flickr"):
-        g.add_edge_list(transfer_edges(np.genfromtxt(add_read, usecols=[0, 1], skip_header=4, dtype=int)))
+        g.add_edge_list(transfer_edges(read(comments="#", skip_header=4)))
     elif icon_name.startswith("Binary"):
-        g.add_edge_list(transfer_edges(np.genfromtxt(add_read, usecols=[0, 1], dtype=str)))
+        g.add_edge_list(transfer_edges(read(comments="#", dtype=str)))
     elif icon_name.startswith("Reguly"):
-        g.add_edge_list(transfer_edges(np.genfromtxt(add_read, usecols=[0, 1], dtype=str)))
+        g.add_edge_list(transfer_edges(read(comments="#", dtype=str)))
     elif icon_name.startswith("UK"):
-        g.add_edge_list(transfer_edges(np.genfromtxt(add_read, usecols=[0, 1], dtype=str)))
+        g.add_edge_list(transfer_edges(read(comments="#", dtype=str)))
     elif icon_name.startswith("Myocardial"):
-        df = pd.DataFrame(pd.read_excel(add_read, sheet_name="My-Inflamome", header=None))
+        df = pd.DataFrame(pd.read_excel(archive_addr, sheet_name="My-Inflamome", header=None))
         df.columns = ["source", "type", "target"]
         g.add_edge_list(transfer_edges(list(zip(df["source"], df["target"]))))
     elif icon_name.startswith("Yeast"):
-        with open(add_read, 'r') as f:
-            g.add_edge_list(transfer_edges([(x.strip().split()) for x in
-                                            re.search(r'Edges\n.*?Edges', f.read(), re.DOTALL).group().split("\n")[
-                                            1:-1]]))
-            
-    g.save(saving_name + network + "/" + subnetwork + ".gt", fmt="gt")
-    return ("ICON", network, subnetwork, category, saving_name + network + "/" + subnetwork + ".gt")
-
-# icon_helper((addr_icon, addr_icon_raw, x, category)) downloads the ICON
-# network 'x' from one of the assorted sources and stores it in a location using
-# 'addr_icon_raw'. The function then decompresses the network if necessary and
-# calls icon_rest_to_gt() in parallel to format the network to the graph-tool
-# format. The function returns a tuple containing the name of the network along
-# with the path to the location where it is stored. 
+        g.add_edge_list(transfer_edges(read_pajek(dtype=str)))
+
+    return save_collected(g, "ICON", network, subnetwork, category)
+
+# icon_helper(args) returns the pipeline jobs that download the ICON networks
+# listed in 'args' as (addr_icon, addr_icon_raw, x, category) tuples from one of
+# the assorted sources to a location using 'addr_icon_raw', and format them to
+# the graph-tool format using icon_rest_to_gt(). Every file is downloaded once,
+# even if it holds several networks.
 def icon_helper(args):
     net_url_map = {
         "AMiner scientific collaborations (2009)/AMiner DatabaseSys sub0 coauthors": (
@@ -400,38 +316,29 @@ def icon_helper(args):
         "UK public transportation (2004-2011)/edges_rail": (
             "https://bitbucket.org/deregtr/gb_ptn/raw/3475dfefd4a85ec4bd4cb92df34153e84b52eaa4/edges_rail.dat",)
     }
-    to_convert_args = []
+    to_convert_args = {}
     for (addr_icon, addr_icon_raw, x, category) in args:
         network, subnetwork = x.split("/") if len(x.split("/")) == 2 else [x.split("/")[0]] * 2
-        mkdir(addr_icon + network, wipe=False)
 
+        # The edge list is read straight out of the archive, if any.
         f_name = addr_icon_raw + net_url_map[x][0].split("/")[-1]
-        if not download((net_url_map[x][0], f_name)):
-            shutil.rmtree(addr_icon + network)
-
-        if len(net_url_map[x]) > 1:
-            try:
-                decompress((f_name, addr_icon_raw))
-                os.remove(f_name)
-            except (Exception,):
-                pass
-            to_convert_args.append((addr_icon, x, addr_icon_raw + net_url_map[x][1], category, network, subnetwork))
-
-        else:
-            to_convert_args.append(
-                (addr_icon, x, addr_icon_raw + net_url_map[x][0].split("/")[-1], category, network, subnetwork))
-
-    return process_map(icon_rest_to_gt, to_convert_args, desc="icon_rest")
-# collect_icon(df_icon) takes a dataframe containing the names of all ICON
-# networks to be collected in 'df_icon' and then calls collect_fb() and
-# icon_helper() to collect and format the networks. The function returns a list
-# of tuples containing the names of the networks along with the paths to the
-# locations where they are stored.
-def collect_icon(df_icon):
+        member = net_url_map[x][1] if len(net_url_map[x]) > 1 else None
+        to_convert_args.setdefault(net_url_map[x][0], []).append(
+            (x, f_name, member, category, network, subnetwork))
+
+    stages = [("icon_download", "io", download_stage), ("icon_rest", "cpu", icon_rest_to_gt)]
+    return [(stages, (url, to_convert[0][1], to_convert)) for (url, to_convert) in to_convert_args.items()]
+
+# icon_jobs(df_icon) takes a dataframe containing the names of all ICON
+# networks to be collected in 'df_icon' and returns the pipeline jobs of
+# fb_jobs() and icon_helper() that collect and format the networks. As in
+# konect_jobs(), the directory of the downloaded files is kept if it already
+# exists.
+def icon_jobs(df_icon):
     addr_icon = os.getcwd() + "/icon/"
     addr_icon_raw = addr_icon + "raw/"
-    mkdir(addr_icon)
-    mkdir(addr_icon_raw)
+    mkdir(addr_icon, wipe=False)
+    mkdir(addr_icon_raw, wipe=False)
 
     args_fb = []
     args_etc = []
@@ -441,56 +348,41 @@ def collect_icon(df_icon):
         else:
             args_fb.append(x.split("/")[1])
 
-    args = collect_fb(addr_icon, args_fb)
-    args.extend(icon_helper(args_etc))
-
-    shutil.rmtree(addr_icon_raw)
-    return args
+    return fb_jobs(addr_icon, args_fb) + icon_helper(args_etc)
 
 # run_collection() is the main function in charge of collecting all networks
 # which it does by reading what networks to collect in
-# "networks_spreadsheet.csv" and calling the functions for collecting networks
-# from each of the four main sources: KONECT, Netzschleuder, SNAP, and ICON. The
-# function returns a list of tuples containing the names of the networks along
-# with the paths to the locations where they are stored. 
+# "networks_spreadsheet.csv" and running the pipeline jobs for collecting
+# networks from each of the four main sources: KONECT, Netzschleuder, SNAP, and
+# ICON. Downloads run on a thread pool and the formatting on the backend set by
+# set_backend (a process pool by default), such that networks from all sources
+# flow through as soon as their files are downloaded (see
+# engine/utils/pipeline.py). Every network is ingested into the
+# "datasets" directory as it is formatted, i.e. preprocessed and stored along
+# with its metadata in a single pass. The function returns a list of tuples
+# containing the names of the networks along with the paths to the locations
+# where they are stored, for the networks that were collected, which are also
+# recorded in the manifest of the dataset (see engine/utils/manifest.py).
 def run_collection():
     df = pd.read_csv("networks_spreadsheet.csv", delimiter=";")
-    collected = []
-    collected.extend(collect_konect(df.loc[df["Source"] == "KONECT"]))
-    collected.extend(collect_netzschleuder(df.loc[df["Source"] == "Netzschleuder"]))
-    collected.extend(collect_snap(df.loc[df["Source"] == "SNAP"]))
-    collected.extend(collect_icon(df.loc[df["Source"] == "ICON"]))
-    return collected
-
-# process((dataset_dir, source, network, subnetwork, category, read_addr))
-# creates the necessary directory structure for the final location of the .gt
-# network located at 'read_addr' and moves to the new location.
-def process(args):
-    dataset_dir, source, network, subnetwork, category, read_addr = args
-    mkdir(dataset_dir + category, wipe=False)
-    mkdir(dataset_dir + category + "/" + network, wipe=False)
-    mkdir(dataset_dir + category + "/" + network + "/" + subnetwork, wipe=False)
-    mkdir(dataset_dir + category + "/" + network + "/" + subnetwork + "/Graph-Data", wipe=False)
-    mkdir(dataset_dir + category + "/" + network + "/" + subnetwork + "/Robustness-Score-Data", wipe=False)
-    mkdir(dataset_dir + category + "/" + network + "/" + subnetwork + "/Scalefreeness-Score-Data", wipe=False)
-
-    g = gt.load_graph(read_addr)
-    source = g.new_graph_property("string")
-    source[g] = source
-    g.graph_properties["source"] = source
-    g.save(dataset_dir + category + "/" + network + "/" + subnetwork + "/Graph-Data/" + subnetwork + ".gt", fmt="gt")
-
-# prepare_dataset(args) calls process() in parallel on all the collected
-# networks and deletes the old locations of the networks once they have been
-# copied to their final locations.
-def prepare_dataset(args):
-    dataset_dir = os.getcwd() + "/datasets/"
-    mkdir(dataset_dir)
-    process_map(process, [(dataset_dir,) + arg for arg in args], desc="preparing dataset")
+    mkdir(os.getcwd() + "/datasets/")
+    jobs = []
+    jobs.extend(konect_jobs(df.loc[df["Source"] == "KONECT"]))
+    jobs.extend(netzschleuder_jobs(df.loc[df["Source"] == "Netzschleuder"]))
+    jobs.extend(snap_jobs(df.loc[df["Source"] == "SNAP"]))
+    jobs.extend(icon_jobs(df.loc[df["Source"] == "ICON"]))
+    cpu_executor = start_executor(get_backend(), get_num_engines(), initializer=set_keep_original_graphs,
+                                  initargs=(get_keep_original_graphs(),))
+    collected = run_pipeline(jobs, get_download_max_workers(), cpu_executor, desc="collection")
+    stop_executor(cpu_executor)
+
+    shutil.rmtree(os.getcwd() + "/konect_raw/")
+    shutil.rmtree(os.getcwd() + "/snap_raw/")
     shutil.rmtree(os.getcwd() + "/icon/")
-    shutil.rmtree(os.getcwd() + "/konect/")
-    shutil.rmtree(os.getcwd() + "/snap/")
-    shutil.rmtree(os.getcwd() + "/netzschleuder/")
+    # The collected networks are recorded in the manifest of the dataset.
+    update_manifest(os.getcwd() + "/datasets/", [(os.getcwd() + "/datasets/", category, network, subnetwork) for
+                                                 (_, network, subnetwork, category, _) in collected])
+    return collected
 
 # argument_checker(x) verifies that the user input specifying the amount of
 # cores to use for this script is valid and raises an error if it is not.
@@ -507,9 +399,29 @@ if __name__ == '__main__':
     start = time.time()
     parser = argparse.ArgumentParser()
     parser.add_argument('--cores', type=argument_checker, required=True)
+    # --backend sets where the networks are formatted (see
+    # engine/utils/executor.py), by default on a local process pool.
+    parser.add_argument('--backend', choices=backends, default="processes")
+    # --mirror URL downloads every file "scheme://host/path" from "URL/host/path"
+    # instead, e.g. from a local stand-in HTTP server.
+    parser.add_argument('--mirror', default=None)
+    # --insecure disables the verification of TLS certificates.
+    parser.add_argument('--insecure', action='store_true')
+    parser.add_argument('--connections-per-host', type=int, default=4)
+    # --netzschleuder-mirror DIR keeps the local mirror of the Netzschleuder
+    # networks in DIR, and --offline serves them from the mirror only.
+    parser.add_argument('--netzschleuder-mirror', default=None)
+    parser.add_argument('--offline', action='store_true')
+    # --keep-original-graphs also stores the graphs as they were collected.
+    parser.add_argument('--keep-original-graphs', action='store_true')
     cli_input = parser.parse_args()
     set_num_engines(cli_input.cores)
-    
-    prepare_dataset(run_collection())
+    set_backend(cli_input.backend)
+    set_download_options(mirror=cli_input.mirror, verify=not cli_input.insecure, max_workers=16,
+                         max_connections_per_host=cli_input.connections_per_host, max_retries=5, backoff=1.0)
+    set_netzschleuder_mirror(cli_input.netzschleuder_mirror, cli_input.offline)
+    set_keep_original_graphs(cli_input.keep_original_graphs)
+
+    print("Collected networks: " + str(len(run_collection())))
 
     print("Total dataset compilation time (in seconds): " + str(time.time() - start))
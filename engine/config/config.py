@@ -4,8 +4,32 @@ global num_engines
 global working_dir
 global permanent_dir
 global num_sampled_random_graphs
+global num_tie_breaking_seeds
+num_tie_breaking_seeds = 1
 global vertex_cut_off, edge_cut_off
 global seed
+global fused_baselines
+global cache_max_age, cache_max_size
+global download_mirror, download_verify, download_max_workers, download_max_connections_per_host
+global download_max_retries, download_backoff
+download_mirror, download_verify, download_max_workers, download_max_connections_per_host = None, True, 16, 4
+download_max_retries, download_backoff = 5, 1.0
+global netzschleuder_mirror_dir, netzschleuder_offline
+netzschleuder_mirror_dir, netzschleuder_offline = None, False
+global keep_original_graphs
+keep_original_graphs = False
+global backend
+backend = "ipyparallel"
+global memory_budget
+memory_budget = None
+global batch_adaptive_fraction
+batch_adaptive_fraction = 0.01
+global score_edges
+score_edges = False
+global shared_graph_dir
+shared_graph_dir = None
+global baseline_half_width, min_num_baselines, max_num_baselines
+baseline_half_width, min_num_baselines, max_num_baselines = None, 4, 100
 
 
 # set_num_engines(n_engines) takes as an argument the amount of cores to be
@@ -25,6 +49,11 @@ def set_num_sampled_random_graphs(number_of_sampled_random_graphs):
     num_sampled_random_graphs = number_of_sampled_random_graphs
 
 
+def set_num_tie_breaking_seeds(number_of_tie_breaking_seeds):
+    global num_tie_breaking_seeds
+    num_tie_breaking_seeds = number_of_tie_breaking_seeds
+
+
 def set_cut_off(min_num_vertices, min_num_edges):
     global vertex_cut_off, edge_cut_off
     vertex_cut_off, edge_cut_off = min_num_vertices, min_num_edges
@@ -35,6 +64,111 @@ def set_seed(init_seed):
     seed = init_seed
 
 
+# set_fused_baselines(fused) sets whether the size-matching random graphs are
+# generated and scored in memory in a single task (True), or first written to
+# disk and scored in a separate step (False), which is useful for debugging.
+def set_fused_baselines(fused):
+    global fused_baselines
+    fused_baselines = fused
+
+
+# set_cache_limits(max_age, max_size) sets the maximum time in seconds an entry
+# of the result cache may stay unused, and the maximum total size of the cache
+# in bytes, before entries are evicted.
+def set_cache_limits(max_age, max_size):
+    global cache_max_age, cache_max_size
+    cache_max_age, cache_max_size = max_age, max_size
+
+
+# set_download_options(mirror, verify, max_workers, max_connections_per_host,
+# max_retries, backoff) sets the options for downloading the networks: the URL
+# of a mirror to download from instead of the original hosts (None to use the
+# original hosts), whether TLS certificates are verified, the number of
+# concurrent downloads, the maximum number of concurrent connections per host,
+# the number of retries of a failed download, and the delay in seconds before
+# the first retry (which doubles for every further retry).
+def set_download_options(mirror, verify, max_workers, max_connections_per_host, max_retries, backoff):
+    global download_mirror, download_verify, download_max_workers, download_max_connections_per_host
+    global download_max_retries, download_backoff
+    download_mirror, download_verify, download_max_workers = mirror, verify, max_workers
+    download_max_connections_per_host, download_max_retries, download_backoff = \
+        max_connections_per_host, max_retries, backoff
+
+
+# set_netzschleuder_mirror(mirror_dir, offline) sets the directory of the local
+# mirror of the Netzschleuder networks (None to use "netzschleuder_mirror/" in
+# the current directory), and whether the networks are served from the mirror
+# only, without contacting Netzschleuder (e.g. on nodes without internet).
+def set_netzschleuder_mirror(mirror_dir, offline):
+    global netzschleuder_mirror_dir, netzschleuder_offline
+    netzschleuder_mirror_dir, netzschleuder_offline = mirror_dir, offline
+
+
+# set_backend(backend_name) sets the backend on which the tasks run, one of
+# "serial", "processes", "ipyparallel", or "mpi" (see engine/utils/executor.py).
+def set_backend(backend_name):
+    global backend
+    backend = backend_name
+
+
+# set_memory_budget(budget) sets the memory in bytes per node that the tasks in
+# flight may use according to their estimates (None to use 80% of the physical
+# memory of the node).
+def set_memory_budget(budget):
+    global memory_budget
+    memory_budget = budget
+
+
+# set_batch_adaptive_fraction(batch_fraction) sets the fraction of the
+# remaining vertices removed per round by the batch-adaptive targeted attack
+# (see batch_adaptive_attack in engine/utils/network.py).
+def set_batch_adaptive_fraction(batch_fraction):
+    global batch_adaptive_fraction
+    batch_adaptive_fraction = batch_fraction
+
+
+# set_score_edges(score) sets whether the networks are also scored under the
+# edge removal strategies (see 'edge_strategies' in engine/utils/store.py),
+# which about doubles the cost of scoring a network.
+def set_score_edges(score):
+    global score_edges
+    score_edges = score
+
+
+# set_scoring_options(batch_fraction, score) sets the batch fraction of the
+# batch-adaptive targeted attack and whether the edge removal strategies are
+# scored, e.g. on each engine before it scores any network.
+def set_scoring_options(batch_fraction, score):
+    set_batch_adaptive_fraction(batch_fraction)
+    set_score_edges(score)
+
+
+# set_shared_graph_dir(path) sets the node-local directory in which the graphs
+# used by several tasks are kept in shared memory (None to use /dev/shm, or
+# the temporary directory where there is no /dev/shm).
+def set_shared_graph_dir(path):
+    global shared_graph_dir
+    shared_graph_dir = path
+
+
+# set_adaptive_baselines(half_width, min_num, max_num) sets the size-matching
+# random graphs of each network to be sampled in rounds, starting with 'min_num'
+# graphs, until the 95% confidence interval of their mean score is at most
+# 'half_width' wide on each side or 'max_num' graphs were sampled (see
+# get_num_baselines in engine/utils/io.py). If 'half_width' is None, every
+# network is compared to get_num_sampled_random_graphs() random graphs.
+def set_adaptive_baselines(half_width, min_num, max_num):
+    global baseline_half_width, min_num_baselines, max_num_baselines
+    baseline_half_width, min_num_baselines, max_num_baselines = half_width, min_num, max_num
+
+
+# set_keep_original_graphs(keep) sets whether the collected graphs are also
+# stored as they were collected, next to their preprocessed versions.
+def set_keep_original_graphs(keep):
+    global keep_original_graphs
+    keep_original_graphs = keep
+
+
 def set_working_dir(working_dir_path):
     global working_dir
     working_dir = working_dir_path
@@ -54,6 +188,11 @@ def get_num_sampled_random_graphs():
     return num_sampled_random_graphs
 
 
+def get_num_tie_breaking_seeds():
+    global num_tie_breaking_seeds
+    return num_tie_breaking_seeds
+
+
 def get_vertex_cut_off():
     global vertex_cut_off
     return vertex_cut_off
@@ -69,6 +208,111 @@ def get_seed():
     return seed
 
 
+def get_fused_baselines():
+    global fused_baselines
+    return fused_baselines
+
+
+def get_cache_max_age():
+    global cache_max_age
+    return cache_max_age
+
+
+def get_cache_max_size():
+    global cache_max_size
+    return cache_max_size
+
+
+def get_download_mirror():
+    global download_mirror
+    return download_mirror
+
+
+def get_download_verify():
+    global download_verify
+    return download_verify
+
+
+def get_download_max_workers():
+    global download_max_workers
+    return download_max_workers
+
+
+def get_download_max_connections_per_host():
+    global download_max_connections_per_host
+    return download_max_connections_per_host
+
+
+def get_download_max_retries():
+    global download_max_retries
+    return download_max_retries
+
+
+def get_download_backoff():
+    global download_backoff
+    return download_backoff
+
+
+def get_netzschleuder_mirror_dir():
+    global netzschleuder_mirror_dir
+    if netzschleuder_mirror_dir is None:
+        return os.getcwd() + "/netzschleuder_mirror/"
+    return os.path.join(netzschleuder_mirror_dir, "")
+
+
+def get_netzschleuder_offline():
+    global netzschleuder_offline
+    return netzschleuder_offline
+
+
+def get_backend():
+    global backend
+    return backend
+
+
+def get_memory_budget():
+    global memory_budget
+    return memory_budget
+
+
+def get_batch_adaptive_fraction():
+    global batch_adaptive_fraction
+    return batch_adaptive_fraction
+
+
+def get_score_edges():
+    global score_edges
+    return score_edges
+
+
+def get_shared_graph_dir():
+    global shared_graph_dir
+    if shared_graph_dir is not None:
+        return shared_graph_dir
+    import tempfile
+    return "/dev/shm/" if os.path.isdir("/dev/shm") else tempfile.gettempdir() + "/"
+
+
+def get_baseline_half_width():
+    global baseline_half_width
+    return baseline_half_width
+
+
+def get_min_num_baselines():
+    global min_num_baselines
+    return min_num_baselines
+
+
+def get_max_num_baselines():
+    global max_num_baselines
+    return max_num_baselines
+
+
+def get_keep_original_graphs():
+    global keep_original_graphs
+    return keep_original_graphs
+
+
 def get_working_dir():
     global working_dir
     return working_dir
@@ -79,6 +323,21 @@ def get_data_dir():
     return working_dir + "datasets/"
 
 
+def get_cache_dir():
+    global working_dir
+    return working_dir + "cache/"
+
+
+def get_score_store_dir():
+    global working_dir
+    return working_dir + "scores/"
+
+
+def get_checkpoint_dir():
+    global working_dir
+    return working_dir + "checkpoints/"
+
+
 def get_log_dir():
     global working_dir
     return working_dir + "logs/"
@@ -0,0 +1,110 @@
+import contextlib
+import gzip
+import io
+import os
+import tarfile
+import zipfile
+
+# This module reads files straight out of the downloaded archives, without
+# extracting them to disk first. Archives of type .tar.gz, .tar.bz2, .zip,
+# .gz, and .rar are supported. Any other file is treated as a plain file.
+
+# archive_type(path) returns the type of the archive at 'path', i.e. one of
+# "tar", "zip", "gz", "rar", or None if it is not an archive.
+def archive_type(path):
+    if path.endswith(".tar.gz") or path.endswith(".tar.bz2"):
+        return "tar"
+    elif path.endswith(".zip"):
+        return "zip"
+    elif path.endswith(".gz"):
+        return "gz"
+    elif path.endswith(".rar"):
+        return "rar"
+    return None
+
+# StreamMember(f) adapts the file object 'f' of a member of a tar archive that
+# is read as a stream, which fails to tell whether it is seekable, to a raw
+# stream that can be decoded by io.TextIOWrapper (see text_reader).
+class StreamMember(io.RawIOBase):
+    def __init__(self, f):
+        self.f = f
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def readinto(self, b):
+        data = self.f.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+# text_reader(f) returns a text file object decoding the member of a tar
+# archive read as a stream with the file object 'f' (see open_member).
+def text_reader(f):
+    return io.TextIOWrapper(io.BufferedReader(StreamMember(f)), encoding="latin-1", newline=None)
+
+# iter_members(path, select, text=False) yields the name of every regular file
+# stored in the archive at 'path' for which 'select(name)' is True, along with
+# a file object reading it, as open_member does. A tar archive is decompressed
+# once as a stream ("r|*"), and its members are yielded as they are reached,
+# such that each file object is only valid until the next member is yielded.
+# A .gz file holds a single member, named after the file without the ".gz"
+# suffix, and a plain file is its own single member.
+def iter_members(path, select, text=False):
+    kind = archive_type(path)
+    if kind == "tar":
+        with tarfile.open(path, "r|*") as tar_f:
+            for info in tar_f:
+                if info.isfile() and select(info.name):
+                    with tar_f.extractfile(info) as f:
+                        yield info.name, text_reader(f) if text else f
+        return
+    if kind == "zip":
+        with zipfile.ZipFile(path, "r") as zip_f:
+            names = [info.filename for info in zip_f.infolist() if not info.is_dir()]
+    elif kind == "rar":
+        import rarfile
+        with rarfile.RarFile(path, "r") as rar_f:
+            names = [info.filename for info in rar_f.infolist() if not info.is_dir()]
+    else:
+        names = [os.path.basename(path)[:-len(".gz")] if kind == "gz" else os.path.basename(path)]
+    for name in names:
+        if select(name):
+            with open_member(path, name, text=text) as f:
+                yield name, f
+
+# open_member(path, member=None, text=False) opens the member 'member' of the
+# archive at 'path' for reading, and yields a binary file object, or a text
+# file object if 'text' is True. For .gz and plain files, 'member' is ignored.
+# A tar archive is decompressed up to the member, so several members of it are
+# read with iter_members instead.
+# Text is decoded as Latin-1, which maps every byte to a character and thus
+# never fails, like the byte-based readers of NumPy.
+@contextlib.contextmanager
+def open_member(path, member=None, text=False):
+    kind = archive_type(path)
+    with contextlib.ExitStack() as stack:
+        if kind == "tar":
+            tar_f = stack.enter_context(tarfile.open(path, "r|*"))
+            f = None
+            for info in tar_f:
+                if info.name == member:
+                    f = stack.enter_context(tar_f.extractfile(info))
+                    break
+            if f is None:
+                raise KeyError(member)
+            if text:
+                yield text_reader(f)
+                return
+        elif kind == "zip":
+            f = stack.enter_context(stack.enter_context(zipfile.ZipFile(path, "r")).open(member))
+        elif kind == "rar":
+            import rarfile
+            f = stack.enter_context(stack.enter_context(rarfile.RarFile(path, "r")).open(member))
+        elif kind == "gz":
+            f = stack.enter_context(gzip.open(path, "rb"))
+        else:
+            f = stack.enter_context(open(path, "rb"))
+        yield io.TextIOWrapper(f, encoding="latin-1", newline=None) if text else f
@@ -0,0 +1,114 @@
+import functools
+import hashlib
+import os
+import pickle
+import time
+import numpy as np
+from engine.config.config import *
+from engine.utils.io import atomic_write
+
+# This module implements a content-addressed cache for the results of the
+# analysis. Each entry is a pickle file named by the SHA-256 hash of its key,
+# stored under get_cache_dir(). Keys are built from the content hash of the
+# inputs (e.g. the preprocessed graph), the parameters of the computation
+# (e.g. the removal strategies and the seed), and the version of the code that
+# produced the result, such that an entry is reused if and only if recomputing
+# it would give the same result.
+
+# The source files whose content determines the results of the analysis. Any
+# change to them invalidates all cache entries.
+versioned_files = ["engine/utils/io.py", "engine/utils/network.py", "engine/utils/kernels.py",
+                   "engine/utils/generation.py"]
+
+# get_code_version() returns the SHA-256 hash of the source files listed in
+# 'versioned_files'. It is computed once per process.
+@functools.lru_cache(maxsize=None)
+def get_code_version():
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    h = hashlib.sha256()
+    for file in versioned_files:
+        with open(os.path.join(root, file), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+# derive_seed(*parts) derives a seed from the meta-seed get_seed() and the
+# values 'parts', e.g. the name of a network and the index of a random graph.
+# Unlike drawing seeds one after the other from a single random generator, the
+# seed of a task does not depend on which other tasks exist, so that adding
+# networks or random graphs to the analysis keeps the seeds (and thus the
+# cached results) of the existing tasks unchanged.
+def derive_seed(*parts):
+    digest = hashlib.sha256(repr(parts).encode()).digest()
+    words = [int.from_bytes(digest[i:i + 4], "little") for i in range(0, len(digest), 4)]
+    state = np.random.SeedSequence([get_seed()] + words).generate_state(1, dtype=np.uint64)[0]
+    return int(state % np.iinfo(np.int64).max)
+
+# cache_key(*parts) returns the cache key of the values 'parts' together with
+# the current code version.
+def cache_key(*parts):
+    return hashlib.sha256(repr(parts + (get_code_version(),)).encode()).hexdigest()
+
+# cache_path(key) returns the path of the cache entry with the key 'key'.
+def cache_path(key):
+    return os.path.join(get_cache_dir(), key[:2], key + ".pkl")
+
+# cache_load(key) returns the value stored under the key 'key', or None if
+# there is no such entry. Reading an entry marks it as recently used.
+def cache_load(key):
+    path = cache_path(key)
+    try:
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+        os.utime(path)
+        return value
+    except (Exception,):
+        return None
+
+# cache_store(key, value) stores 'value' under the key 'key'. The entry is
+# written atomically (see atomic_write), such that concurrent readers never see
+# a partially written entry.
+def cache_store(key, value):
+    path = cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, lambda f: pickle.dump(value, f))
+
+# file_digest(path) returns the SHA-256 hash of the content of the file at
+# 'path'. Since hashing large graphs is costly, the digest is itself cached
+# under the path, size, and modification time of the file, and only recomputed
+# once the file changes.
+def file_digest(path):
+    stat = os.stat(path)
+    key = cache_key("file_digest", os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = cache_load(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        cache_store(key, digest)
+    return digest
+
+# evict_cache() removes the cache entries that have not been used for more than
+# get_cache_max_age() seconds, and then removes the least recently used entries
+# until the cache occupies at most get_cache_max_size() bytes. Left-over
+# temporary files of interrupted writes are removed as well.
+def evict_cache():
+    if not os.path.isdir(get_cache_dir()):
+        return
+    now = time.time()
+    entries = []
+    for directory, _, files in os.walk(get_cache_dir()):
+        for file in files:
+            path = os.path.join(directory, file)
+            stat = os.stat(path)
+            if file.endswith(".tmp") or now - stat.st_mtime > get_cache_max_age():
+                os.remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+    total_size = sum(size for (_, size, _) in entries)
+    for (_, size, path) in sorted(entries):
+        if total_size <= get_cache_max_size():
+            break
+        os.remove(path)
+        total_size -= size
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import pickle
+import shutil
+from engine.config.config import *
+
+# This module makes the stages of the analysis resumable. Each stage keeps a
+# checkpoint file in get_checkpoint_dir(), to which a record (task identifier,
+# result) is appended as soon as a task completes. When a stage is started
+# again, e.g. after the job was killed, the tasks that already succeeded are
+# not submitted again, and their recorded results are returned together with
+# the results of the remaining tasks.
+
+# get_checkpoint_file(name) returns the path of the checkpoint file of the
+# stage 'name'.
+def get_checkpoint_file(name):
+    return get_checkpoint_dir() + name + ".pkl"
+
+# get_task_id(task) returns an identifier of the task with the arguments 'task'.
+def get_task_id(task):
+    return hashlib.sha256(repr(task).encode()).hexdigest()
+
+# load_checkpoint(name) returns a dictionary mapping the identifiers of the
+# tasks of the stage 'name' recorded so far to their results. If the last
+# record was only partially written, e.g. because the job was killed while
+# writing it, it is discarded and cut off from the checkpoint file.
+def load_checkpoint(name):
+    records = {}
+    path = get_checkpoint_file(name)
+    if not os.path.isfile(path):
+        return records
+    with open(path, "rb") as f:
+        end = 0
+        while True:
+            try:
+                task_id, result = pickle.load(f)
+            except (Exception,):
+                break
+            records[task_id] = result
+            end = f.tell()
+    os.truncate(path, end)
+    return records
+
+# run_stage(executor, name, func, tasks, costs=None, memory=None, failure=None)
+# applies 'func' to each of the arguments in 'tasks' using the executor
+# 'executor' (see engine/utils/executor.py), and returns the list of results.
+# The result of every completed task is recorded in the checkpoint file of the
+# stage 'name', and tasks whose recorded result has the status 0 (success) are
+# not submitted again. A task that raises an exception, or whose chunk is lost
+# (e.g. because its engine was killed), is recorded as failed with the result
+# failure(task), such that it has the same shape as the failures reported by
+# 'func' itself. By default, the result is (1,) + task (see failed_task in
+# engine/utils/scheduling.py). If the estimated costs of the tasks are given as
+# 'costs', the tasks are dispatched largest first and small tasks are batched
+# into chunks (see engine/utils/scheduling.py), and otherwise one at a time in
+# the given order. If the estimated peak memory in bytes of the tasks is given
+# as 'memory', a chunk is only dispatched while the largest chunks in flight
+# that could run on one node at a time fit the memory budget of a node (see
+# fits_memory_budget), skipping over the chunks that do not fit such that
+# smaller ones keep flowing, and the estimates of the stage are calibrated with
+# the measured peak memory of its tasks. A chunk is always
+# dispatched when nothing else is in flight, even if it exceeds the budget. The
+# results are returned in the order in which the tasks completed.
+def run_stage(executor, name, func, tasks, costs=None, memory=None, failure=None):
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from tqdm import tqdm
+    from engine.utils.scheduling import calibrate_memory, failed_task, fits_memory_budget, get_engines_per_node, \
+        get_memory_budget_bytes, plan_chunks, report_load_balance, run_chunk
+    if failure is None:
+        failure = failed_task
+    os.makedirs(get_checkpoint_dir(), exist_ok=True)
+    records = load_checkpoint(name)
+    results = []
+    pending, pending_costs, pending_memory = [], [], {}
+    for i, task in enumerate(tasks):
+        if is_checkpointed(records, task):
+            results.append(records[get_task_id(task)])
+        else:
+            pending.append(task)
+            pending_costs.append(1.0 if costs is None else costs[i])
+            pending_memory[get_task_id(task)] = 0.0 if memory is None else memory[i]
+    if costs is None:
+        chunks = [[task] for task in pending]
+    else:
+        chunks, _ = plan_chunks(pending, pending_costs, get_num_engines())
+    chunk_memory = [max(pending_memory[get_task_id(task)] for task in chunk) for chunk in chunks]
+    budget = get_memory_budget_bytes() if memory is not None else float("inf")
+    engines_per_node = get_engines_per_node()
+    queue = list(range(len(chunks)))
+    futures = {}
+    timings, estimates, peaks = [], [], []
+    with open(get_checkpoint_file(name), "ab") as checkpoint, tqdm(total=len(pending), desc=name) as bar:
+        while len(queue) > 0 or len(futures) > 0:
+            held = []
+            in_flight = sorted((chunk_memory[j] for j in futures.values()), reverse=True)
+            for j in queue:
+                if len(futures) == 0 or fits_memory_budget(in_flight, chunk_memory[j], budget, engines_per_node):
+                    futures[executor.submit(run_chunk, func, chunks[j], failure)] = j
+                    in_flight = sorted(in_flight[:engines_per_node] + [chunk_memory[j]], reverse=True)
+                else:
+                    held.append(j)
+            queue = held
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                j = futures.pop(future)
+                chunk = chunks[j]
+                try:
+                    chunk_results, worker, start, end, chunk_peaks = future.result()
+                    timings.append((worker, start, end))
+                    estimates.extend(pending_memory[get_task_id(task)] for task in chunk)
+                    peaks.extend(chunk_peaks)
+                except (Exception,):
+                    chunk_results = [failure(task) for task in chunk]
+                for task, result in zip(chunk, chunk_results):
+                    pickle.dump((get_task_id(task), result), checkpoint)
+                    results.append(result)
+                checkpoint.flush()
+                bar.update(len(chunk))
+    report_load_balance(name, timings, get_num_engines(), len(pending), len(chunks))
+    if memory is not None:
+        calibrate_memory(name, estimates, peaks)
+    return results
+
+# record_checkpoint(name, task, result) records the result 'result' of the task
+# with the arguments 'task' in the checkpoint file of the stage 'name'. This is
+# used for steps that run in the controller rather than on the executor.
+def record_checkpoint(name, task, result):
+    os.makedirs(get_checkpoint_dir(), exist_ok=True)
+    with open(get_checkpoint_file(name), "ab") as checkpoint:
+        pickle.dump((get_task_id(task), result), checkpoint)
+
+# is_checkpointed(records, task) returns whether the task with the arguments
+# 'task' succeeded according to the records 'records' (see load_checkpoint).
+def is_checkpointed(records, task):
+    task_id = get_task_id(task)
+    return task_id in records and records[task_id][0] == 0
+
+# clear_checkpoints() removes the checkpoint files of all stages. It is called
+# once the analysis has completed, such that the next run starts afresh.
+def clear_checkpoints():
+    if os.path.isdir(get_checkpoint_dir()):
+        shutil.rmtree(get_checkpoint_dir())
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from engine.config.config import *
+
+# This module downloads the files of the collection. Downloads run on a thread
+# pool, since they are bound by the network rather than the CPU. There is one
+# pooled HTTP session per host, and the number of concurrent connections to
+# each host is limited. Interrupted downloads are resumed with HTTP Range
+# requests from a ".part" file, and failed attempts are retried with
+# exponential backoff. If a mirror is set (see set_download_options), every URL
+# "scheme://host/path" is fetched from "mirror/host/path" instead, e.g. from a
+# local stand-in HTTP server serving a copy of the files.
+
+# The pooled sessions and the connection limits, per host.
+sessions = {}
+host_limits = {}
+sessions_lock = threading.Lock()
+
+# get_session(host) returns the pooled session and the semaphore limiting the
+# number of concurrent connections for the host 'host'.
+def get_session(host):
+    import requests
+    from requests.adapters import HTTPAdapter
+    with sessions_lock:
+        if host not in sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=get_download_max_connections_per_host())
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            sessions[host] = session
+            host_limits[host] = threading.BoundedSemaphore(get_download_max_connections_per_host())
+        return sessions[host], host_limits[host]
+
+# rewrite_url(url) returns the URL from which 'url' is fetched, taking into
+# account the mirror set by set_download_options.
+def rewrite_url(url):
+    if get_download_mirror() is None:
+        return url
+    parts = urlsplit(url)
+    return get_download_mirror().rstrip("/") + "/" + parts.netloc + parts.path + ("?" + parts.query if parts.query
+                                                                                  else "")
+
+# is_retryable(exc) returns whether a download that failed with the exception
+# 'exc' may succeed when retried, i.e. unless the server rejected the request
+# with a client error other than a timeout or a rate limit.
+def is_retryable(exc):
+    import requests
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        return not (400 <= status < 500) or status in (408, 429)
+    return True
+
+# download_file(url, f_name) downloads the 'url' and stores the content in a
+# file named by 'f_name'. The content is first written to 'f_name' + ".part",
+# which is renamed to 'f_name' once the download is complete. If the ".part"
+# file already exists, e.g. from an interrupted run, the download resumes from
+# its end. The function returns whether the download was successful.
+def download_file(url, f_name):
+    import requests
+    url = rewrite_url(url)
+    session, limit = get_session(urlsplit(url).netloc)
+    part_name = f_name + ".part"
+    for attempt in range(get_download_max_retries() + 1):
+        try:
+            with limit:
+                offset = os.path.getsize(part_name) if os.path.exists(part_name) else 0
+                headers = {"Range": "bytes=" + str(offset) + "-"} if offset > 0 else {}
+                with session.get(url, stream=True, verify=get_download_verify(), headers=headers,
+                                 timeout=(30, 300)) as r:
+                    # A server answers a range starting at the end of the file
+                    # with 416, i.e. the partial file is already complete.
+                    if not (r.status_code == 416 and offset > 0):
+                        r.raise_for_status()
+                        # If the server ignores the range, it sends the whole
+                        # file again.
+                        with open(part_name, "ab" if r.status_code == 206 else "wb") as f:
+                            for chunk in r.iter_content(chunk_size=1 << 20):
+                                f.write(chunk)
+            os.replace(part_name, f_name)
+            return True
+        except (requests.RequestException, OSError) as exc:
+            if attempt == get_download_max_retries() or not is_retryable(exc):
+                break
+            time.sleep(get_download_backoff() * 2 ** attempt)
+    print("couldn't download file: " + f_name)
+    return False
@@ -0,0 +1,116 @@
+import os
+import time
+import uuid
+from concurrent.futures import Executor, Future, wait
+
+# This module provides the execution backends on which the tasks of the
+# collection and the analysis run. Every backend is started as an executor
+# with the interface of concurrent.futures (submit, map, and shutdown), whose
+# futures are awaited by run_stage (see engine/utils/checkpoint.py) and
+# run_pipeline (see engine/utils/pipeline.py), which report the progress and the
+# errors in the same way for all backends. The backends are:
+#   - "serial", which runs every task in the calling process when it is
+#     submitted, e.g. for debugging,
+#   - "processes", a pool of local processes, e.g. for runs on a laptop,
+#   - "ipyparallel", an ipyparallel cluster whose engines are launched with MPI,
+#     e.g. for runs on a SLURM allocation,
+#   - "mpi", a pool of MPI processes of mpi4py, e.g. when the script is
+#     launched with "mpiexec -n N python -m mpi4py.futures".
+
+# The names of the backends.
+backends = ["serial", "processes", "ipyparallel", "mpi"]
+
+# The ipyparallel clusters of the started executors, to be stopped along with
+# them, and their clients, through which a call can be sent to every engine.
+clusters = {}
+clients = {}
+
+# The time in seconds that the tasks of run_on_every_worker wait for each other
+# at most, e.g. when fewer workers than expected are alive.
+rendezvous_timeout = 60
+
+# SerialExecutor is the executor of the "serial" backend, which runs every task
+# in the calling process as soon as it is submitted.
+class SerialExecutor(Executor):
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+# start_executor(backend, num_workers, initializer=None, initargs=()) starts an
+# executor of the backend 'backend' (see above) with 'num_workers' workers, and
+# returns it. Every worker calls 'initializer' on 'initargs' first, e.g. to set
+# the configuration it needs.
+def start_executor(backend, num_workers, initializer=None, initargs=()):
+    if backend == "serial":
+        if initializer is not None:
+            initializer(*initargs)
+        return SerialExecutor()
+    elif backend == "processes":
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=num_workers, initializer=initializer, initargs=initargs)
+    elif backend == "ipyparallel":
+        import ipyparallel as ipp
+        cluster = ipp.Cluster(
+            n=num_workers,
+            controller_ip="*",
+            engine_launcher_class="MPI",
+            location="server.local",
+        )
+        cluster.start_cluster_sync()
+        client = cluster.connect_client_sync()
+        client.wait_for_engines(n=num_workers)
+        if initializer is not None:
+            client[:].apply_sync(initializer, *initargs)
+        executor = client.executor()
+        clusters[id(executor)] = cluster
+        clients[id(executor)] = client
+        return executor
+    elif backend == "mpi":
+        from mpi4py.futures import MPIPoolExecutor
+        return MPIPoolExecutor(max_workers=num_workers, initializer=initializer, initargs=initargs)
+    raise ValueError("unknown backend: " + str(backend))
+
+# rendezvous(rendezvous_dir, num_workers, func, args) calls 'func' on 'args'
+# once 'num_workers' tasks have entered the directory 'rendezvous_dir', which
+# all workers can access, or once rendezvous_timeout seconds have passed.
+# While it waits, the task holds its worker, such that no worker runs two of
+# the tasks.
+def rendezvous(rendezvous_dir, num_workers, func, args):
+    open(rendezvous_dir + uuid.uuid4().hex, "w").close()
+    start = time.time()
+    while len(os.listdir(rendezvous_dir)) < num_workers and time.time() - start < rendezvous_timeout:
+        time.sleep(0.05)
+    return func(*args)
+
+# run_on_every_worker(executor, num_workers, rendezvous_dir, func, *args) calls
+# 'func' on 'args' once on every one of the 'num_workers' workers of the
+# executor 'executor', e.g. to clean up what the tasks left on the nodes, and
+# waits for the calls to complete. The serial backend calls 'func' directly,
+# and ipyparallel sends the call to every engine. The process and MPI pools
+# hand each task to any free worker, so 'num_workers' tasks are submitted
+# that wait for each other in the empty directory 'rendezvous_dir' (see
+# rendezvous), which all workers can access and which is removed afterwards.
+def run_on_every_worker(executor, num_workers, rendezvous_dir, func, *args):
+    import shutil
+    if isinstance(executor, SerialExecutor):
+        func(*args)
+    elif id(executor) in clients:
+        clients[id(executor)][:].apply_sync(func, *args)
+    else:
+        shutil.rmtree(rendezvous_dir, ignore_errors=True)
+        os.makedirs(rendezvous_dir)
+        wait([executor.submit(rendezvous, rendezvous_dir, num_workers, func, args) for _ in range(num_workers)])
+        shutil.rmtree(rendezvous_dir, ignore_errors=True)
+
+# stop_executor(executor) waits for the tasks of the executor 'executor' to
+# complete and stops it, along with its ipyparallel cluster, if any.
+def stop_executor(executor):
+    executor.shutdown(wait=True)
+    clients.pop(id(executor), None)
+    cluster = clusters.pop(id(executor), None)
+    if cluster is not None:
+        cluster.stop_cluster_sync()
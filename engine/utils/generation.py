@@ -0,0 +1,76 @@
+import numpy as np
+from numba import njit
+
+# This module generates the size-matching G(n, m) random graphs used as the
+# baseline of the robustness analysis. The kernels are defined at module level
+# and cached on disk (cache=True), so they are compiled once per machine
+# instead of once per task. The generator never materializes anything of size
+# n * (n - 1) / 2, and emits the graphs directly as CSR arrays (see
+# engine/utils/kernels.py) that can be passed to the scoring code.
+
+# pair_index_to_edges_kernel(x) transforms the vector 'x' of indices in the
+# range from 0 to 0.5*n*(n-1) - 1 to the edge list of a graph, where the index
+# r*(r-1)/2 + c corresponds to the edge (r, c) with c < r. This method of
+# generating random networks is based on the equation on the bottom left of
+# page 036113-3 in https://doi.org/10.1103/PhysRevE.71.036113. Since the
+# floating point estimate of the row can be off by one for very large indices,
+# it is corrected using exact integer arithmetic.
+@njit(cache=True)
+def pair_index_to_edges_kernel(x):
+    sources = np.empty(x.shape[0], dtype=np.int64)
+    targets = np.empty(x.shape[0], dtype=np.int64)
+    for i in range(x.shape[0]):
+        r = np.int64(np.floor(0.5 + np.sqrt(0.25 + 2.0 * x[i])))
+        while r * (r - 1) // 2 > x[i]:
+            r -= 1
+        while (r + 1) * r // 2 <= x[i]:
+            r += 1
+        sources[i] = r
+        targets[i] = x[i] - r * (r - 1) // 2
+    return sources, targets
+
+# sample_distinct(population, size, rs) draws 'size' distinct integers
+# uniformly at random from the range from 0 to 'population' - 1 using the random
+# generator 'rs', in O('size') memory. Integers are drawn with replacement in
+# batches until enough distinct ones are found, and a uniformly random subset
+# of the distinct integers of the required size is returned. If more than half
+# of the population is to be drawn, the complement is sampled instead, so that
+# the number of rejected duplicates stays small. The result is sorted.
+def sample_distinct(population, size, rs):
+    if size > population // 2:
+        excluded = sample_distinct(population, population - size, rs)
+        return np.setdiff1d(np.arange(population, dtype=np.int64), excluded, assume_unique=True)
+    drawn = np.empty(0, dtype=np.int64)
+    while drawn.shape[0] < size:
+        missing = size - drawn.shape[0]
+        # Draw slightly more than the number of missing integers to make up
+        # for the expected number of duplicates.
+        batch = rs.integers(low=0, high=population, size=missing + missing // 16 + 16, dtype=np.int64)
+        drawn = np.sort(np.concatenate((drawn, batch)))
+        drawn = drawn[np.concatenate(([True], drawn[1:] != drawn[:-1]))]
+    if drawn.shape[0] > size:
+        drawn = np.sort(drawn[rs.choice(drawn.shape[0], size=size, replace=False)])
+    return drawn
+
+# sample_gnm_edges(n, m, rs) samples the edge list of a G(n, m) random graph
+# with 'n' vertices and 'm' edges using the random generator 'rs'. The function
+# returns two int64 arrays containing the sources and the targets of the edges.
+def sample_gnm_edges(n, m, rs):
+    return pair_index_to_edges_kernel(sample_distinct(n * (n - 1) // 2, m, rs))
+
+# generate_gnm_csr(n, m, rs) generates a random network that is size-matching
+# to 'n' and 'm' using the random generator 'rs', and returns the CSR arrays
+# 'offsets' and 'neighbors' of its largest connected component. If the largest
+# connected component does not contain at least 0.96*'n' vertices, the function
+# retries until it has either generated 100 insufficient graphs, in which case
+# it returns None, or until it generates one sufficient graph.
+def generate_gnm_csr(n, m, rs):
+    from engine.utils.kernels import edges_to_csr_kernel, largest_component_kernel
+    num_attempts = 0
+    while num_attempts < 100:
+        offsets, neighbors = largest_component_kernel(*edges_to_csr_kernel(n, *sample_gnm_edges(n, m, rs)))
+        if (len(offsets) - 1) / n >= 0.96:
+            return offsets, neighbors
+        else:
+            num_attempts += 1
+    return None
@@ -1,3 +1,4 @@
+import functools
 import logging
 import os
 import shutil
@@ -8,7 +9,10 @@ def get_categories(data_dir):
     base_path = data_dir
     result_list = []
     for category_name in os.listdir(base_path):
-        if category_name == "__MACOSX" or category_name == "nets.pkl" or category_name == ".DS_Store":
+        if category_name == "__MACOSX" or category_name == "nets.pkl" or category_name == ".DS_Store" or \
+                category_name == "shared_graphs":
+            continue
+        if not os.path.isdir(os.path.join(base_path, category_name)):
             continue
         result_list.append(category_name)
     return result_list
@@ -36,39 +40,136 @@ def get_subnetworks(data_dir, category, network):
         result_list.append(subnetwork_name)
     return result_list
 
+# get_graph_file(args) returns the path of the original version of a graph,
+# given an argument list 'args' containing the: dataset's directory, the
+# network's: category, network, and subnetwork.
+def get_graph_file(args):
+    data_dir, category, network, subnetwork = args[0], args[1], args[2], args[3]
+    return os.path.join(data_dir + category, network, subnetwork, "Graph-Data", subnetwork + ".gt")
+
+# get_pre_processed_file(args) returns the path of the preprocessed version of
+# a graph, given an argument list 'args' containing the: dataset's directory,
+# the network's: category, network, and subnetwork.
+def get_pre_processed_file(args):
+    data_dir, category, network, subnetwork = args[0], args[1], args[2], args[3]
+    return os.path.join(data_dir + category, network, subnetwork, "Graph-Data", "preprocessed", subnetwork + ".gt")
+
+# get_metadata_file(args) returns the path of the metadata of the preprocessed
+# version of a graph, given an argument list 'args' containing the: dataset's
+# directory, the network's: category, network, and subnetwork.
+def get_metadata_file(args):
+    data_dir, category, network, subnetwork = args[0], args[1], args[2], args[3]
+    return os.path.join(data_dir + category, network, subnetwork, "Graph-Data", "preprocessed", subnetwork + ".json")
+
+# load_metadata(args) returns the metadata of the preprocessed version of a
+# graph as a dictionary (see write_metadata), given an argument list
+# 'args' containing the: dataset's directory, the network's: category, network,
+# and subnetwork. The function returns None if there is no metadata.
+def load_metadata(args):
+    import json
+    if not os.path.isfile(get_metadata_file(args)):
+        return None
+    with open(get_metadata_file(args)) as f:
+        return json.load(f)
+
+# atomic_write(path, write) calls 'write' with a binary file object opened on a
+# temporary file next to 'path', and then renames the temporary file to
+# 'path'. As the rename is atomic, 'path' either holds the complete output or
+# its previous content, even if the process is killed while writing.
+def atomic_write(path, write):
+    tmp_path = path + "." + str(os.getpid()) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
 # load_graph(args) loads the preprocessed version of a graph, given an argument
 # list 'args' containing the: dataset's directory, the network's: category,
 # network, and subnetwork. 
 def load_graph(args):
     from graph_tool import load_graph
-    data_dir, category, network, subnetwork = args[0], args[1], args[2], args[3]
-    pre_processed_file = os.path.join(data_dir + category, network, subnetwork,
-                                       "Graph-Data", "preprocessed", subnetwork + ".gt")
-    return load_graph(pre_processed_file)
+    return load_graph(get_pre_processed_file(args))
+
+# clean_graph(g) returns the graph 'g' without self-loops and parallel edges,
+# reduced to its largest connected component.
+def clean_graph(g):
+    from graph_tool.generation import remove_self_loops, remove_parallel_edges
+    from graph_tool.topology import extract_largest_component
+    remove_self_loops(g)
+    remove_parallel_edges(g)
+    return extract_largest_component(g, prune=True)
+
+# write_metadata(g, args, original_size) writes the metadata of the
+# preprocessed graph 'g', given an argument list 'args' containing the:
+# dataset's directory, the network's: category, network, and subnetwork. The
+# metadata holds the source of the graph (its "source" graph property, if any),
+# its number of vertices and edges, the number of vertices and edges of the
+# original graph, 'original_size' (None if unknown), statistics of its degrees,
+# the SHA-256 hash of the preprocessed file, and the paths of the original and
+# preprocessed files relative to the dataset's directory.
+def write_metadata(g, args, original_size):
+    import hashlib
+    import json
+    import numpy as np
+    degrees = np.asarray(g.get_total_degrees(g.get_vertices()), dtype=np.float64)
+    h = hashlib.sha256()
+    with open(get_pre_processed_file(args), "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    metadata = {"source": str(g.graph_properties["source"]) if "source" in g.graph_properties else None,
+                "num_vertices": g.num_vertices(), "num_edges": g.num_edges(),
+                "original_num_vertices": None if original_size is None else original_size[0],
+                "original_num_edges": None if original_size is None else original_size[1],
+                "min_degree": int(degrees.min()) if len(degrees) > 0 else None,
+                "max_degree": int(degrees.max()) if len(degrees) > 0 else None,
+                "mean_degree": float(degrees.mean()) if len(degrees) > 0 else None,
+                "std_degree": float(degrees.std()) if len(degrees) > 0 else None,
+                "sha256": h.hexdigest(),
+                "graph_file": os.path.relpath(get_graph_file(args), args[0]) if os.path.isfile(get_graph_file(args))
+                else None,
+                "pre_processed_file": os.path.relpath(get_pre_processed_file(args), args[0])}
+    atomic_write(get_metadata_file(args), lambda f: f.write(json.dumps(metadata).encode()))
+
+# write_pre_processed(g, args, original_size) saves the preprocessed graph 'g'
+# along with its metadata (see write_metadata), given an argument list 'args'
+# containing the: dataset's directory, the network's: category, network, and
+# subnetwork.
+def write_pre_processed(g, args, original_size):
+    os.makedirs(os.path.dirname(get_pre_processed_file(args)), exist_ok=True)
+    atomic_write(get_pre_processed_file(args), lambda f: g.save(f, fmt="gt"))
+    write_metadata(g, args, original_size)
 
 # pre_process([data_dir, category, network, subnetwork])
 # preprocesses an empirical network given its descriptors 'args'.
 def pre_process(args):
     from graph_tool import load_graph
-    from graph_tool.generation import remove_self_loops, remove_parallel_edges
-    from graph_tool.topology import extract_largest_component
-    # As arguments of the function the directory of the datasets, the network's:
-    # category, network, subnetwork information are mentioned. 
-    data_dir, category, network, subnetwork = args[0], args[1], args[2], args[3]
-    base = os.path.join(data_dir + category, network, subnetwork)
-    file = os.path.join(base, "Graph-Data", subnetwork + ".gt")
-    pre_processed_base = os.path.join(base, "Graph-Data", "preprocessed")
-    pre_processed_file = os.path.join(pre_processed_base, subnetwork + ".gt")
-
-    os.mkdir(pre_processed_base)
     # The preprocessing removes self-loops and parallel edges, finally
     # discarding anything not in the largest connected component.
-    g = load_graph(file)
-    remove_self_loops(g)
-    remove_parallel_edges(g)
-    extract_largest_component(g, prune=True).save(pre_processed_file, fmt="gt")
+    g = load_graph(get_graph_file(args))
+    original_size = (g.num_vertices(), g.num_edges())
+    write_pre_processed(clean_graph(g), args, original_size)
     return (0,) + args
 
+# ingest(g, args, source) writes the collected graph 'g' from the source
+# 'source' into the dataset in a single pass, given an argument list 'args'
+# containing the: dataset's directory, the network's: category, network, and
+# subnetwork. The graph is preprocessed in memory as by pre_process(), and only
+# the preprocessed graph and its metadata are written, along with the original
+# graph if set by set_keep_original_graphs. The function returns the path of
+# the preprocessed graph.
+def ingest(g, args, source):
+    data_dir, category, network, subnetwork = args[0], args[1], args[2], args[3]
+    base = os.path.join(data_dir + category, network, subnetwork)
+    for directory in ["Graph-Data", "Robustness-Score-Data", "Scalefreeness-Score-Data"]:
+        os.makedirs(os.path.join(base, directory), exist_ok=True)
+    source_property = g.new_graph_property("string")
+    source_property[g] = source
+    g.graph_properties["source"] = source_property
+    if get_keep_original_graphs():
+        atomic_write(get_graph_file(args), lambda f: g.save(f, fmt="gt"))
+    original_size = (g.num_vertices(), g.num_edges())
+    write_pre_processed(clean_graph(g), args, original_size)
+    return get_pre_processed_file(args)
+
 
 # reset_logger() resets the logger currently at use, to be able to start a new
 # logging procedure.  
@@ -100,43 +201,143 @@ def log_initial_parameters():
     logging.info("data_dir: %s", get_data_dir())
     logging.info("log_dir: %s", get_log_dir())
     logging.info("num_sampled_random_graphs: %s", get_num_sampled_random_graphs())
+    logging.info("baseline_half_width (None for a fixed number): %s", get_baseline_half_width())
+    logging.info("min_num_baselines: %s", get_min_num_baselines())
+    logging.info("max_num_baselines: %s", get_max_num_baselines())
+    logging.info("num_tie_breaking_seeds: %s", get_num_tie_breaking_seeds())
+    logging.info("batch_adaptive_fraction: %s", get_batch_adaptive_fraction())
+    logging.info("score_edges: %s", get_score_edges())
     logging.info("vertex_cut_off (lower bound): %s", get_vertex_cut_off())
     logging.info("edge_cut_off (lower bound): %s", get_edge_cut_off())
     logging.info("seed: %s", get_seed())
+    logging.info("backend: %s", get_backend())
+    logging.info("memory_budget (bytes per node): %s", get_memory_budget())
+    logging.info("fused_baselines: %s", get_fused_baselines())
+    logging.info("cache_dir: %s", get_cache_dir())
+    logging.info("cache_max_age (seconds): %s", get_cache_max_age())
+    logging.info("cache_max_size (bytes): %s", get_cache_max_size())
     reset_logger()
 
+# The number of size-matching random graphs of the paper. The z-scores are
+# scaled as if each network was compared to this many random graphs, such that
+# they do not depend on the number of random graphs sampled for it (see
+# set_adaptive_baselines), which only makes the estimates of the mean and the
+# standard deviation more precise.
+reference_num_baselines = 10
+
 # z_score(val, arr) computes the z-score to describe the relationship of the
-# single value, 'val', to the mean of the group of values, 'arr'. 
+# single value, 'val', to the mean of the group of values, 'arr', in units of
+# the standard error of the mean of reference_num_baselines values, whatever
+# the number of values in 'arr'.
 def z_score(val, arr):
     import numpy as np
-    return (np.sqrt(len(arr)) * (val - np.mean(arr))) / (np.sqrt(np.var(arr, ddof=0)))
-
-
-# compute_z_score(beta) computes for each network from the collection stored in
-# get_data_dir() three z-scores when the fraction 0 <= 'beta' <= 1 of the
-# vertices are removed from the network. It returns a list of tuples where each
-# tuple corresponds to a network from the collection. The first three elements
-# of each tuple are z-scores comparing the robustness of an empirical network,
-# identified uniquely by the last four elements of the tuple. Each of the three
-# z-score values reflects how the robustness of an empirical network compares to
-# size-matching random graphs under: static/adaptive targeted attack.
-def compute_z_score(beta):
-    import pickle
+    return (np.sqrt(reference_num_baselines) * (val - np.mean(arr))) / (np.sqrt(np.var(arr, ddof=0)))
+
+
+# get_num_baselines(baseline_scores) returns the number of size-matching random
+# graphs to which a network is compared when they are sampled adaptively (see
+# set_adaptive_baselines), given the score curves 'baseline_scores' of the k
+# random graphs scored so far, as an array of shape (k, strategies, 100). The
+# sampling stops once the 95% confidence interval of the mean baseline score is
+# narrow enough under all strategies and at all fractions, or once
+# get_max_num_baselines() graphs were scored, and the function returns k. Otherwise, it returns the number of
+# graphs at which the interval is expected to be narrow enough given the
+# current standard deviation, but at most 2k, as the standard deviation of a
+# few graphs is a rough estimate.
+def get_num_baselines(baseline_scores):
+    import numpy as np
+    from scipy.stats import t
+    k = len(baseline_scores)
+    if k >= get_max_num_baselines():
+        return k
+    if k < max(get_min_num_baselines(), 2):
+        return min(max(get_min_num_baselines(), 2), get_max_num_baselines())
+    quantile = t.ppf(0.975, k - 1)
+    std = np.nanmax(np.std(np.asarray(baseline_scores, dtype=np.float64), axis=0, ddof=1))
+    if quantile * std / np.sqrt(k) <= get_baseline_half_width():
+        return k
+    needed = int(np.ceil((quantile * std / get_baseline_half_width()) ** 2))
+    return min(get_max_num_baselines(), 2 * k, max(k + 1, needed))
+
+# compute_z_scores() computes the z-scores of all networks in the score store
+# (see engine/utils/store.py) under all of its removal strategies and for all
+# fractions of removed vertices in a single vectorized pass. It returns the
+# index table of the store, and a read-only array of shape (networks,
+# strategies, 100) where the cell (i, j, k) is the z-score of the i-th network
+# of the index under the j-th strategy when (k + 1)% of the vertices are
+# removed. The result is cached
+# until the content of the store changes, such that repeated calls (e.g. for
+# different fractions or figures) do not read the store again.
+def compute_z_scores():
+    from engine.utils.store import get_store_stamp
+    score_index, z_scores, _ = cached_z_scores(get_score_store_dir(), get_store_stamp())
+    return score_index, z_scores
+
+# z_score_frame() returns the z-scores computed by compute_z_scores() as a
+# pandas DataFrame, whose rows are indexed by (category, network, subnetwork)
+# and whose columns are indexed by (removal strategy, fraction of removed
+# vertices).
+def z_score_frame():
+    from engine.utils.store import get_store_stamp
+    return cached_z_scores(get_score_store_dir(), get_store_stamp())[2]
+
+# cached_z_scores(score_store_dir, stamp) computes the results of
+# compute_z_scores() and z_score_frame() for the score store located in
+# 'score_store_dir', whose content is identified by 'stamp'. The z-scores are
+# computed as in z_score(val, arr), where the mean and the variance of the
+# baseline curves of each network are obtained by summing over the contiguous
+# block of its rows in the baseline array. The number of random graphs of each
+# network is kept next to its z-scores in the 'num_baselines' column of the
+# index table.
+@functools.lru_cache(maxsize=4)
+def cached_z_scores(score_store_dir, stamp):
+    import numpy as np
+    import pandas as pd
+    from engine.utils.store import get_stored_strategies, load_score_index, load_scores
+    strategies = get_stored_strategies()
+    score_index = load_score_index()
+    offsets = score_index["baseline_offset"].to_numpy(dtype=np.int64)
+    counts = score_index["num_baselines"].to_numpy(dtype=np.int64)
+    z_scores = np.full((len(score_index), len(strategies), 100), np.nan)
+    valid = counts > 0
+    for j, removal_strategy in enumerate(strategies):
+        score_main = np.asarray(load_scores(removal_strategy, "main", score_index))
+        score_baseline = np.asarray(load_scores(removal_strategy, "baseline", score_index))
+        if not valid.any():
+            continue
+        mean = np.add.reduceat(score_baseline, offsets[valid], axis=0) / counts[valid, None]
+        deviation = score_baseline - np.repeat(mean, counts[valid], axis=0)
+        var = np.add.reduceat(deviation * deviation, offsets[valid], axis=0) / counts[valid, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z_scores[valid, j] = np.sqrt(reference_num_baselines) * (score_main[valid] - mean) / np.sqrt(var)
+    z_scores.setflags(write=False)
+    frame = pd.DataFrame(z_scores.reshape(len(score_index), -1),
+                         index=pd.MultiIndex.from_frame(score_index[["category", "network", "subnetwork"]]),
+                         columns=pd.MultiIndex.from_product([strategies, np.round(np.linspace(0.01, 1, 100), 2)],
+                                                            names=["strategy", "beta"]))
+    return score_index, z_scores, frame
+
+# compute_z_score(beta, removal_strategies=None) computes for each network in
+# the score store (see engine/utils/store.py) three z-scores when the fraction
+# 0 <= 'beta' <= 1 of the vertices are removed from the network. It returns a
+# list of tuples where each tuple corresponds to a network from the
+# collection. The first three elements of each tuple are z-scores comparing the
+# robustness of an empirical network, identified uniquely by the last three
+# elements of the tuple. Each of the three z-score values reflects how the
+# robustness of an empirical network compares to size-matching random graphs
+# under: static/adaptive targeted attack, and random failure. Other removal
+# strategies of the store can be given as 'removal_strategies', e.g. the edge
+# removal strategies if they were scored (see set_score_edges), for which
+# 'beta' is the fraction of removed edges, and
+# each tuple then holds one z-score per strategy. The z-scores are taken from
+# compute_z_scores().
+def compute_z_score(beta, removal_strategies=None):
+    from engine.utils.store import get_stored_strategies
+    strategies = get_stored_strategies()
+    if removal_strategies is None:
+        removal_strategies = ["static-targeted-attack", "adaptive-targeted-attack", "random-failure"]
     index = int(beta * 100) - 1
-    points = []
-    data_dir = get_data_dir()
-    for category in get_categories(data_dir):
-        for network in get_networks(data_dir, category):
-            for subnetwork in get_subnetworks(data_dir, category, network):
-                file_dir = data_dir + category + "/" + network + "/" + subnetwork + "/Robustness-Score-Data/scores.pkl"
-                point = ()
-                with open(file_dir, "rb") as f:
-                    scores = pickle.load(f)
-                    for removal_strategy in ["static-targeted-attack", "adaptive-targeted-attack",
-                                                "random-failure"]:
-                        score_main = scores["main"][removal_strategy][index]
-                        score_baseline = [scores["baseline"][removal_strategy][i][index] for i in
-                                            range(len(scores["baseline"][removal_strategy]))]
-                        point = point + (z_score(score_main, score_baseline),)
-                points.append(point + (category, network, subnetwork))
-    return points
+    columns = [strategies.index(strategy) for strategy in removal_strategies]
+    score_index, z_scores = compute_z_scores()
+    return [tuple(z_scores[i, columns, index].tolist()) + (row.category, row.network, row.subnetwork)
+            for i, row in enumerate(score_index.itertuples())]
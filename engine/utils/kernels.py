@@ -0,0 +1,471 @@
+import numpy as np
+from numba import njit
+
+# This module contains the Numba-compiled kernels used by the robustness
+# analysis. All kernels operate on graphs in the compressed sparse row (CSR)
+# format, i.e., the neighbors of vertex v are stored in
+# 'neighbors[offsets[v]:offsets[v + 1]]'. The kernels are compiled once and
+# cached on disk (cache=True), so that the compilation cost is only paid on the
+# first run on each machine and not once per task.
+
+# adaptive_targeted_attack_kernel(offsets, neighbors, rs) computes the reverse
+# removal order of the graph given by the CSR arrays 'offsets' and 'neighbors'
+# when vertices are removed based on adaptive targeted attacks, using the NumPy
+# random generator 'rs' for tie-breaking. The vertices are kept in a bucket
+# queue indexed by their current degree. Each bucket is a stack that lives in a
+# contiguous slice of the flat array 'bins', starting at 'start[k]' and holding
+# 'size[k]' vertices. A vertex can only enter the bucket k if its initial
+# degree is at least k, hence the bucket k never holds more vertices than there
+# are vertices of initial degree at least k, and the flat array has at most
+# n + 2m cells. The random numbers are drawn in exactly the same order as in the
+# list-based implementation this kernel replaces, so for the same seed the same
+# removal order is produced.
+@njit(cache=True)
+def adaptive_targeted_attack_kernel(offsets, neighbors, rs):
+    num_vertices = offsets.shape[0] - 1
+    deg = np.empty(num_vertices, dtype=np.int64)
+    max_deg = 0
+    for v in range(num_vertices):
+        deg[v] = offsets[v + 1] - offsets[v]
+        if deg[v] > max_deg:
+            max_deg = deg[v]
+    # The capacity of the bucket k is the number of vertices with an initial
+    # degree of at least k.
+    capacity = np.zeros(max_deg + 2, dtype=np.int64)
+    for v in range(num_vertices):
+        capacity[deg[v]] += 1
+    for k in range(max_deg - 1, -1, -1):
+        capacity[k] += capacity[k + 1]
+    start = np.zeros(max_deg + 2, dtype=np.int64)
+    for k in range(1, max_deg + 2):
+        start[k] = start[k - 1] + capacity[k - 1]
+    size = np.zeros(max_deg + 1, dtype=np.int64)
+    bins = np.empty(start[max_deg + 1], dtype=np.int64)
+    pos = np.empty(num_vertices, dtype=np.int64)
+    # Fill the buckets in a random order.
+    for v in rs.permutation(num_vertices):
+        k = deg[v]
+        bins[start[k] + size[k]] = v
+        pos[v] = size[k]
+        size[k] += 1
+    # Repeatedly remove a vertex with the highest current degree, and decrement
+    # the degree of its (randomly shuffled) remaining neighbors.
+    removal_order = np.empty(num_vertices, dtype=np.int64)
+    num_removed = 0
+    buffer = np.empty(max_deg, dtype=np.int64)
+    for k in range(max_deg, -1, -1):
+        while size[k] != 0:
+            size[k] -= 1
+            v = bins[start[k] + size[k]]
+            d = offsets[v + 1] - offsets[v]
+            neighbors_v = buffer[:d]
+            neighbors_v[:] = neighbors[offsets[v]:offsets[v + 1]]
+            rs.shuffle(neighbors_v)
+            for u in neighbors_v:
+                if deg[u] > 0:
+                    bin_u, pos_u = deg[u], pos[u]
+                    last = bins[start[bin_u] + size[bin_u] - 1]
+                    pos[last] = pos_u
+                    bins[start[bin_u] + pos_u] = last
+                    size[bin_u] -= 1
+                    bins[start[bin_u - 1] + size[bin_u - 1]] = u
+                    pos[u] = size[bin_u - 1]
+                    size[bin_u - 1] += 1
+                    deg[u] -= 1
+            deg[v] = 0
+            removal_order[num_removed] = v
+            num_removed += 1
+    return removal_order[::-1].copy()
+
+# batch_adaptive_attack_kernel(offsets, neighbors, batch_fraction, rs) computes
+# the reverse removal order of the graph given by the CSR arrays 'offsets' and
+# 'neighbors' under an approximation of the adaptive targeted attack, using the
+# NumPy random generator 'rs' for tie-breaking. Instead of one vertex, each
+# round removes the 'batch_fraction' of the remaining vertices (at least one)
+# with the highest current degree, in the order of decreasing degree, and the
+# degrees of their neighbors are only updated once the whole batch is removed.
+# Ties are broken by a random priority drawn once per vertex: the vertices are
+# kept in slots in the order of their priority, with their current degree in
+# 'slot_deg' (-1 once removed), such that each round selects its batch in a
+# single sequential pass over the slots. The slot of each vertex is kept in
+# 'slot' (-1 once removed, as its slot is reused by the compaction). The number
+# of remaining vertices of each degree is kept up to date in 'count', from
+# which the lowest degree in the batch is read off, and the slots are compacted
+# once half of them are empty. A batch fraction of f takes about ln(n) / f
+# rounds.
+@njit(cache=True)
+def batch_adaptive_attack_kernel(offsets, neighbors, batch_fraction, rs):
+    num_vertices = offsets.shape[0] - 1
+    max_deg = 0
+    for v in range(num_vertices):
+        max_deg = max(max_deg, offsets[v + 1] - offsets[v])
+    count = np.zeros(max_deg + 1, dtype=np.int64)
+    start = np.zeros(max_deg + 1, dtype=np.int64)
+    slot_vertex = rs.permutation(num_vertices)
+    slot_deg = np.empty(num_vertices, dtype=np.int64)
+    slot = np.empty(num_vertices, dtype=np.int64)
+    for i in range(num_vertices):
+        v = slot_vertex[i]
+        slot_deg[i] = offsets[v + 1] - offsets[v]
+        slot[v] = i
+        count[slot_deg[i]] += 1
+    num_slots, num_alive, num_removed = num_vertices, num_vertices, 0
+    removal_order = np.empty(num_vertices, dtype=np.int64)
+    current_max = max_deg
+    while num_alive > 0:
+        while current_max > 0 and count[current_max] == 0:
+            current_max -= 1
+        # Once no edges are left, the remaining vertices are removed in the
+        # order of their priority.
+        if current_max == 0:
+            for i in range(num_slots):
+                if slot_deg[i] >= 0:
+                    removal_order[num_removed] = slot_vertex[i]
+                    num_removed += 1
+            break
+        batch_size = max(1, int(np.ceil(batch_fraction * num_alive)))
+        # The batch holds all vertices of a degree above 'threshold', and the
+        # 'num_at_threshold' vertices of this degree with the highest priority.
+        threshold = current_max
+        num_taken = count[threshold]
+        while num_taken < batch_size:
+            threshold -= 1
+            num_taken += count[threshold]
+        num_at_threshold = batch_size - (num_taken - count[threshold])
+        # Place the batch in the order of decreasing degree, by counting sort.
+        position = num_removed
+        for d in range(current_max, threshold - 1, -1):
+            start[d] = position
+            position += count[d] if d > threshold else num_at_threshold
+        for i in range(num_slots):
+            d = slot_deg[i]
+            if d > threshold or (d == threshold and num_at_threshold > 0):
+                if d == threshold:
+                    num_at_threshold -= 1
+                removal_order[start[d]] = slot_vertex[i]
+                start[d] += 1
+                slot[slot_vertex[i]] = -1
+                slot_deg[i] = -1
+                count[d] -= 1
+        # Update the degrees of the remaining neighbors of the batch.
+        for k in range(num_removed, num_removed + batch_size):
+            v = removal_order[k]
+            for j in range(offsets[v], offsets[v + 1]):
+                i = slot[neighbors[j]]
+                if i < 0:
+                    continue
+                d = slot_deg[i]
+                if d > 0:
+                    slot_deg[i] = d - 1
+                    count[d] -= 1
+                    count[d - 1] += 1
+        num_removed += batch_size
+        num_alive -= batch_size
+        # Compact the slots once half of them are empty.
+        if 2 * num_alive < num_slots:
+            k = 0
+            for i in range(num_slots):
+                if slot_deg[i] >= 0:
+                    slot_vertex[k] = slot_vertex[i]
+                    slot_deg[k] = slot_deg[i]
+                    slot[slot_vertex[k]] = k
+                    k += 1
+            num_slots = k
+    return removal_order[::-1].copy()
+
+# find_root(parent, v) returns the root of the set containing the vertex v in
+# the union-find forest 'parent', halving the path to the root on the way.
+@njit(cache=True)
+def find_root(parent, v):
+    while parent[v] != v:
+        parent[v] = parent[parent[v]]
+        v = parent[v]
+    return v
+
+# percolation_scores_kernel(offsets, neighbors, reverse_removal_orders,
+# endpoints) computes the robustness scores of the graph given by the CSR
+# arrays 'offsets' and 'neighbors' for each row of the K x n array
+# 'reverse_removal_orders'. The vertices of each order are added back to the
+# graph one at a time, and a union-find forest (union by size, path halving)
+# tracks the size of the largest connected component. The fraction of
+# vertices in the largest component after removing j + 1 vertices is
+# accumulated in a running (prefix) sum, which is read off at each of the
+# sorted 'endpoints'. The function returns a K x len(endpoints) array, where
+# the cell (k, i) is the mean largest component fraction over the first
+# 'endpoints[i]' removals of the k-th order.
+@njit(cache=True)
+def percolation_scores_kernel(offsets, neighbors, reverse_removal_orders, endpoints):
+    num_orders, num_vertices = reverse_removal_orders.shape
+    scores = np.empty((num_orders, endpoints.shape[0]), dtype=np.float64)
+    parent = np.empty(num_vertices, dtype=np.int64)
+    size = np.empty(num_vertices, dtype=np.int64)
+    largest = np.empty(num_vertices, dtype=np.int64)
+    for k in range(num_orders):
+        parent[:] = -1
+        current = 0
+        for i in range(num_vertices):
+            v = reverse_removal_orders[k, i]
+            parent[v] = v
+            size[v] = 1
+            if current < 1:
+                current = 1
+            for j in range(offsets[v], offsets[v + 1]):
+                u = neighbors[j]
+                if parent[u] < 0:
+                    continue
+                root_u, root_v = find_root(parent, u), find_root(parent, v)
+                if root_u == root_v:
+                    continue
+                if size[root_u] > size[root_v]:
+                    root_u, root_v = root_v, root_u
+                parent[root_u] = root_v
+                size[root_v] += size[root_u]
+                if size[root_v] > current:
+                    current = size[root_v]
+            largest[i] = current
+        # After removing j + 1 vertices, the largest component is the one
+        # observed after adding back the first n - j - 1 vertices of the order
+        # (and empty once all vertices are removed).
+        total = 0.0
+        p = 0
+        for j in range(num_vertices):
+            if j < num_vertices - 1:
+                total += largest[num_vertices - 2 - j]
+            while p < endpoints.shape[0] and endpoints[p] == j + 1:
+                scores[k, p] = total / (num_vertices * (j + 1))
+                p += 1
+    return scores
+
+# edge_list_kernel(offsets, neighbors) returns the edges of the undirected
+# graph given by the CSR arrays 'offsets' and 'neighbors' as two arrays
+# 'sources' and 'targets' with sources[e] < targets[e], numbered in the order
+# in which they appear in the neighborhoods of their lower endpoint, along with
+# the array 'slot_edge' holding the number of the edge at each position of
+# 'neighbors', such that both occurrences of an edge map to it. The reverse
+# occurrences are matched to their edges by bucketing them by their lower
+# endpoint, which takes linear time.
+@njit(cache=True)
+def edge_list_kernel(offsets, neighbors):
+    num_vertices = offsets.shape[0] - 1
+    slot_edge = np.full(neighbors.shape[0], -1, dtype=np.int64)
+    num_edges = 0
+    reverse_count = np.zeros(num_vertices + 1, dtype=np.int64)
+    for u in range(num_vertices):
+        for j in range(offsets[u], offsets[u + 1]):
+            if neighbors[j] > u:
+                num_edges += 1
+            elif neighbors[j] < u:
+                reverse_count[neighbors[j] + 1] += 1
+    sources = np.empty(num_edges, dtype=np.int64)
+    targets = np.empty(num_edges, dtype=np.int64)
+    e = 0
+    for u in range(num_vertices):
+        for j in range(offsets[u], offsets[u + 1]):
+            if neighbors[j] > u:
+                sources[e], targets[e] = u, neighbors[j]
+                slot_edge[j] = e
+                e += 1
+    # Bucket the reverse occurrences (w -> v with v < w) by v.
+    for v in range(num_vertices):
+        reverse_count[v + 1] += reverse_count[v]
+    fill = reverse_count[:-1].copy()
+    reverse_slot = np.empty(reverse_count[-1], dtype=np.int64)
+    reverse_source = np.empty(reverse_count[-1], dtype=np.int64)
+    for w in range(num_vertices):
+        for j in range(offsets[w], offsets[w + 1]):
+            v = neighbors[j]
+            if v < w:
+                reverse_slot[fill[v]] = j
+                reverse_source[fill[v]] = w
+                fill[v] += 1
+    edge_of = np.empty(num_vertices, dtype=np.int64)
+    for v in range(num_vertices):
+        for j in range(offsets[v], offsets[v + 1]):
+            if neighbors[j] > v:
+                edge_of[neighbors[j]] = slot_edge[j]
+        for k in range(reverse_count[v], reverse_count[v + 1]):
+            slot_edge[reverse_slot[k]] = edge_of[reverse_source[k]]
+    return sources, targets, slot_edge
+
+# edge_betweenness_kernel(offsets, neighbors, slot_edge, num_edges, pivots)
+# returns an estimate of the betweenness of each of the 'num_edges' edges of
+# the graph given by the CSR arrays 'offsets' and 'neighbors', where
+# 'slot_edge' maps each position of 'neighbors' to its edge (see
+# edge_list_kernel). The shortest paths from each of the source vertices in
+# 'pivots' are counted by a breadth-first search, which records the edges of
+# the shortest-path DAG in the order they are found, and the dependencies of
+# the source on these edges are accumulated in reverse order (Brandes'
+# algorithm), such that the second pass does not scan the neighborhoods again.
+# Only the vertices reached from a source are reset after it, so each source
+# takes time linear in the size of its component.
+@njit(cache=True)
+def edge_betweenness_kernel(offsets, neighbors, slot_edge, num_edges, pivots):
+    num_vertices = offsets.shape[0] - 1
+    betweenness = np.zeros(num_edges, dtype=np.float64)
+    dist = np.full(num_vertices, -1, dtype=np.int64)
+    sigma = np.zeros(num_vertices, dtype=np.float64)
+    delta = np.zeros(num_vertices, dtype=np.float64)
+    order = np.empty(num_vertices, dtype=np.int64)
+    dag_slot = np.empty(neighbors.shape[0], dtype=np.int64)
+    dag_source = np.empty(neighbors.shape[0], dtype=np.int64)
+    for s in pivots:
+        dist[s], sigma[s] = 0, 1.0
+        order[0] = s
+        head, tail, num_dag = 0, 1, 0
+        while head < tail:
+            v = order[head]
+            head += 1
+            for j in range(offsets[v], offsets[v + 1]):
+                w = neighbors[j]
+                if dist[w] < 0:
+                    dist[w] = dist[v] + 1
+                    order[tail] = w
+                    tail += 1
+                if dist[w] == dist[v] + 1:
+                    sigma[w] += sigma[v]
+                    dag_slot[num_dag] = j
+                    dag_source[num_dag] = v
+                    num_dag += 1
+        for k in range(num_dag - 1, -1, -1):
+            v, w = dag_source[k], neighbors[dag_slot[k]]
+            c = sigma[v] / sigma[w] * (1.0 + delta[w])
+            delta[v] += c
+            betweenness[slot_edge[dag_slot[k]]] += c
+        for i in range(tail):
+            v = order[i]
+            dist[v], sigma[v], delta[v] = -1, 0.0, 0.0
+    return betweenness
+
+# shuffle_ties_kernel(order, keys, rs) returns a copy of the array 'order',
+# which lists the indices of 'keys' in the order of increasing key, in which
+# each run of indices with equal keys is shuffled using the NumPy random
+# generator 'rs'. This breaks the ties of a sorted order at random in linear
+# time, instead of sorting again for each random generator.
+@njit(cache=True)
+def shuffle_ties_kernel(order, keys, rs):
+    shuffled = order.copy()
+    start = 0
+    for i in range(1, order.shape[0] + 1):
+        if i == order.shape[0] or keys[order[i]] != keys[order[start]]:
+            if i - start > 1:
+                rs.shuffle(shuffled[start:i])
+            start = i
+    return shuffled
+
+# edge_percolation_scores_kernel(num_vertices, sources, targets,
+# reverse_removal_orders, endpoints) computes the robustness scores of the
+# graph with 'num_vertices' vertices and the edges (sources[e], targets[e]) for
+# each row of the K x m array 'reverse_removal_orders' of edges, in the same
+# way as percolation_scores_kernel does for vertices: the edges of each order
+# are added back one at a time to the graph without edges, a union-find forest
+# tracks the size of the largest connected component, and the cell (k, i) of
+# the returned K x len(endpoints) array is the mean largest component fraction
+# over the first 'endpoints[i]' removals of the k-th order. All vertices stay
+# in the graph, so the largest component holds one vertex once all edges are
+# removed.
+@njit(cache=True)
+def edge_percolation_scores_kernel(num_vertices, sources, targets, reverse_removal_orders, endpoints):
+    num_orders, num_edges = reverse_removal_orders.shape
+    scores = np.empty((num_orders, endpoints.shape[0]), dtype=np.float64)
+    parent = np.empty(num_vertices, dtype=np.int64)
+    size = np.empty(num_vertices, dtype=np.int64)
+    largest = np.empty(num_edges + 1, dtype=np.int64)
+    for k in range(num_orders):
+        for v in range(num_vertices):
+            parent[v] = v
+            size[v] = 1
+        current = 1
+        largest[0] = current
+        for i in range(num_edges):
+            e = reverse_removal_orders[k, i]
+            root_u, root_v = find_root(parent, sources[e]), find_root(parent, targets[e])
+            if root_u != root_v:
+                if size[root_u] > size[root_v]:
+                    root_u, root_v = root_v, root_u
+                parent[root_u] = root_v
+                size[root_v] += size[root_u]
+                if size[root_v] > current:
+                    current = size[root_v]
+            largest[i + 1] = current
+        # After removing j + 1 edges, the largest component is the one
+        # observed after adding back the first m - j - 1 edges of the order.
+        total = 0.0
+        p = 0
+        for j in range(num_edges):
+            total += largest[num_edges - 1 - j]
+            while p < endpoints.shape[0] and endpoints[p] == j + 1:
+                scores[k, p] = total / (num_vertices * (j + 1))
+                p += 1
+    return scores
+
+# edges_to_csr_kernel(num_vertices, sources, targets) returns the CSR arrays
+# 'offsets' and 'neighbors' of the undirected graph with 'num_vertices'
+# vertices and the edges (sources[i], targets[i]). Each edge is listed in the
+# neighborhoods of both of its endpoints, in the order of the edge list.
+@njit(cache=True)
+def edges_to_csr_kernel(num_vertices, sources, targets):
+    offsets = np.zeros(num_vertices + 1, dtype=np.int64)
+    for i in range(sources.shape[0]):
+        offsets[sources[i] + 1] += 1
+        offsets[targets[i] + 1] += 1
+    for v in range(num_vertices):
+        offsets[v + 1] += offsets[v]
+    fill = offsets[:-1].copy()
+    neighbors = np.empty(offsets[-1], dtype=np.int64)
+    for i in range(sources.shape[0]):
+        u, v = sources[i], targets[i]
+        neighbors[fill[u]] = v
+        fill[u] += 1
+        neighbors[fill[v]] = u
+        fill[v] += 1
+    return offsets, neighbors
+
+# largest_component_kernel(offsets, neighbors) returns the CSR arrays of the
+# largest connected component of the graph given by 'offsets' and 'neighbors'.
+# The vertices of the component keep their relative order and are relabelled
+# to 0, ..., n' - 1, and the order of the neighbors is preserved.
+@njit(cache=True)
+def largest_component_kernel(offsets, neighbors):
+    num_vertices = offsets.shape[0] - 1
+    component = np.full(num_vertices, -1, dtype=np.int64)
+    stack = np.empty(num_vertices, dtype=np.int64)
+    num_components, largest, largest_size = 0, -1, 0
+    for s in range(num_vertices):
+        if component[s] >= 0:
+            continue
+        component[s] = num_components
+        stack[0] = s
+        top, size = 1, 0
+        while top > 0:
+            top -= 1
+            v = stack[top]
+            size += 1
+            for j in range(offsets[v], offsets[v + 1]):
+                u = neighbors[j]
+                if component[u] < 0:
+                    component[u] = num_components
+                    stack[top] = u
+                    top += 1
+        if size > largest_size:
+            largest, largest_size = num_components, size
+        num_components += 1
+    label = np.full(num_vertices, -1, dtype=np.int64)
+    num_kept = 0
+    for v in range(num_vertices):
+        if component[v] == largest:
+            label[v] = num_kept
+            num_kept += 1
+    new_offsets = np.zeros(num_kept + 1, dtype=np.int64)
+    for v in range(num_vertices):
+        if label[v] >= 0:
+            new_offsets[label[v] + 1] = offsets[v + 1] - offsets[v]
+    for v in range(num_kept):
+        new_offsets[v + 1] += new_offsets[v]
+    new_neighbors = np.empty(new_offsets[-1], dtype=np.int64)
+    for v in range(num_vertices):
+        if label[v] >= 0:
+            k = new_offsets[label[v]]
+            for j in range(offsets[v], offsets[v + 1]):
+                new_neighbors[k] = label[neighbors[j]]
+                k += 1
+    return new_offsets, new_neighbors
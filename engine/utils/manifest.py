@@ -0,0 +1,96 @@
+import os
+import sqlite3
+from engine.utils.io import get_categories, get_networks, get_subnetworks, get_pre_processed_file, load_graph, \
+    load_metadata, write_metadata
+
+# This module implements the manifest of a dataset, an SQLite database
+# "manifest.sqlite" in the dataset's directory with one row per preprocessed
+# network holding its category, network, subnetwork, source, size, degree
+# statistics, content hash, and file paths (relative to the dataset's
+# directory, such that the dataset can be moved). The manifest is filled from
+# the metadata written next to each preprocessed graph (see write_metadata in
+# engine/utils/io.py) by a single process, after the graphs were ingested or
+# preprocessed in parallel. The stages of the analysis query the manifest
+# instead of walking the directory tree and loading graphs.
+
+# The columns of the manifest, along with the keys of the metadata they are
+# filled from.
+manifest_columns = [("source", "source"), ("n", "num_vertices"), ("m", "num_edges"),
+                    ("original_n", "original_num_vertices"), ("original_m", "original_num_edges"),
+                    ("min_degree", "min_degree"), ("max_degree", "max_degree"), ("mean_degree", "mean_degree"),
+                    ("std_degree", "std_degree"), ("sha256", "sha256"), ("graph_file", "graph_file"),
+                    ("pre_processed_file", "pre_processed_file")]
+
+# get_manifest_file(data_dir) returns the path of the manifest of the dataset
+# in 'data_dir'.
+def get_manifest_file(data_dir):
+    return data_dir + "manifest.sqlite"
+
+# connect_manifest(data_dir) opens the manifest of the dataset in 'data_dir',
+# creating it if it does not exist, and returns the connection.
+def connect_manifest(data_dir):
+    connection = sqlite3.connect(get_manifest_file(data_dir), timeout=60)
+    connection.execute("CREATE TABLE IF NOT EXISTS networks (category TEXT, network TEXT, subnetwork TEXT, " +
+                       ", ".join(column for (column, _) in manifest_columns) +
+                       ", PRIMARY KEY (category, network, subnetwork))")
+    return connection
+
+# update_manifest(data_dir, nets) records the networks 'nets', given as tuples
+# starting with the: dataset's directory, the network's: category, network, and
+# subnetwork, in the manifest of the dataset in 'data_dir'. Networks without a
+# preprocessed graph are removed from the manifest, and the metadata of
+# preprocessed graphs without one (e.g. from an earlier version of the code) is
+# written first.
+def update_manifest(data_dir, nets):
+    rows, removed = [], []
+    for net in nets:
+        net = (data_dir,) + tuple(net[1:4])
+        if not os.path.isfile(get_pre_processed_file(net)):
+            removed.append(net[1:])
+            continue
+        metadata = load_metadata(net)
+        if metadata is None:
+            write_metadata(load_graph(net), net, None)
+            metadata = load_metadata(net)
+        rows.append(net[1:] + tuple(metadata[key] for (_, key) in manifest_columns))
+    with connect_manifest(data_dir) as connection:
+        connection.executemany("INSERT OR REPLACE INTO networks VALUES (" + ", ".join(["?"] * (3 + len(
+            manifest_columns))) + ")", rows)
+        connection.executemany("DELETE FROM networks WHERE category = ? AND network = ? AND subnetwork = ?", removed)
+    connection.close()
+
+# remove_from_manifest(data_dir, nets) removes the networks 'nets', given as
+# tuples starting with the: dataset's directory, the network's: category,
+# network, and subnetwork, from the manifest of the dataset in 'data_dir'.
+def remove_from_manifest(data_dir, nets):
+    with connect_manifest(data_dir) as connection:
+        connection.executemany("DELETE FROM networks WHERE category = ? AND network = ? AND subnetwork = ?",
+                               [tuple(net[1:4]) for net in nets])
+    connection.close()
+
+# load_manifest(data_dir) returns the manifest of the dataset in 'data_dir' as
+# a pandas DataFrame, ordered by category, network, and subnetwork.
+def load_manifest(data_dir):
+    import pandas as pd
+    connection = connect_manifest(data_dir)
+    try:
+        return pd.read_sql_query("SELECT * FROM networks ORDER BY category, network, subnetwork", connection)
+    finally:
+        connection.close()
+
+# list_networks(data_dir) returns the networks of the dataset in 'data_dir' as
+# tuples of the: dataset's directory, the network's: category, network, and
+# subnetwork. The networks are read from the manifest if there is one, and
+# otherwise, e.g. for a dataset collected with an earlier version of the code,
+# found by walking the directory tree.
+def list_networks(data_dir):
+    if os.path.isfile(get_manifest_file(data_dir)):
+        df = load_manifest(data_dir)
+        return [(data_dir, category, network, subnetwork) for (category, network, subnetwork) in
+                zip(df["category"], df["network"], df["subnetwork"])]
+    nets = []
+    for category in get_categories(data_dir):
+        for network in get_networks(data_dir, category):
+            for subnetwork in get_subnetworks(data_dir, category, network):
+                nets.append((data_dir, category, network, subnetwork))
+    return nets
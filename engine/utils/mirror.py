@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import threading
+from engine.config.config import *
+from engine.utils.download import download_file
+from engine.utils.io import atomic_write
+
+# This module keeps a persistent local mirror of the Netzschleuder networks in
+# get_netzschleuder_mirror_dir(), such that every network is fetched from
+# Netzschleuder once rather than on every collection run. The mirror is keyed
+# by the network name and its upstream version, the latter being a digest of
+# the network's metadata as served by the Netzschleuder API, and is laid out as:
+#   - "network/LATEST", the last seen version of the network,
+#   - "network/version/meta.json", its metadata,
+#   - "network/version/subnetwork.gt.zst", the compressed graph-tool file as
+#     served by Netzschleuder, along with "subnetwork.gt.zst.sha256", the
+#     SHA-256 hash recorded when it was fetched.
+# Files whose hash does not match are fetched again. In offline mode (see
+# set_netzschleuder_mirror) the networks are served from the mirror only, which
+# may be a copy placed in a local stand-in directory. Files are fetched with
+# download_file(), so a download mirror set by set_download_options applies too.
+
+# The Netzschleuder server.
+netzschleuder_url = "https://networks.skewed.de"
+
+# The versions of the networks seen in this run, and the locks serialising the
+# version lookups of each network.
+versions = {}
+version_locks = {}
+versions_lock = threading.Lock()
+
+# file_sha256(path) returns the SHA-256 hash of the file at 'path'.
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# read_latest(network) returns the last seen version of 'network' in the
+# mirror, or None if the network is not in the mirror.
+def read_latest(network):
+    path = get_netzschleuder_mirror_dir() + network + "/LATEST"
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return f.read().strip()
+
+# fetch_version(network) fetches the metadata of 'network' from Netzschleuder,
+# stores it in the mirror, and returns the version of the network. The function
+# returns None if the metadata cannot be fetched.
+def fetch_version(network):
+    network_dir = get_netzschleuder_mirror_dir() + network + "/"
+    os.makedirs(network_dir, exist_ok=True)
+    meta_path = network_dir + "meta.json.new"
+    # Metadata is always fetched anew rather than resumed.
+    if os.path.exists(meta_path + ".part"):
+        os.remove(meta_path + ".part")
+    if not download_file(netzschleuder_url + "/api/net/" + network, meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.dumps(json.load(f), sort_keys=True)
+    version = hashlib.sha256(meta.encode()).hexdigest()[:16]
+    os.makedirs(network_dir + version, exist_ok=True)
+    os.replace(meta_path, network_dir + version + "/meta.json")
+    atomic_write(network_dir + "LATEST", lambda f: f.write(version.encode()))
+    return version
+
+# get_version(network) returns the version of 'network' to collect: the current
+# upstream version, or the last seen version in the mirror if running offline
+# or if Netzschleuder cannot be reached. The version is looked up once per run.
+def get_version(network):
+    with versions_lock:
+        lock = version_locks.setdefault(network, threading.Lock())
+    with lock:
+        if network not in versions:
+            version = None if get_netzschleuder_offline() else fetch_version(network)
+            versions[network] = version if version is not None else read_latest(network)
+        return versions[network]
+
+# is_intact(path) returns whether the file at 'path' exists and matches the
+# hash recorded for it.
+def is_intact(path):
+    if not (os.path.isfile(path) and os.path.isfile(path + ".sha256")):
+        return False
+    with open(path + ".sha256") as f:
+        return f.read().strip() == file_sha256(path)
+
+# fetch_netzschleuder(network, subnetwork) returns the path of the compressed
+# graph-tool file of the Netzschleuder network 'network' (with 'subnetwork'
+# equal to 'network' if it has no subnetworks) in the mirror, fetching it from
+# Netzschleuder first if it is missing or corrupt. The function raises an error
+# if the network cannot be served.
+def fetch_netzschleuder(network, subnetwork):
+    version = get_version(network)
+    if version is None:
+        raise RuntimeError("network " + network + " is neither in the mirror nor reachable")
+    path = get_netzschleuder_mirror_dir() + network + "/" + version + "/" + subnetwork + ".gt.zst"
+    if is_intact(path):
+        return path
+    if get_netzschleuder_offline():
+        raise RuntimeError("network " + network + "/" + subnetwork + " is missing or corrupt in the mirror")
+    if not download_file(netzschleuder_url + "/net/" + network + "/files/" + subnetwork + ".gt.zst", path):
+        raise RuntimeError("couldn't fetch network " + network + "/" + subnetwork)
+    digest = file_sha256(path)
+    atomic_write(path + ".sha256", lambda f: f.write(digest.encode()))
+    return path
+
+# load_netzschleuder(path) loads the compressed graph-tool file at 'path' in
+# the mirror as a graph-tool graph.
+def load_netzschleuder(path):
+    import io
+    import zstandard
+    from graph_tool import load_graph
+    with open(path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+        return load_graph(io.BytesIO(reader.read()), fmt="gt")
@@ -1,119 +1,264 @@
+import os
 import numpy as np
 
-# compute_robustness_score([['read_path'], 
-# ['write_path_static_attack', 'write_path_adaptive_attack', 'write_path_random'],
-# ['seed'], ['file_name'], ['data_dir']]) computes the static attack, adaptive
-# attack, and the random failure robustness scores of the network stored at
-# 'read_path' using the seed, 'seed'. The function returns a tuple containing
-# the name of the network along with the path to the location where it is
-# stored.
+# The largest number of source vertices from which the shortest paths are
+# counted to estimate the betweenness of the edges, and the number of adjacency
+# entries the searches from these sources may visit in total, such that the
+# estimate takes about two passes over a large graph (see edge_betweenness).
+betweenness_pivots = 64
+betweenness_budget = 1 << 24
+
+# graph_to_csr(graph) returns the compressed sparse row (CSR) representation of
+# the graph-tool graph 'graph' as two int64 arrays 'offsets' and 'neighbors',
+# where the neighbors of vertex v are 'neighbors[offsets[v]:offsets[v + 1]]'.
+# The neighbors of each vertex are listed in the same order as returned by
+# graph.get_out_neighbors(v), which keeps the randomized removal orders
+# computed on the CSR arrays identical to those computed on the graph itself.
+# The arrays are built from the edge list in bulk: graph-tool lists the edges
+# where v is the source before those where it is the target, each in the order
+# of graph.get_edges() for a graph as loaded from a file, which is kept by a
+# stable sort of both ends of the edges. The graph must therefore not have been
+# modified since it was loaded (see tests/test_baselines.py).
+def graph_to_csr(graph):
+    num_vertices = graph.num_vertices()
+    edges = graph.get_edges().astype(np.int64, copy=False)
+    ends = np.concatenate([edges[:, 0], edges[:, 1]])
+    offsets = np.zeros(num_vertices + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(ends, minlength=num_vertices))
+    neighbors = np.concatenate([edges[:, 1], edges[:, 0]])[np.argsort(ends, kind="stable")]
+    return offsets, neighbors
+
+# adaptive_targeted_attack(offsets, neighbors, rs) efficiently computes the
+# reverse removal order of the graph given by the CSR arrays 'offsets' and
+# 'neighbors' when vertices are removed based on adaptive targeted attacks. In
+# an adaptive targeted attack the vertex with the highest current degree is
+# being removed in each iteration. Ties are broken using the random generator
+# 'rs'. The work is done by a compiled bucket-queue kernel (see
+# engine/utils/kernels.py).
+def adaptive_targeted_attack(offsets, neighbors, rs):
+    from engine.utils.kernels import adaptive_targeted_attack_kernel
+    return adaptive_targeted_attack_kernel(np.asarray(offsets, dtype=np.int64),
+                                           np.asarray(neighbors, dtype=np.int64), rs)
+
+# batch_adaptive_attack(offsets, neighbors, batch_fraction, rs) computes the
+# reverse removal order of the graph given by the CSR arrays 'offsets' and
+# 'neighbors' under the batch-adaptive targeted attack, an approximation of the
+# adaptive targeted attack that removes the 'batch_fraction' of the remaining
+# vertices with the highest current degree per round, before updating the
+# degrees. Ties are broken using the random generator 'rs'. The work is done by
+# a compiled kernel (see engine/utils/kernels.py).
+def batch_adaptive_attack(offsets, neighbors, batch_fraction, rs):
+    from engine.utils.kernels import batch_adaptive_attack_kernel
+    return batch_adaptive_attack_kernel(np.asarray(offsets, dtype=np.int64),
+                                        np.asarray(neighbors, dtype=np.int64), float(batch_fraction), rs)
+
+# get_scores(offsets, neighbors, reverse_removal_orders) computes the
+# robustness scores of the graph given by the CSR arrays 'offsets' and
+# 'neighbors' corresponding to removing its vertices in each of the K reverse
+# removal orders in 'reverse_removal_orders'. The function returns the scores
+# in a K x 100 array where the cell (k, i) contains the robustness score
+# corresponding to when (i + 1)% of the vertices are removed from the graph in
+# the k-th order, i.e., the mean size of the largest connected component
+# (relative to n) over the first ceil((i + 1)% * n) removals. All orders are
+# scored by a single call to a compiled union-find kernel (see
+# engine/utils/kernels.py).
+def get_scores(offsets, neighbors, reverse_removal_orders):
+    from engine.utils.kernels import percolation_scores_kernel
+    reverse_removal_orders = np.atleast_2d(np.asarray(reverse_removal_orders, dtype=np.int64))
+    endpoints = np.ceil(np.linspace(0.01, 1, 100) * reverse_removal_orders.shape[1]).astype(np.int64)
+    return percolation_scores_kernel(np.asarray(offsets, dtype=np.int64), np.asarray(neighbors, dtype=np.int64),
+                                     reverse_removal_orders, endpoints)
+
+# edge_betweenness(offsets, neighbors, slot_edge, num_edges) estimates the
+# betweenness of the 'num_edges' edges of the graph given by the CSR arrays
+# 'offsets' and 'neighbors' from the shortest paths of between 2 and
+# 'betweenness_pivots' source vertices, as many as 'betweenness_budget' allows,
+# where 'slot_edge' maps each position of 'neighbors' to its edge (see
+# edge_list_kernel in engine/utils/kernels.py). The sources are drawn by a
+# random generator seeded with the size of the graph, such that the estimate
+# does not depend on the tie-breaking seeds, nor on which of them are scored
+# together (see batched_robustness_scores).
+def edge_betweenness(offsets, neighbors, slot_edge, num_edges):
+    from engine.utils.kernels import edge_betweenness_kernel
+    n = len(offsets) - 1
+    rs = np.random.default_rng([n, num_edges])
+    num_pivots = max(2, min(betweenness_pivots, betweenness_budget // max(len(neighbors), 1)))
+    pivots = rs.choice(n, size=min(num_pivots, n), replace=False).astype(np.int64)
+    return edge_betweenness_kernel(np.asarray(offsets, dtype=np.int64), np.asarray(neighbors, dtype=np.int64),
+                                   slot_edge, num_edges, pivots)
+
+# get_edge_scores(num_vertices, sources, targets, reverse_removal_orders)
+# computes the robustness scores of the graph with 'num_vertices' vertices and
+# the edges (sources[e], targets[e]) corresponding to removing its edges in
+# each of the K reverse removal orders in 'reverse_removal_orders'. The
+# function returns the scores in a K x 100 array as get_scores does, where the
+# cell (k, i) corresponds to when (i + 1)% of the edges are removed. All orders
+# are scored by a single call to a compiled union-find kernel (see
+# engine/utils/kernels.py).
+def get_edge_scores(num_vertices, sources, targets, reverse_removal_orders):
+    from engine.utils.kernels import edge_percolation_scores_kernel
+    reverse_removal_orders = np.atleast_2d(np.asarray(reverse_removal_orders, dtype=np.int64))
+    endpoints = np.ceil(np.linspace(0.01, 1, 100) * reverse_removal_orders.shape[1]).astype(np.int64)
+    return edge_percolation_scores_kernel(num_vertices, sources, targets, reverse_removal_orders, endpoints)
+
+# edge_strategy_arrays(offsets, neighbors) returns the parts of the edge
+# removal strategies of the graph given by the CSR arrays 'offsets' and
+# 'neighbors' that do not depend on the random generator: the endpoints
+# 'sources' and 'targets' of its edges (see edge_list_kernel in
+# engine/utils/kernels.py), the product of the degrees of the endpoints of each
+# edge and the order of the edges by increasing degree product, and the
+# estimated betweenness of each edge (see edge_betweenness) and the order of
+# the edges by increasing betweenness.
+def edge_strategy_arrays(offsets, neighbors):
+    from engine.utils.kernels import edge_list_kernel
+    degrees = np.diff(offsets)
+    sources, targets, slot_edge = edge_list_kernel(np.asarray(offsets, dtype=np.int64),
+                                                   np.asarray(neighbors, dtype=np.int64))
+    degree_products = degrees[sources] * degrees[targets]
+    betweenness = edge_betweenness(offsets, neighbors, slot_edge, len(sources))
+    return (sources, targets, degree_products, np.argsort(degree_products, kind="stable"), betweenness,
+            np.argsort(betweenness, kind="stable"))
+
+# load_scoring_arrays(path) returns the CSR arrays of the graph stored at
+# 'path' (see graph_to_csr), followed by the arrays returned by
+# edge_strategy_arrays if the edge removal strategies are scored (see
+# set_score_edges).
+def load_scoring_arrays(path):
+    from graph_tool import load_graph
+    from engine.config.config import get_score_edges
+    offsets, neighbors = graph_to_csr(load_graph(path))
+    if get_score_edges():
+        return (offsets, neighbors) + edge_strategy_arrays(offsets, neighbors)
+    return offsets, neighbors
+
+# robustness_scores(offsets, neighbors, rs) computes the static attack, adaptive
+# attack, random failure, and batch-adaptive attack robustness scores of the
+# graph given by the CSR arrays 'offsets' and 'neighbors' under vertex removal,
+# using the random generator 'rs' for tie-breaking and randomization. The batch
+# fraction of the batch-adaptive attack is set by set_batch_adaptive_fraction.
+# If the edge removal strategies are scored (see set_score_edges), its random
+# edge failure, degree-product edge attack, and betweenness edge attack
+# robustness scores under edge removal are computed as well. The edge attacks
+# remove the edges in the order of decreasing product of the degrees of their
+# endpoints, and of decreasing estimated betweenness (see edge_betweenness),
+# respectively. The function returns a 4 x 100 (or 7 x 100) array whose rows
+# correspond to the removal strategies, in the order listed above (see
+# get_strategies in engine/utils/store.py).
+def robustness_scores(offsets, neighbors, rs):
+    return batched_robustness_scores(offsets, neighbors, [rs])[0]
+
+# batched_robustness_scores(offsets, neighbors, generators, edge_arrays=None)
+# computes the robustness scores of the graph given by the CSR arrays 'offsets'
+# and 'neighbors' as robustness_scores does, once for each of the S random
+# generators in 'generators', e.g. to measure how much the scores depend on
+# how ties are broken. The degrees are computed once, and so are the arrays of
+# the edge removal strategies (see edge_strategy_arrays), unless they are given
+# as 'edge_arrays'. For each generator, the ties in the edge orders are then
+# broken at random in linear time (see shuffle_ties_kernel). The 4S vertex
+# removal orders and the 3S edge removal orders are scored by a single call to
+# the vertex and the edge union-find kernel, respectively. The function returns
+# an S x 4 x 100 (or S x 7 x 100) array, where the s-th entry is the result of
+# robustness_scores for the s-th generator.
+def batched_robustness_scores(offsets, neighbors, generators, edge_arrays=None):
+    from engine.config.config import get_batch_adaptive_fraction, get_score_edges
+    from engine.utils.kernels import shuffle_ties_kernel
+    n = len(offsets) - 1
+    degrees = np.diff(offsets)
+    if get_score_edges() and edge_arrays is None:
+        edge_arrays = edge_strategy_arrays(offsets, neighbors)
+    orders = []
+    edge_orders = []
+    for rs in generators:
+        # Compute the revered vertex removal orders under static and adaptive
+        # targeted attacks as well as random failures. The order under the
+        # batch-adaptive attack is computed last, such that the other orders
+        # do not depend on it.
+        reverse_static_attack_order = np.argsort(degrees + rs.random(n))
+        reverse_adaptive_attack_order = adaptive_targeted_attack(offsets, neighbors, rs)
+        reverse_random_order = rs.permutation(n)
+        reverse_batch_adaptive_order = batch_adaptive_attack(offsets, neighbors, get_batch_adaptive_fraction(), rs)
+        orders.extend([reverse_static_attack_order, reverse_adaptive_attack_order, reverse_random_order,
+                       reverse_batch_adaptive_order])
+        if not get_score_edges():
+            continue
+        # Compute the reversed edge removal orders under random edge failures
+        # and the edge attacks, breaking the ties of the sorted orders at
+        # random.
+        sources, targets, degree_products, degree_product_order, betweenness, betweenness_order = edge_arrays
+        reverse_random_edge_order = rs.permutation(len(sources))
+        reverse_degree_product_order = shuffle_ties_kernel(degree_product_order, degree_products, rs)
+        reverse_betweenness_order = shuffle_ties_kernel(betweenness_order, betweenness, rs)
+        edge_orders.extend([reverse_random_edge_order, reverse_degree_product_order, reverse_betweenness_order])
+    # Compute the robustness scores for all vertex orders and all edge orders
+    # in one pass each.
+    scores = get_scores(offsets, neighbors, orders).reshape(len(generators), 4, 100)
+    if not get_score_edges():
+        return scores
+    sources, targets = edge_arrays[0], edge_arrays[1]
+    return np.concatenate([scores, get_edge_scores(n, sources, targets, edge_orders).reshape(len(generators), 3, 100)],
+                          axis=1)
+
+# get_score_descriptor([read_path, write_paths, seed, file_name, data_dir])
+# returns the category, network, and subnetwork of the network whose scores
+# are written to 'write_paths', along with 'seed' and 'file_name', which
+# identify a task of compute_robustness_score.
+def get_score_descriptor(args):
+    write_paths, seed, file_name, data_dir = args[1], args[2], args[3], args[4]
+    return tuple(write_paths[0][len(data_dir):][:-len('/Robustness-Score-Data/static-targeted-attack/')].split(
+        "/")) + (seed, file_name)
+
+# compute_robustness_score_failure(args) returns the result of
+# compute_robustness_score(args) when it fails.
+def compute_robustness_score_failure(args):
+    return (1,) + get_score_descriptor(args)
+
+# compute_robustness_score([['read_path'], ['write_path_static_attack', ...],
+# ['seed'], ['file_name'], ['data_dir']]) computes the robustness scores of the
+# network stored at 'read_path' under all removal strategies (see
+# robustness_scores) using the seed, 'seed', and writes the scores of each
+# strategy to its write path, in the order of get_strategies() in
+# engine/utils/store.py. If 'seed' is a tuple of S seeds (e.g. for the
+# tie-breaking of an empirical network), the scores are computed once per seed
+# (see batched_robustness_scores) and written as S x 100 arrays. The function
+# returns a tuple containing the name of the network along with the path to
+# the location where it is stored.
 #
 # noinspection PyArgumentList
 def compute_robustness_score(args):
     from graph_tool import load_graph
-    from graph_tool.topology import vertex_percolation
-    read_path, write_path_static_attack, write_path_adaptive_attack, write_path_random, seed, file_name, data_dir = \
-    args[0], args[1][0], args[1][1], args[1][2], args[2], args[3], args[4]
-
-    # get_scores(graph, reverse_removal_order) computes the robustness scores
-    # corresponding to removing the vertices of 'graph' in the order of
-    # 'reverse_removal_order'. The function returns the scores in an array of
-    # length 100 where the i-th cell contains the the robustness score
-    # corresponding to when i% of the vertices are removed from the graph. 
-    def get_scores(graph, reverse_removal_order):
-        n_ = len(reverse_removal_order)
-        res = np.concatenate((vertex_percolation(graph, reverse_removal_order)[0][::-1][1:], [0])) / n_
-        endpoints = [int(np.ceil(alpha * n_)) for alpha in np.linspace(0.01, 1, 100)]
-        return [np.mean(res[:end]) for end in endpoints]
-
-    # adaptive_targeted_attack(graph, random) efficiently computes the reverse
-    # removal order of the graph, 'graph', when vertices are removed based on
-    # adaptive targeted attacks. In an adaptive targeted attack the vertex with
-    # the highest current degree is being removed in each iteration.
-    def adaptive_targeted_attack(graph, random):
-        num_vertices = graph.num_vertices()
-        bins = []
-        pos, deg = [0] * num_vertices, [0] * num_vertices
-        for i in random.permutation(num_vertices):
-            v = graph.vertex(i)
-            k = v.out_degree()
-            while k >= len(bins):
-                bins.append([])
-            bins[k].append(i)
-            pos[i], deg[i] = len(bins[k]) - 1, k
-        max_deg = len(bins) - 1
-        removal_order = []
-        for k in range(max_deg, -1, -1):
-            while len(bins[k]) != 0:
-                v = bins[k].pop()
-                neighbors_v = graph.get_out_neighbors(v)
-                random.shuffle(neighbors_v)
-                for u in neighbors_v:
-                    if deg[u] > 0:
-                        bin_u, pos_u = deg[u], pos[u]
-                        pos[bins[bin_u][-1]] = pos_u
-                        bins[bin_u][pos_u], bins[bin_u][-1] = bins[bin_u][-1], bins[bin_u][pos_u]
-                        bins[bin_u].pop()
-                        bins[bin_u - 1].append(u)
-                        pos[u] = len(bins[bin_u - 1]) - 1
-                        deg[u] -= 1
-                deg[v] = 0
-                removal_order.append(v)
-        return removal_order[::-1]
+    from engine.utils.io import atomic_write
+    read_path, write_paths, seed, file_name, data_dir = args[0], args[1], args[2], args[3], args[4]
 
     try:
-        # Load the graph, set n to be the number of its vertices, and fix rs to
-        # be the random state.
-        g = load_graph(read_path)
-        n = g.num_vertices()
-        rs = np.random.default_rng(seed)
-        # Compute the revered vertex removal orders under static and adaptive
-        # targeted attacks as well as random failures.
-        reverse_static_attack_order = np.argsort(g.get_out_degrees(np.arange(n)) + rs.random(n))
-        reverse_adaptive_attack_order = adaptive_targeted_attack(g, rs)
-        reverse_random_order = rs.permutation(n)
+        # Load the graph, and compute its robustness scores with the random
+        # state fixed by 'seed'.
+        csr = graph_to_csr(load_graph(read_path))
+        if isinstance(seed, tuple):
+            scores = batched_robustness_scores(*csr, [np.random.default_rng(s) for s in seed]).swapaxes(0, 1)
+        else:
+            scores = robustness_scores(*csr, np.random.default_rng(seed))
         # Write the computed robustness scores in the corresponding NumPy files.
-        np.save(write_path_static_attack + str(file_name) + ".npy", get_scores(g, reverse_static_attack_order))
-        np.save(write_path_adaptive_attack + str(file_name) + ".npy", get_scores(g, reverse_adaptive_attack_order))
-        np.save(write_path_random + str(file_name) + ".npy", get_scores(g, reverse_random_order))
-        return (0,) + tuple(
-            write_path_static_attack[len(data_dir):][:-len('/Robustness-Score-Data/static-targeted-attack/')].split("/")
-            ) + (seed, file_name)
+        for write_path, score in zip(write_paths, scores):
+            atomic_write(write_path + str(file_name) + ".npy", lambda f: np.save(f, score))
+        return (0,) + get_score_descriptor(args)
 
     except (Exception,):
-        return (1,) + tuple(
-            write_path_static_attack[len(data_dir):][:-len('/Robustness-Score-Data/static-targeted-attack/')].split("/")
-            ) + (seed, file_name)
-
-# fast_gnm([data_dir, net_dir, n, m, seed]) uses a vectorized implementation to
-# efficiently generate random networks that are size-matching to 'n' and 'm',
-# using 'seed'. If the generated network has a connected component of at least
-# 0.96*'n', it is stored in 'net_dir'. If not, the function retries until it has
-# either generated 100 insufficient graphs or until it generates one sufficient
-# graph. The implementation is based on:
-# https://doi.org/10.1103/PhysRevE.71.036113. 
-def fast_gnm(args):
+        return compute_robustness_score_failure(args)
+
+# generate_gnm(n, m, rs) generates a random network that is size-matching to
+# 'n' and 'm', using the random generator 'rs', as a graph-tool graph. If the
+# generated network has a connected component of at least 0.96*'n', its
+# largest connected component is returned. If not, the function retries until
+# it has either generated 100 insufficient graphs, in which case it returns
+# None, or until it generates one sufficient graph. The edges are sampled by the
+# compiled generator in engine/utils/generation.py. This graph-tool based path
+# is kept as a fallback for when the random graphs are written to disk; the
+# fused path uses generate_gnm_csr(n, m, rs) instead. The implementation is
+# based on: https://doi.org/10.1103/PhysRevE.71.036113.
+def generate_gnm(n, m, rs):
     from graph_tool import Graph
     from graph_tool.topology import extract_largest_component
-    from numba import guvectorize, int64
-    # The following takes a vector of size m in which elements are chosen
-    # randomly without repetition in the range from 0 to 0.5*n*(n-1), and
-    # transforms it to an edgelist of a random network with n vertices and m
-    # edges. This is fast for larger networks given the vectorization by Numba.
-    # This method of generating random networks is based on the equation on the
-    # bottom left of page 036113-3 in
-    # https://doi.org/10.1103/PhysRevE.71.036113. 
-    @guvectorize([(int64[:], int64[:], int64[:, :])], '(n), (m) -> (n, m)')
-    def transform(x, _, res):
-        for i in range(x.shape[0]):
-            res[i, 0] = int(1 + np.floor(-0.5 + np.sqrt(0.25 + (2 * x[i]))))
-            res[i, 1] = int(x[i] - (res[i, 0] * (res[i, 0] - 1) / 2))
-
-    # Get the dataset's directory, directory to write the random network, number
-    # of vertices (n), number of edges (m), and the random seed.
-    data_dir, net_dir, n, m, seed = args[0], args[1], args[2], args[3], args[4]
-    # Set the random number generator.
-    rs = np.random.default_rng(seed)
+    from engine.utils.generation import sample_gnm_edges
     # We attempt at most 100 times to generate a random network with the desired
     # properties.
     num_attempts = 0
@@ -122,13 +267,116 @@ def fast_gnm(args):
         #  largest connected component contains at least 96% of the vertices.
         g = Graph(directed=False)
         g.add_vertex(n)
-        g.add_edge_list(transform(rs.choice(int((n * (n - 1)) / 2), size=m, replace=False) + 1, [0, 0]))
+        g.add_edge_list(np.column_stack(sample_gnm_edges(n, m, rs)))
         g = extract_largest_component(g, directed=False, prune=True)
         if g.num_vertices() / n >= 0.96:
-            g.save(net_dir + str(seed) + ".gt", fmt="gt")
-            return (0,) + tuple(args[1][len(data_dir):][:-len('/Graph-Data/random-nets/')].split("/")) + (
-                args[2], args[3], args[4],)
+            return g
         else:
             num_attempts += 1
-    return (1,) + tuple(args[1][len(data_dir):][:-len('/Graph-Data/random-nets/')].split("/")) + (
-        args[2], args[3], args[4],)
+    return None
+
+# get_gnm_descriptor([data_dir, net_dir, n, m, seed]) returns the category,
+# network, and subnetwork of the network whose random graphs are stored in
+# 'net_dir', along with 'n', 'm', and 'seed', which identify a task of
+# fast_gnm.
+def get_gnm_descriptor(args):
+    data_dir, net_dir = args[0], args[1]
+    return tuple(net_dir[len(data_dir):][:-len('/Graph-Data/random-nets/')].split("/")) + (args[2], args[3], args[4],)
+
+# fast_gnm_failure(args) returns the result of fast_gnm(args) when it fails.
+def fast_gnm_failure(args):
+    return (1,) + get_gnm_descriptor(args)
+
+# fast_gnm([data_dir, net_dir, n, m, seed]) generates a random network that is
+# size-matching to 'n' and 'm' using 'seed' (see generate_gnm), and stores it
+# in 'net_dir'. The function returns a tuple containing the name of the
+# network along with the parameters of the random network.
+def fast_gnm(args):
+    from engine.utils.io import atomic_write
+    # Get the dataset's directory, directory to write the random network, number
+    # of vertices (n), number of edges (m), and the random seed.
+    data_dir, net_dir, n, m, seed = args[0], args[1], args[2], args[3], args[4]
+    g = generate_gnm(n, m, np.random.default_rng(seed))
+    if g is not None:
+        atomic_write(net_dir + str(seed) + ".gt", lambda f: g.save(f, fmt="gt"))
+        return (0,) + get_gnm_descriptor(args)
+    return fast_gnm_failure(args)
+
+# fused_robustness_score_failure([data_dir, category, network, subnetwork, n,
+# m, generation_seed, scoring_seed, index]) returns the result of
+# fused_robustness_score(args) when it fails.
+def fused_robustness_score_failure(args):
+    data_dir, category, network, subnetwork, n, m, generation_seed, scoring_seed, index = args
+    return (1, category, network, subnetwork, generation_seed, scoring_seed, index, None)
+
+# fused_robustness_score([data_dir, category, network, subnetwork, n, m,
+# generation_seed, scoring_seed, index]) computes the robustness scores of a
+# network without writing anything to disk. If 'index' is 0, the preprocessed
+# empirical network is loaded, and scored once for each of the seeds in the
+# tuple 'scoring_seed' (see batched_robustness_scores). Otherwise, a size-matching random network with
+# 'n' vertices and 'm' edges is generated in memory as CSR arrays using
+# 'generation_seed' (see generate_gnm_csr). An empirical network whose seeds are
+# split among several tasks is kept in the shared memory of the node (see
+# engine/utils/shared.py), along with the arrays of its edge removal strategies
+# (see load_scoring_arrays). In both cases, the network is scored against all
+# removal strategies using 'scoring_seed' (see robustness_scores). The
+# function returns a tuple containing a status flag (0 on success, 1 on
+# failure), the name of the network, the seeds, the index, and the array of
+# scores (see robustness_scores), or the array of scores for each of the seeds
+# of an empirical network (None on failure).
+def fused_robustness_score(args):
+    from engine.utils.generation import generate_gnm_csr
+    from engine.utils.shared import shared_csr
+    data_dir, category, network, subnetwork, n, m, generation_seed, scoring_seed, index = args
+    descriptor = (category, network, subnetwork, generation_seed, scoring_seed, index)
+    try:
+        if index == 0:
+            path = os.path.join(data_dir + category, network, subnetwork, "Graph-Data", "preprocessed",
+                                subnetwork + ".gt")
+            with shared_csr(data_dir, path, load_scoring_arrays) as arrays:
+                return (0,) + descriptor + (batched_robustness_scores(
+                    arrays[0], arrays[1], [np.random.default_rng(seed) for seed in scoring_seed],
+                    arrays[2:] if len(arrays) > 2 else None),)
+        csr = generate_gnm_csr(n, m, np.random.default_rng(generation_seed))
+        if csr is None:
+            return fused_robustness_score_failure(args)
+        return (0,) + descriptor + (robustness_scores(*csr, np.random.default_rng(scoring_seed)),)
+    except (Exception,):
+        return fused_robustness_score_failure(args)
+
+# batch_adaptive_accuracy([data_dir, category, network, subnetwork,
+# batch_fractions, seed]) compares the batch-adaptive attack to the exact
+# adaptive targeted attack on the preprocessed network. For the exact attack
+# and for the batch-adaptive attack with each of the batch fractions in
+# 'batch_fractions', the removal order is computed using 'seed' and timed, and
+# the scores are computed (see get_scores). The function returns a tuple
+# containing a status flag (0 on success, 1 on failure), the name of the
+# network, its number of vertices and edges, and a list with a tuple for each
+# batch fraction holding: the batch fraction, the time of the exact and of the
+# batch-adaptive attack in seconds, and the largest and the mean absolute
+# difference between their scores (None on failure).
+def batch_adaptive_accuracy(args):
+    import time
+    from graph_tool import load_graph
+    data_dir, category, network, subnetwork, batch_fractions, seed = args
+    try:
+        offsets, neighbors = graph_to_csr(load_graph(os.path.join(data_dir + category, network, subnetwork,
+                                                                  "Graph-Data", "preprocessed", subnetwork + ".gt")))
+        # Load the compiled kernels before timing them.
+        warm_up = (np.array([0, 1, 2], dtype=np.int64), np.array([1, 0], dtype=np.int64))
+        adaptive_targeted_attack(*warm_up, np.random.default_rng(seed))
+        batch_adaptive_attack(*warm_up, 0.5, np.random.default_rng(seed))
+        start = time.perf_counter()
+        exact_order = adaptive_targeted_attack(offsets, neighbors, np.random.default_rng(seed))
+        exact_time = time.perf_counter() - start
+        exact_scores = get_scores(offsets, neighbors, [exact_order])[0]
+        rows = []
+        for batch_fraction in batch_fractions:
+            start = time.perf_counter()
+            batch_order = batch_adaptive_attack(offsets, neighbors, batch_fraction, np.random.default_rng(seed))
+            batch_time = time.perf_counter() - start
+            error = np.abs(get_scores(offsets, neighbors, [batch_order])[0] - exact_scores)
+            rows.append((batch_fraction, exact_time, batch_time, float(error.max()), float(error.mean())))
+        return (0, category, network, subnetwork, len(offsets) - 1, len(neighbors) // 2, rows)
+    except (Exception,):
+        return (1, category, network, subnetwork, None, None, None)
@@ -0,0 +1,63 @@
+import io
+import itertools
+import numpy as np
+
+# This module parses the edge lists of the collected networks. Edge lists are
+# read in chunks of lines, of which only the first two columns (the endpoints
+# of the edges) are parsed by the C parser of pandas, such that only the
+# resulting array and a single chunk of text are held in memory.
+
+# read_chunks(f, chunk_lines, stop=None) yields the lines of the text file
+# object 'f' in lists of at most 'chunk_lines' lines. If 'stop' is not None,
+# the lines are read up to (and excluding) the first line starting with 'stop'.
+def read_chunks(f, chunk_lines, stop=None):
+    while True:
+        lines = list(itertools.islice(f, chunk_lines))
+        if len(lines) == 0:
+            return
+        if stop is not None:
+            for i in range(len(lines)):
+                if lines[i].startswith(stop):
+                    if i > 0:
+                        yield lines[:i]
+                    return
+        yield lines
+
+# parse_chunk(lines, delimiter, comments, dtype) parses the first two columns
+# of the list of lines 'lines' as an array with two columns of type 'dtype'.
+def parse_chunk(lines, delimiter, comments, dtype):
+    import pandas as pd
+    try:
+        df = pd.read_csv(io.StringIO("".join(lines)), sep=r"\s+" if delimiter is None else delimiter, header=None,
+                         usecols=[0, 1], comment=comments, dtype=str if dtype is str else dtype)
+    except pd.errors.EmptyDataError:
+        return np.empty((0, 2), dtype=object if dtype is str else dtype)
+    return df.to_numpy(dtype=object if dtype is str else dtype)
+
+# read_edges(f, delimiter=None, comments="%", skip_header=0, stop=None,
+# dtype=np.int64, chunk_lines=1 << 20) reads the first two columns of the edge
+# list in the text file object 'f' as an array with two columns of type 'dtype'
+# (int64 by default, or str for edge lists with named vertices). The columns
+# are separated by 'delimiter' (whitespace if None), everything following
+# 'comments' on a line is ignored, and the first 'skip_header' lines are
+# skipped. If 'stop' is not None, the edge list ends before the first line
+# starting with 'stop'. The file is parsed in chunks of 'chunk_lines' lines.
+def read_edges(f, delimiter=None, comments="%", skip_header=0, stop=None, dtype=np.int64, chunk_lines=1 << 20):
+    for _ in range(skip_header):
+        next(f, None)
+    chunks = [parse_chunk(lines, delimiter, comments, dtype) for lines in read_chunks(f, chunk_lines, stop)]
+    chunks = [chunk for chunk in chunks if len(chunk) > 0]
+    if len(chunks) == 0:
+        return np.empty((0, 2), dtype=object if dtype is str else dtype)
+    return np.concatenate(chunks)
+
+# read_pajek_edges(f, dtype=np.int64, chunk_lines=1 << 20) reads the edge list
+# of the Pajek file in the text file object 'f', i.e. the lines following the
+# first "*Edges" line up to the next line starting with "*", in a single pass
+# over the file (see read_edges). Other sections, e.g. an empty "*Arcs" section
+# before the edges, are skipped.
+def read_pajek_edges(f, dtype=np.int64, chunk_lines=1 << 20):
+    for line in f:
+        if line.lower().startswith("*edges"):
+            return read_edges(f, comments="%", stop="*", dtype=dtype, chunk_lines=chunk_lines)
+    return np.empty((0, 2), dtype=object if dtype is str else dtype)
@@ -0,0 +1,82 @@
+import time
+
+# This module schedules the collection of the networks as a pipeline. A job
+# is a pair (stages, arg) where 'stages' is a list of (name, kind, func)
+# tuples and 'arg' is the argument of the first stage. Network-bound stages
+# (kind "io") run on a thread pool and CPU-bound stages (kind "cpu") on an
+# executor of one of the backends in engine/utils/executor.py, e.g. a local
+# process pool. The output of a stage is passed to the next stage as soon as it
+# is ready, such that e.g. a network is converted while others are still being
+# downloaded. A stage may return None to drop the item, a list to fan out into
+# one item per element (e.g. one per network in an archive), or any other
+# value to pass it on as is. The outputs of the last stages are the results.
+
+# timed_call(func, arg) calls 'func' on 'arg' and returns its result along with
+# the times at which the call started and ended.
+def timed_call(func, arg):
+    start = time.time()
+    res = func(arg)
+    return res, start, time.time()
+
+# print_stage_report(stats) prints for every stage in 'stats' the number of
+# items completed and failed, the total time spent in the stage summed over
+# all items, and the wall-clock time between its first start and last end.
+def print_stage_report(stats):
+    print("stage".ljust(24) + "kind".ljust(6) + "done".rjust(8) + "failed".rjust(8) + "busy (s)".rjust(12) +
+          "wall (s)".rjust(12))
+    for name, (kind, done, failed, busy, first, last) in stats.items():
+        wall = last - first if done > 0 else 0.0
+        print(name.ljust(24) + kind.ljust(6) + str(done).rjust(8) + str(failed).rjust(8) +
+              ("%.1f" % busy).rjust(12) + ("%.1f" % wall).rjust(12))
+
+# run_pipeline(jobs, io_workers, cpu_executor, desc) runs the jobs 'jobs' (see
+# above) on a thread pool of 'io_workers' threads and the executor
+# 'cpu_executor', showing a progress bar described by 'desc', and prints a
+# report on the stages once all jobs are done. Items whose stage raises an
+# exception are dropped and counted as failed. The function returns the list of
+# results, ordered by the jobs they originate from.
+def run_pipeline(jobs, io_workers, cpu_executor, desc):
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    from tqdm import tqdm
+    stats = {}
+    pending = {}
+    results = []
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool, tqdm(total=0, desc=desc) as bar:
+
+        # submit(stages, depth, key, arg) submits the stage at position 'depth'
+        # of 'stages' on 'arg', where 'key' orders the results.
+        def submit(stages, depth, key, arg):
+            name, kind, func = stages[depth]
+            pool = io_pool if kind == "io" else cpu_executor
+            pending[pool.submit(timed_call, func, arg)] = (stages, depth, key)
+            stats.setdefault(name, [kind, 0, 0, 0.0, float("inf"), float("-inf")])
+            bar.total += 1
+            bar.refresh()
+
+        for i, (stages, arg) in enumerate(jobs):
+            submit(stages, 0, (i,), arg)
+        while len(pending) > 0:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stages, depth, key = pending.pop(future)
+                stat = stats[stages[depth][0]]
+                try:
+                    res, start, end = future.result()
+                except Exception as exc:
+                    stat[2] += 1
+                    print("stage " + stages[depth][0] + " failed: " + repr(exc))
+                    bar.update(1)
+                    continue
+                stat[1] += 1
+                stat[3] += end - start
+                stat[4] = min(stat[4], start)
+                stat[5] = max(stat[5], end)
+                outputs = [] if res is None else res if isinstance(res, list) else [res]
+                for j, output in enumerate(outputs):
+                    if depth + 1 == len(stages):
+                        results.append((key + (j,), output))
+                    else:
+                        submit(stages, depth + 1, key + (j,), output)
+                bar.update(1)
+    print_stage_report(stats)
+    return [output for (_, output) in sorted(results, key=lambda x: x[0])]
@@ -0,0 +1,260 @@
+import math
+import os
+import time
+from engine.config.config import *
+
+# This module schedules the tasks of a stage on the engines by their estimated
+# cost. Tasks are dispatched largest first (longest-processing-time-first), so
+# that the largest graphs do not start last and leave the other engines idle,
+# and tasks much smaller than the average share of an engine are batched into
+# chunks, so that small graphs (e.g. the Facebook100 schools) do not cost a
+# message round-trip each. The achieved load balance of each stage is reported.
+# Moreover, the memory each task needs is estimated, and tasks are only
+# admitted while the estimated memory of the tasks in flight fits the memory
+# budget of a node (see set_memory_budget), such that large graphs are held
+# back while small ones keep flowing. The backends place each task on any free
+# engine, on whichever node, but every engine runs one task at a time. Hence,
+# no node holds more than the largest tasks in flight, one per engine of the
+# node, and tasks are admitted while these fit the budget of a node (see
+# fits_memory_budget). The peak memory of every task is measured, and the
+# estimates are calibrated with it for the next runs.
+
+# The relative cost per vertex and per edge of computing the scores of a graph
+# under each removal strategy for one seed, of preparing the edge removal
+# strategies once per graph, and of generating a size-matching random graph.
+# Apart from the sorting of the vertices by degree for the static targeted
+# attack, all steps per seed are linear in the number of vertices and edges.
+# The preparation sorts the edges by degree product and by betweenness, which
+# is estimated by breadth-first searches from a few sources, about two passes
+# over a large graph.
+strategy_costs = {"static-targeted-attack": (1.0, 1.0),
+                  "adaptive-targeted-attack": (2.0, 2.0),
+                  "random-failure": (1.0, 1.0),
+                  "batch-adaptive-targeted-attack": (1.0, 1.0),
+                  "random-edge-failure": (0.5, 0.5),
+                  "degree-product-edge-attack": (0.5, 0.5),
+                  "betweenness-edge-attack": (0.5, 0.5)}
+edge_preparation_cost = (1.0, 3.0)
+generation_cost = (1.0, 2.0)
+
+# The memory in bytes of a worker before it loads a graph, and the memory in
+# bytes per vertex and per edge that each stage needs, before calibration. For
+# the preprocessing, the number of edges is estimated from the file size.
+memory_base = 256 * 2 ** 20
+memory_models = {"preprocessing": (64.0, 96.0),
+                 "random_network_generation": (64.0, 96.0),
+                 "compute_robustness_score": (192.0, 256.0)}
+
+# The number of chunks per engine that the smallest tasks are batched into, at
+# least.
+chunks_per_engine = 20
+
+# The fixed memory and the factor by which the memory per vertex and per edge
+# is scaled of each stage, once loaded from the result cache (see
+# get_memory_calibration).
+memory_calibration = None
+
+# estimate_cost(n, m, strategies, generate=False, num_seeds=1) returns the
+# estimated cost of computing the scores of a graph with 'n' vertices and 'm'
+# edges under the removal strategies 'strategies' for 'num_seeds' seeds, after
+# generating it first if 'generate' is True. The edge removal strategies are
+# prepared once for all seeds. The cost is in arbitrary units and only meant
+# to compare tasks.
+def estimate_cost(n, m, strategies, generate=False, num_seeds=1):
+    from engine.utils.store import edge_strategies
+    cost = 0.0
+    for strategy in strategies:
+        per_vertex, per_edge = strategy_costs[strategy]
+        cost += per_vertex * n + per_edge * m
+        if strategy == "static-targeted-attack":
+            cost += n * math.log2(n + 1)
+    cost *= num_seeds
+    if any(strategy in edge_strategies for strategy in strategies):
+        cost += edge_preparation_cost[0] * n + edge_preparation_cost[1] * m + 2 * m * math.log2(m + 1)
+    if generate:
+        cost += generation_cost[0] * n + generation_cost[1] * m
+    return cost
+
+# split_seeds(seeds, cost, limit) splits the tie-breaking seeds 'seeds' of an
+# empirical network, whose scores under all of them have the estimated cost
+# 'cost', into groups of consecutive seeds, each scored by one task. The seeds
+# are split into as few groups as keep the cost of each group under 'limit'
+# (e.g. the average cost per engine of the stage, which a larger task would
+# exceed on its own), but at most one group per seed. The function returns the
+# groups as a list of tuples.
+def split_seeds(seeds, cost, limit):
+    num_groups = min(len(seeds), max(1, math.ceil(cost / limit))) if limit > 0 else 1
+    bounds = [len(seeds) * k // num_groups for k in range(num_groups + 1)]
+    return [tuple(seeds[bounds[k]:bounds[k + 1]]) for k in range(num_groups)]
+
+# plan_chunks(tasks, costs, num_engines) splits the tasks 'tasks' with the
+# estimated costs 'costs' into chunks to be dispatched in order. The tasks are
+# sorted by decreasing cost, and consecutive tasks are batched into a chunk until
+# its cost reaches 1 / 'chunks_per_engine' of the average cost per engine, such
+# that large tasks form a chunk on their own. The function returns the list of
+# chunks, each a list of tasks, along with the estimated cost of each chunk.
+def plan_chunks(tasks, costs, num_engines):
+    order = sorted(range(len(tasks)), key=lambda i: -costs[i])
+    threshold = sum(costs) / (max(num_engines, 1) * chunks_per_engine)
+    chunks, chunk_costs = [], []
+    chunk, chunk_cost = [], 0.0
+    for i in order:
+        chunk.append(tasks[i])
+        chunk_cost += costs[i]
+        if chunk_cost >= threshold:
+            chunks.append(chunk)
+            chunk_costs.append(chunk_cost)
+            chunk, chunk_cost = [], 0.0
+    if len(chunk) > 0:
+        chunks.append(chunk)
+        chunk_costs.append(chunk_cost)
+    return chunks, chunk_costs
+
+# get_memory_calibration() returns a dictionary mapping each stage to the
+# fixed memory in bytes of its tasks and the factor by which their memory per
+# vertex and per edge is scaled, as calibrated in previous runs (see
+# calibrate_memory). It is kept in the result cache, and only read from there
+# on the first call.
+def get_memory_calibration():
+    global memory_calibration
+    from engine.utils.cache import cache_key, cache_load
+    if memory_calibration is None:
+        calibration = cache_load(cache_key("memory_calibration", "fixed", "scale"))
+        memory_calibration = {} if calibration is None else calibration
+    return memory_calibration
+
+# estimate_memory(stage, n, m) returns the estimated peak memory in bytes of a
+# task of the stage 'stage' on a graph with 'n' vertices and 'm' edges.
+def estimate_memory(stage, n, m):
+    per_vertex, per_edge = memory_models[stage]
+    fixed, scale = get_memory_calibration().get(stage, (memory_base, 1.0))
+    return fixed + scale * (per_vertex * n + per_edge * m)
+
+# calibrate_memory(stage, estimates, peaks) updates the fixed memory and the
+# scale of the memory estimates of the stage 'stage' (see estimate_memory),
+# given the estimates 'estimates' made for its tasks and their measured peak
+# memory 'peaks'. The memory of each task that depends on the size of its
+# graph is recovered from its estimate. The scale is the slope of the least
+# squares fit of the peaks to it, within [0.25, 16], and kept as it is if the
+# sizes of the graphs do not vary enough to fit it. The fixed memory is then
+# raised or lowered such that no task was underestimated. As the two are fitted
+# separately, the interpreter and libraries that dominate the peaks of small
+# tasks only add to the fixed memory, instead of scaling the estimates of large
+# graphs.
+def calibrate_memory(stage, estimates, peaks):
+    import numpy as np
+    from engine.utils.cache import cache_key, cache_store
+    calibration = get_memory_calibration()
+    fixed, scale = calibration.get(stage, (memory_base, 1.0))
+    pairs = [((estimate - fixed) / scale, peak) for (estimate, peak) in zip(estimates, peaks) if peak is not None]
+    if len(pairs) == 0:
+        return
+    sizes, peaks = np.array(pairs, dtype=np.float64).T
+    if sizes.max() > 2 * sizes.min() + 1:
+        scale = min(max(float(np.polyfit(sizes, peaks, 1)[0]), 0.25), 16.0)
+    fixed = max(float(np.max(peaks - scale * sizes)), 0.0)
+    calibration[stage] = (fixed, scale)
+    cache_store(cache_key("memory_calibration", "fixed", "scale"), calibration)
+
+# get_memory_budget_bytes() returns the memory budget in bytes of a node for
+# the tasks in flight on it, as set by set_memory_budget (by default 80% of the
+# physical memory of the node running the controller).
+def get_memory_budget_bytes():
+    budget = get_memory_budget()
+    if budget is None:
+        budget = 0.8 * os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    return budget
+
+# get_engines_per_node() returns the largest number of engines that run on a
+# single node: all engines for the local backends, and the engines spread over
+# the nodes of the SLURM allocation (SLURM_NNODES) for the ipyparallel and MPI
+# backends.
+def get_engines_per_node():
+    num_nodes = 1
+    if get_backend() in ["ipyparallel", "mpi"]:
+        num_nodes = int(os.environ.get("SLURM_NNODES", 1))
+    return max(1, math.ceil(get_num_engines() / max(num_nodes, 1)))
+
+# fits_memory_budget(in_flight, memory, budget, engines_per_node) returns
+# whether a task with the estimated memory 'memory' can be admitted next to
+# the tasks in flight with the estimated memory 'in_flight' (a list sorted in
+# decreasing order), given the memory budget 'budget' of a node on which
+# 'engines_per_node' engines run one task at a time. Wherever the tasks are
+# placed, a node holds at most the 'engines_per_node' largest of them, so the
+# budget holds for every node as long as these fit, while the engines of
+# several nodes take small tasks next to each other.
+def fits_memory_budget(in_flight, memory, budget, engines_per_node):
+    largest = sorted(in_flight[:engines_per_node] + [memory], reverse=True)[:engines_per_node]
+    return sum(largest) <= budget
+
+# reset_peak_rss() resets the peak resident memory of the calling process, and
+# returns whether this is supported (on Linux).
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+# read_peak_rss() returns the peak resident memory in bytes of the calling
+# process since the last call of reset_peak_rss(), or None if it is unknown.
+def read_peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+# failed_task(task) returns the result (1,) + task of the task with the
+# arguments 'task' that failed, used for stages whose functions report their
+# failures in that shape.
+def failed_task(task):
+    return (1,) + tuple(task)
+
+# run_chunk(func, chunk, failure=failed_task) applies 'func' to each of the
+# arguments in 'chunk' on an engine. A task that raises an exception gets the
+# result failure(task), which matches the failures reported by 'func'. The
+# function returns the list of results, the identifier of the engine's
+# process, the times at which the chunk started and ended, and the list of the
+# peak resident memory of each task (None where it cannot be measured).
+def run_chunk(func, chunk, failure=failed_task):
+    import socket
+    start = time.time()
+    results = []
+    peaks = []
+    for task in chunk:
+        can_measure = reset_peak_rss()
+        try:
+            results.append(func(task))
+        except (Exception,):
+            results.append(failure(task))
+        peaks.append(read_peak_rss() if can_measure else None)
+    return results, socket.gethostname() + ":" + str(os.getpid()), start, time.time(), peaks
+
+# report_load_balance(name, timings, num_engines, num_tasks, num_chunks)
+# reports the load balance achieved by the stage 'name', given the timings
+# 'timings' of its chunks as (worker, start, end) tuples. The report holds the
+# makespan of the stage, the time the engines were busy, and the efficiency,
+# i.e. the busy time divided by the number of engines times the makespan. It is
+# printed and appended to "load_balance.log" in the log directory.
+def report_load_balance(name, timings, num_engines, num_tasks, num_chunks):
+    if len(timings) == 0:
+        return
+    busy = {}
+    for (worker, start, end) in timings:
+        busy[worker] = busy.get(worker, 0.0) + end - start
+    makespan = max(end for (_, _, end) in timings) - min(start for (_, start, _) in timings)
+    total = sum(busy.values())
+    efficiency = total / (max(num_engines, len(busy)) * makespan) if makespan > 0 else 1.0
+    report = (name + ": " + str(num_tasks) + " tasks in " + str(num_chunks) + " chunks, makespan %.1f s, busy %.1f s "
+              "(max %.1f s, mean %.1f s over %d engines), efficiency %.1f%%") % (
+        makespan, total, max(busy.values()), total / len(busy), len(busy), 100 * efficiency)
+    print(report)
+    os.makedirs(get_log_dir(), exist_ok=True)
+    with open(get_log_dir() + "load_balance.log", "a") as f:
+        f.write(report + "\n")
+
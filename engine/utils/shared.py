@@ -0,0 +1,152 @@
+import fcntl
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+import numpy as np
+from engine.config.config import *
+
+# This module implements a node-local store of graphs in shared memory, such
+# that the tasks scoring the same graph (e.g. under several tie-breaking seeds)
+# do not each parse it and hold a copy of it. The CSR arrays of a graph (see
+# graph_to_csr in engine/utils/network.py), along with the arrays derived from
+# them that all of its tasks need, are written once per node to
+# get_shared_graph_dir() (by default /dev/shm), and the tasks on that node map
+# them read-only. Before a stage, the controller registers the number of tasks
+# that use each graph (see register_shared_graphs) in the dataset's directory,
+# which is shared by the nodes. Every task that is done with a graph
+# decrements this number, and the CSR arrays of a graph are evicted from a node
+# once no task on the node has them attached and all of its tasks are done.
+# What is left once the stage has completed, e.g. by tasks that were killed, is
+# removed from every node (see clear_shared_graphs). Graphs that were not
+# registered are loaded by each task on its own.
+
+# locked(path) is a context manager that holds an exclusive lock on the file
+# 'path' while it is active, creating the file if it does not exist.
+@contextmanager
+def locked(path):
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+# get_shared_key(path) returns the key under which the graph stored at 'path'
+# is kept in the store.
+def get_shared_key(path):
+    return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:32]
+
+# get_uses_file(data_dir, key) returns the path of the file holding the number
+# of tasks still to use the graph with the key 'key' of the dataset in
+# 'data_dir', on all nodes.
+def get_uses_file(data_dir, key):
+    return data_dir + "shared_graphs/" + key
+
+# get_entry_dir(key) returns the directory holding the CSR arrays of the graph
+# with the key 'key' on the calling node.
+def get_entry_dir(key):
+    return get_shared_graph_dir() + "robustness-shared-graphs/" + key + "/"
+
+# read_count(path) returns the number stored in the file 'path', or None if it
+# does not exist.
+def read_count(path):
+    try:
+        with open(path) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+# write_count(path, count) stores the number 'count' in the file 'path'.
+def write_count(path, count):
+    with open(path + ".tmp", "w") as f:
+        f.write(str(count))
+    os.replace(path + ".tmp", path)
+
+# register_shared_graphs(data_dir, uses) registers the graphs of the dataset in
+# 'data_dir' in the dictionary 'uses', mapping the path of each graph to the
+# number of tasks of the next stage that use it, in the store. Only graphs used
+# by more than one task are registered, and the registrations of an earlier
+# stage, e.g. of a job that was killed, are removed first. The tasks that the
+# stage will not run, e.g. because they are checkpointed, must not be counted.
+def register_shared_graphs(data_dir, uses):
+    shutil.rmtree(data_dir + "shared_graphs/", ignore_errors=True)
+    os.makedirs(data_dir + "shared_graphs/", exist_ok=True)
+    for path, count in uses.items():
+        if count > 1:
+            write_count(get_uses_file(data_dir, get_shared_key(path)), count)
+
+# evict_idle_graphs(data_dir) evicts the CSR arrays of the graphs of the dataset
+# in 'data_dir' on the calling node that no task on the node has attached and
+# that no task is still to use, e.g. because their last tasks ran on other
+# nodes.
+def evict_idle_graphs(data_dir):
+    root = get_shared_graph_dir() + "robustness-shared-graphs/"
+    if not os.path.isdir(root):
+        return
+    for key in os.listdir(root):
+        if key.endswith(".lock"):
+            continue
+        with locked(root + key + ".lock"):
+            remaining = read_count(get_uses_file(data_dir, key))
+            if (remaining is None or remaining <= 0) and not read_count(get_entry_dir(key) + "attached"):
+                shutil.rmtree(get_entry_dir(key), ignore_errors=True)
+
+# shared_csr(data_dir, path, load) is a context manager that provides the
+# tuple of arrays returned by 'load' for the graph stored at 'path' of the
+# dataset in 'data_dir', i.e. its CSR arrays followed by any arrays derived
+# from them (see load_scoring_arrays in engine/utils/network.py). If the graph
+# is registered in the store, the arrays are mapped read-only from the shared
+# memory of the node, after being written there by calling 'load' on 'path' if
+# no other task on the node did so yet. Otherwise, 'load' is called on 'path'
+# and its result is provided. When the context is left, also by an exception,
+# the calling task is counted as done with the graph, and the arrays are
+# evicted from the node if no other task on the node has them attached and no
+# task is still to use them.
+@contextmanager
+def shared_csr(data_dir, path, load):
+    key = get_shared_key(path)
+    uses_file = get_uses_file(data_dir, key)
+    if read_count(uses_file) is None:
+        yield load(path)
+        return
+    entry_dir = get_entry_dir(key)
+    attached = False
+    try:
+        os.makedirs(os.path.dirname(entry_dir[:-1]), exist_ok=True)
+        with locked(entry_dir[:-1] + ".lock"):
+            if not os.path.isfile(entry_dir + "attached"):
+                os.makedirs(entry_dir, exist_ok=True)
+                arrays = load(path)
+                for i, array in enumerate(arrays):
+                    np.save(entry_dir + str(i) + ".npy", array)
+                write_count(entry_dir + "num_arrays", len(arrays))
+                write_count(entry_dir + "attached", 0)
+            write_count(entry_dir + "attached", read_count(entry_dir + "attached") + 1)
+            attached = True
+            arrays = tuple(np.load(entry_dir + str(i) + ".npy", mmap_mode="r")
+                           for i in range(read_count(entry_dir + "num_arrays")))
+        yield arrays
+    finally:
+        with locked(uses_file + ".lock"):
+            write_count(uses_file, read_count(uses_file) - 1)
+        if attached:
+            with locked(entry_dir[:-1] + ".lock"):
+                write_count(entry_dir + "attached", read_count(entry_dir + "attached") - 1)
+        evict_idle_graphs(data_dir)
+
+# clear_node_graphs() removes the arrays of all graphs left in the shared memory
+# of the calling node, e.g. by tasks that were killed before they were done.
+def clear_node_graphs():
+    shutil.rmtree(get_shared_graph_dir() + "robustness-shared-graphs/", ignore_errors=True)
+
+# clear_shared_graphs(executor, data_dir) removes the registrations of all
+# graphs of the dataset in 'data_dir', and the arrays left in the shared memory
+# of every node on which a worker of the executor 'executor' runs (see
+# run_on_every_worker in engine/utils/executor.py). It is called once a stage
+# has completed.
+def clear_shared_graphs(executor, data_dir):
+    from engine.utils.executor import run_on_every_worker
+    run_on_every_worker(executor, get_num_engines(), data_dir + "shared_graphs/rendezvous/", clear_node_graphs)
+    clear_node_graphs()
+    shutil.rmtree(data_dir + "shared_graphs/", ignore_errors=True)
@@ -0,0 +1,133 @@
+import csv
+import os
+import shutil
+import numpy as np
+from engine.config.config import *
+
+# This module implements the score store, a single consolidated store for the
+# robustness scores of all networks, located in get_score_store_dir(). It
+# consists of:
+#   - "index.csv", a table with one row per network containing its category,
+#     network, subnetwork, number of vertices and edges, and the position
+#     ('baseline_offset') and number ('num_baselines') of the curves of its
+#     size-matching random graphs in the baseline files,
+#   - for each removal strategy s that is scored (see get_strategies), the
+#     files "s.main.f8" and "s.baseline.f8"
+#     holding the score curves (100 float64 values each) of the empirical
+#     networks and of the random graphs, respectively, one after the other in
+#     the order of the index,
+#   - for each removal strategy s, the files "s.main_mean.f8" and
+#     "s.main_std.f8" holding the mean and the standard deviation of the score
+#     curves of the empirical networks over their 'num_seeds' tie-breaking
+#     seeds, where the curve in "s.main.f8" is the one of the first seed.
+# Networks are appended one at a time while the analysis runs. The data files
+# are raw arrays that are memory-mapped when read, such that the scores of all
+# networks at a single fraction of removed vertices (a column) can be read
+# without copying or unpickling anything.
+
+# The removal strategies for which scores are stored: first the vertex removal
+# strategies, then the edge removal strategies, whose scores are indexed by the
+# fraction of removed edges instead of vertices.
+vertex_strategies = ["static-targeted-attack", "adaptive-targeted-attack", "random-failure",
+                     "batch-adaptive-targeted-attack"]
+edge_strategies = ["random-edge-failure", "degree-product-edge-attack", "betweenness-edge-attack"]
+strategies = vertex_strategies + edge_strategies
+
+# The kinds of score curves, each stored in one file per removal strategy.
+kinds = ["main", "main_mean", "main_std", "baseline"]
+
+# The columns of the index table.
+index_columns = ["category", "network", "subnetwork", "n", "m", "baseline_offset", "num_baselines", "num_seeds"]
+
+# get_strategies() returns the removal strategies under which the networks are
+# scored: the vertex removal strategies, followed by the edge removal
+# strategies if they are enabled (see set_score_edges).
+def get_strategies():
+    return vertex_strategies + (edge_strategies if get_score_edges() else [])
+
+# get_stored_strategies() returns the removal strategies whose scores are held
+# by the score store, in the order of 'strategies', i.e. those that were scored
+# when the store was created.
+def get_stored_strategies():
+    return [strategy for strategy in strategies if os.path.isfile(get_store_file(strategy + ".main.f8"))]
+
+# get_store_file(name) returns the path of the file 'name' in the score store.
+def get_store_file(name):
+    return get_score_store_dir() + name
+
+# reset_score_store() removes all the content of the score store and creates an
+# empty one.
+def reset_score_store():
+    if os.path.isdir(get_score_store_dir()):
+        shutil.rmtree(get_score_store_dir())
+    os.makedirs(get_score_store_dir())
+    with open(get_store_file("index.csv"), "w", newline="") as f:
+        csv.writer(f).writerow(index_columns)
+    for strategy in get_strategies():
+        for kind in kinds:
+            open(get_store_file(strategy + "." + kind + ".f8"), "wb").close()
+
+# load_score_index() returns the index table of the score store as a pandas
+# DataFrame, with one row per network in the order in which they were
+# appended.
+def load_score_index():
+    import pandas as pd
+    return pd.read_csv(get_store_file("index.csv"), keep_default_na=False,
+                       dtype={"category": str, "network": str, "subnetwork": str})
+
+# append_scores(category, network, subnetwork, n, m, res) appends the scores
+# 'res' of a network to the score store, where 'res' is a dictionary holding
+# for the keys "main" and "baseline" a dictionary that maps each removal
+# strategy to the array of score curves of the empirical network, one per
+# tie-breaking seed, and to the array of score curves of its size-matching
+# random graphs, respectively. Networks that are already in the store are not
+# appended again. Data that was appended without a matching row in the index,
+# e.g. because the job was killed while appending, is discarded first, and the
+# index row is written last.
+def append_scores(category, network, subnetwork, n, m, res):
+    index = load_score_index()
+    if ((index["category"] == category) & (index["network"] == network) &
+            (index["subnetwork"] == subnetwork)).any():
+        return
+    num_rows, baseline_offset = len(index), int(index["num_baselines"].sum())
+    num_baselines = len(res["baseline"][strategies[0]])
+    num_seeds = len(np.atleast_2d(res["main"][strategies[0]]))
+    for strategy in get_stored_strategies():
+        main = np.atleast_2d(np.asarray(res["main"][strategy], dtype=np.float64))
+        for kind, num_curves, curves in [("main", num_rows, main[0]),
+                                         ("main_mean", num_rows, main.mean(axis=0)),
+                                         ("main_std", num_rows, main.std(axis=0, ddof=1 if num_seeds > 1 else 0)),
+                                         ("baseline", baseline_offset, res["baseline"][strategy])]:
+            path = get_store_file(strategy + "." + kind + ".f8")
+            os.truncate(path, num_curves * 100 * 8)
+            with open(path, "ab") as f:
+                np.asarray(curves, dtype=np.float64).reshape(-1, 100).tofile(f)
+    with open(get_store_file("index.csv"), "a", newline="") as f:
+        csv.writer(f).writerow([category, network, subnetwork, n, m, baseline_offset, num_baselines, num_seeds])
+
+# load_scores(strategy, kind, index=None) returns the score curves of the
+# empirical networks (if 'kind' is "main", or "main_mean" and "main_std" for
+# the mean and standard deviation over the tie-breaking seeds) or of the
+# size-matching random graphs (if 'kind' is "baseline") under the removal strategy 'strategy' as a
+# read-only memory-mapped array with 100 columns, where the i-th column holds
+# the scores when (i + 1)% of the vertices are removed. The index table can be
+# passed as 'index' to avoid reading it again.
+def load_scores(strategy, kind, index=None):
+    if index is None:
+        index = load_score_index()
+    num_curves = int(index["num_baselines"].sum()) if kind == "baseline" else len(index)
+    if num_curves == 0:
+        return np.empty((0, 100), dtype=np.float64)
+    return np.memmap(get_store_file(strategy + "." + kind + ".f8"), dtype=np.float64, mode="r",
+                     shape=(num_curves, 100))
+
+# get_store_stamp() returns a value that changes whenever the content of the
+# score store changes, namely the size and modification time of its files. It
+# is used to invalidate results computed from the store.
+def get_store_stamp():
+    stamp = ()
+    for name in ["index.csv"] + [strategy + "." + kind + ".f8" for strategy in get_stored_strategies()
+                                 for kind in kinds]:
+        stat = os.stat(get_store_file(name))
+        stamp = stamp + (stat.st_size, stat.st_mtime_ns)
+    return stamp
@@ -148,7 +148,7 @@ def bar_plot():
     import matplotlib
     import matplotlib.patches as mpatches
     from matplotlib import pyplot as plt
-    from engine.utils.io import get_categories, get_networks, get_subnetworks
+    from engine.utils.manifest import list_networks
     from engine.config.config import get_working_dir, get_data_dir
     # Set the font size and style, hatching density, and width of each bar in
     # the bar plot.
@@ -186,29 +186,26 @@ def bar_plot():
     bio_other = 0
     transport = 0
     other = 0
-    data_dir = get_data_dir()
-    for category in get_categories(data_dir):
-        for network in get_networks(data_dir, category):
-            for _ in get_subnetworks(data_dir, category, network):
-                if category == "Technological":
-                    if network == "route_views":
-                        route_views += 1
-                    else:
-                        tech_other += 1
-                if category == "Social":
-                    if network == "Facebook100":
-                        facebook += 1
-                    else:
-                        social_other += 1
-                if category == "Biological":
-                    if network == "kegg_metabolic":
-                        kegg += 1
-                    else:
-                        bio_other += 1
-                if category == "Infrastructure":
-                    transport += 1
-                if category == "Other":
-                    other += 1
+    for (_, category, network, _) in list_networks(get_data_dir()):
+        if category == "Technological":
+            if network == "route_views":
+                route_views += 1
+            else:
+                tech_other += 1
+        if category == "Social":
+            if network == "Facebook100":
+                facebook += 1
+            else:
+                social_other += 1
+        if category == "Biological":
+            if network == "kegg_metabolic":
+                kegg += 1
+            else:
+                bio_other += 1
+        if category == "Infrastructure":
+            transport += 1
+        if category == "Other":
+            other += 1
 
     # These following tuples and proceeding temp scores are used to help overlay
     # the bar plots.
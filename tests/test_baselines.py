@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from engine.utils.generation import sample_gnm_edges
+from engine.utils.kernels import edges_to_csr_kernel
+from engine.utils.network import adaptive_targeted_attack, batched_robustness_scores, get_scores, graph_to_csr
+
+# The tests compare the CSR scoring path in engine/utils/network.py to the
+# original graph-tool based implementation of compute_robustness_score on small
+# seeded G(n, m) graphs.
+
+# random_csr(n, m, seed) returns the CSR arrays of a G(n, m) random graph
+# generated using 'seed'.
+def random_csr(n, m, seed):
+    return edges_to_csr_kernel(n, *sample_gnm_edges(n, m, np.random.default_rng(seed)))
+
+# baseline_adaptive_targeted_attack(offsets, neighbors, random) computes the
+# reverse removal order under the adaptive targeted attack as the original
+# list-based implementation did, reading the degree and the neighbors of each
+# vertex from the CSR arrays 'offsets' and 'neighbors' instead of a graph-tool
+# graph.
+def baseline_adaptive_targeted_attack(offsets, neighbors, random):
+    num_vertices = len(offsets) - 1
+    bins = []
+    pos, deg = [0] * num_vertices, [0] * num_vertices
+    for i in random.permutation(num_vertices):
+        k = offsets[i + 1] - offsets[i]
+        while k >= len(bins):
+            bins.append([])
+        bins[k].append(i)
+        pos[i], deg[i] = len(bins[k]) - 1, k
+    max_deg = len(bins) - 1
+    removal_order = []
+    for k in range(max_deg, -1, -1):
+        while len(bins[k]) != 0:
+            v = bins[k].pop()
+            neighbors_v = neighbors[offsets[v]:offsets[v + 1]].copy()
+            random.shuffle(neighbors_v)
+            for u in neighbors_v:
+                if deg[u] > 0:
+                    bin_u, pos_u = deg[u], pos[u]
+                    pos[bins[bin_u][-1]] = pos_u
+                    bins[bin_u][pos_u], bins[bin_u][-1] = bins[bin_u][-1], bins[bin_u][pos_u]
+                    bins[bin_u].pop()
+                    bins[bin_u - 1].append(u)
+                    pos[u] = len(bins[bin_u - 1]) - 1
+                    deg[u] -= 1
+            deg[v] = 0
+            removal_order.append(v)
+    return np.array(removal_order[::-1])
+
+# baseline_scores(offsets, neighbors, reverse_removal_order) computes the
+# robustness scores of the removal order as the original get_scores did, where
+# the size of the largest component after each removal, computed by
+# graph_tool.topology.vertex_percolation, is computed by SciPy instead.
+def baseline_scores(offsets, neighbors, reverse_removal_order):
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+    n_ = len(reverse_removal_order)
+    adjacency = csr_matrix((np.ones(len(neighbors)), neighbors, offsets), shape=(n_, n_))
+    res = []
+    for j in range(n_ - 1):
+        kept = np.sort(reverse_removal_order[:n_ - j - 1])
+        _, labels = connected_components(adjacency[kept][:, kept], directed=False)
+        res.append(np.bincount(labels).max())
+    res = np.concatenate((res, [0])) / n_
+    endpoints = [int(np.ceil(alpha * n_)) for alpha in np.linspace(0.01, 1, 100)]
+    return [np.mean(res[:end]) for end in endpoints]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_adaptive_targeted_attack_matches_baseline(seed):
+    offsets, neighbors = random_csr(3000, 9000, seed)
+    assert np.array_equal(adaptive_targeted_attack(offsets, neighbors, np.random.default_rng(seed)),
+                          baseline_adaptive_targeted_attack(offsets, neighbors, np.random.default_rng(seed)))
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_robustness_scores_match_baseline(seed):
+    offsets, neighbors = random_csr(150, 300, seed)
+    n = len(offsets) - 1
+    rs = np.random.default_rng(seed)
+    reverse_static_attack_order = np.argsort(np.diff(offsets) + rs.random(n))
+    reverse_adaptive_attack_order = baseline_adaptive_targeted_attack(offsets, neighbors, rs)
+    reverse_random_order = rs.permutation(n)
+    expected = [baseline_scores(offsets, neighbors, order)
+                for order in (reverse_static_attack_order, reverse_adaptive_attack_order, reverse_random_order)]
+    scores = batched_robustness_scores(offsets, neighbors, [np.random.default_rng(seed)])[0]
+    assert np.allclose(scores[:3], expected)
+    assert np.allclose(get_scores(offsets, neighbors, [reverse_random_order])[0], expected[2])
+
+
+def test_graph_to_csr_matches_out_neighbors(tmp_path):
+    graph_tool = pytest.importorskip("graph_tool")
+    rs = np.random.default_rng(0)
+    sources, targets = sample_gnm_edges(500, 2000, rs)
+    # Add the edges in a random order with random orientations, such that the
+    # order of the edges in the file differs from the order in which they
+    # were added.
+    edges = np.stack([sources, targets], axis=1)[rs.permutation(len(sources))]
+    flip = rs.random(len(edges)) < 0.5
+    edges[flip] = edges[flip][:, ::-1]
+    graph = graph_tool.Graph(directed=False)
+    graph.add_vertex(500)
+    graph.add_edge_list(edges)
+    graph.save(str(tmp_path / "graph.gt"))
+    graph = graph_tool.load_graph(str(tmp_path / "graph.gt"))
+    offsets, neighbors = graph_to_csr(graph)
+    for v in range(graph.num_vertices()):
+        assert np.array_equal(neighbors[offsets[v]:offsets[v + 1]], graph.get_out_neighbors(v))
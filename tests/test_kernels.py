@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from engine.utils.generation import sample_gnm_edges
+from engine.utils.kernels import edge_list_kernel, edges_to_csr_kernel, shuffle_ties_kernel
+from engine.config.config import set_score_edges
+from engine.utils.network import adaptive_targeted_attack, batch_adaptive_attack, batched_robustness_scores, \
+    edge_strategy_arrays, get_edge_scores
+
+# The tests compare the compiled kernels in engine/utils/kernels.py to the
+# definitions of the removal strategies on small seeded G(n, m) graphs.
+
+# random_csr(n, m, seed) returns the CSR arrays of a G(n, m) random graph
+# generated using 'seed'.
+def random_csr(n, m, seed):
+    return edges_to_csr_kernel(n, *sample_gnm_edges(n, m, np.random.default_rng(seed)))
+
+# removal_degrees(offsets, neighbors, reverse_removal_order) returns, for each
+# step of the removal order, the current degree of the removed vertex and the
+# highest current degree of the remaining vertices.
+def removal_degrees(offsets, neighbors, reverse_removal_order):
+    degrees = np.diff(offsets)
+    removed = np.zeros(len(degrees), dtype=bool)
+    steps = []
+    for v in reverse_removal_order[::-1]:
+        steps.append((degrees[v], degrees[~removed].max()))
+        removed[v] = True
+        for u in neighbors[offsets[v]:offsets[v + 1]]:
+            if not removed[u]:
+                degrees[u] -= 1
+    return np.array(steps)
+
+# largest_component_fraction(n, sources, targets) returns the size of the
+# largest connected component, relative to 'n', of the graph with 'n' vertices
+# and the edges (sources[e], targets[e]), computed by SciPy.
+def largest_component_fraction(n, sources, targets):
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    _, labels = connected_components(coo_matrix((np.ones(len(sources)), (sources, targets)), shape=(n, n)),
+                                     directed=False)
+    return np.bincount(labels).max() / n
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batch_adaptive_attack_with_tiny_fraction_is_adaptive(seed):
+    offsets, neighbors = random_csr(2000, 6000, seed)
+    exact_order = adaptive_targeted_attack(offsets, neighbors, np.random.default_rng(seed))
+    batch_order = batch_adaptive_attack(offsets, neighbors, 1e-9, np.random.default_rng(seed))
+    assert np.array_equal(np.sort(batch_order), np.arange(2000))
+    for order in (exact_order, batch_order):
+        steps = removal_degrees(offsets, neighbors, order)
+        assert np.array_equal(steps[:, 0], steps[:, 1])
+
+
+def test_shuffle_ties_kernel_only_reorders_ties():
+    rs = np.random.default_rng(0)
+    keys = rs.integers(0, 6, 1000)
+    order = np.argsort(keys, kind="stable")
+    shuffled = shuffle_ties_kernel(order, keys, rs)
+    assert np.array_equal(np.sort(shuffled), np.arange(1000))
+    assert np.array_equal(keys[shuffled], keys[order])
+    assert not np.array_equal(shuffled, order)
+
+
+def test_edge_percolation_scores_match_components():
+    n = 60
+    offsets, neighbors = random_csr(n, 150, 0)
+    sources, targets, _ = edge_list_kernel(offsets, neighbors)
+    m = len(sources)
+    reverse_order = np.random.default_rng(0).permutation(m)
+    # After removing j + 1 edges, the edges left are the first m - j - 1 edges
+    # of the reverse removal order.
+    fractions = [largest_component_fraction(n, sources[reverse_order[:m - j - 1]], targets[reverse_order[:m - j - 1]])
+                 for j in range(m)]
+    endpoints = np.ceil(np.linspace(0.01, 1, 100) * m).astype(np.int64)
+    expected = [np.mean(fractions[:end]) for end in endpoints]
+    assert np.allclose(get_edge_scores(n, sources, targets, [reverse_order])[0], expected)
+
+
+def test_edge_strategies_are_only_scored_when_enabled():
+    offsets, neighbors = random_csr(300, 900, 0)
+    vertex_scores = batched_robustness_scores(offsets, neighbors, [np.random.default_rng(s) for s in range(3)])
+    try:
+        set_score_edges(True)
+        scores = batched_robustness_scores(offsets, neighbors, [np.random.default_rng(s) for s in range(3)])
+        shared = batched_robustness_scores(offsets, neighbors, [np.random.default_rng(s) for s in range(3)],
+                                           edge_strategy_arrays(offsets, neighbors))
+    finally:
+        set_score_edges(False)
+    assert vertex_scores.shape == (3, 4, 100) and scores.shape == (3, 7, 100)
+    assert np.array_equal(scores[:, :4], vertex_scores)
+    assert np.array_equal(scores, shared)
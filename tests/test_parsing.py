@@ -0,0 +1,41 @@
+import io
+import numpy as np
+from engine.utils.parsing import read_edges, read_pajek_edges
+
+# The tests compare the chunked edge list parsers in engine/utils/parsing.py to
+# the NumPy parsers they replace.
+
+pajek = ('*Vertices 5\n1 "a"\n2 "b"\n3 "c"\n4 "d"\n5 "e"\n*Arcs\n*Edges\n1 2\n2 3\n3 4 1.0\n4 5\n1 5\n'
+         '*Triangles\n1 2 3\n')
+
+# baseline_pajek_edges(text) parses the edges of the Pajek file 'text' as the
+# original collection code did, i.e. from the line following "*Edges" up to
+# the "*Triangles" line.
+def baseline_pajek_edges(text):
+    lines = text.splitlines()
+    skip = next(i for i, line in enumerate(lines) if line.startswith("*Edges")) + 1
+    footer = sum(1 for line in lines[next((i for i, line in enumerate(lines) if line.startswith("*Triangles")),
+                                          len(lines)):])
+    return np.genfromtxt(io.StringIO(text), usecols=[0, 1], skip_header=skip, skip_footer=footer, dtype=int)
+
+
+def test_read_pajek_edges_skips_empty_arcs_section():
+    text = '*Vertices 3\n1 "a"\n2 "b"\n*Arcs\n*Edges\n1 2\n2 3\n'
+    assert np.array_equal(read_pajek_edges(io.StringIO(text)), [[1, 2], [2, 3]])
+
+
+def test_read_pajek_edges_matches_baseline():
+    for chunk_lines in (1, 2, 1 << 20):
+        edges = read_pajek_edges(io.StringIO(pajek), chunk_lines=chunk_lines)
+        assert np.array_equal(edges, baseline_pajek_edges(pajek))
+
+
+def test_read_edges_matches_loadtxt():
+    rs = np.random.default_rng(0)
+    edges = rs.integers(0, 1000, size=(500, 2))
+    text = "% header\n" + "".join("%d %d %d\n" % (u, v, w) for (u, v), w in zip(edges, rs.integers(0, 9, 500)))
+    for chunk_lines in (7, 1 << 20):
+        parsed = read_edges(io.StringIO(text), chunk_lines=chunk_lines)
+        assert np.array_equal(parsed, np.loadtxt(io.StringIO(text), comments="%", usecols=[0, 1], dtype=np.int64))
+    named = read_edges(io.StringIO("x,y\ny,z\n"), delimiter=",", dtype=str)
+    assert named.tolist() == [["x", "y"], ["y", "z"]]